@@ -4,10 +4,9 @@ Enterprise tool with stunning Embridge branding
 """
 import streamlit as st
 import json
+import os
 from pathlib import Path
-import tempfile
-import traceback
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 import time
 
 from config import Config
@@ -19,6 +18,10 @@ from modules.qa_validator import QAValidator
 from modules.output_transformer import OutputTransformer
 from modules.export_handlers import ExportHandler
 from modules.combined_processor import CombinedProcessor  # NEW: For optimized processing
+from modules.azure_vision_ocr import IMAGE_EXTENSIONS
+from modules.vision_extractor import VisionRequirementExtractor, is_scanned_document
+from modules.upload_ingest import UploadedDocument, spool_files, cleanup_spool
+from modules.requirement_table import TABLE_EXTENSIONS
 
 # Page configuration
 st.set_page_config(
@@ -538,7 +541,9 @@ if 'current_stage' not in st.session_state:
 if 'brd_text' not in st.session_state:
     st.session_state.brd_text = ""
 if 'temp_file_path' not in st.session_state:
-    st.session_state.temp_file_path = None
+    st.session_state.temp_file_path = None  # In-memory UploadedDocument, or a spooled folder of page images
+if 'upload_id' not in st.session_state:
+    st.session_state.upload_id = None
 
 # Header with Enbridge logo
 import base64
@@ -566,7 +571,7 @@ with st.expander("Help & Information"):
     with col1:
         st.markdown("""
         ### How to Use
-        1. Upload BRD (PDF/DOCX/TXT)
+        1. Upload BRD (PDF/DOCX/TXT, or page images/ZIP)
         2. Click "START AI PROCESSING"
         3. Review generated stories
         4. Download your format
@@ -592,7 +597,7 @@ with st.expander("Help & Information"):
         - Multiple export formats
         
         ### Supported Formats
-        - **Upload**: PDF, DOCX, TXT
+        - **Upload**: PDF, DOCX, TXT, ZIP/PNG/JPG/TIFF page images
         - **Export**: PDF, Excel, Word, TXT
         """)
 
@@ -614,24 +619,57 @@ with tab1:
     else:
         # File upload
         st.markdown("### Step 1: Choose Your BRD File")
-        uploaded_file = st.file_uploader(
+        uploaded_files = st.file_uploader(
             "Drag and drop or click to browse",
-            type=['pdf', 'docx', 'txt'],
-            help="Upload PDF, DOCX, or TXT format",
+            type=['pdf', 'docx', 'txt', 'md', 'html', 'htm', 'xlsx', 'csv', 'zip', 'png', 'jpg', 'jpeg', 'tif', 'tiff'],
+            accept_multiple_files=True,
+            help="Upload a PDF, DOCX, TXT, Markdown or HTML file, an Excel/CSV requirements list, a ZIP of page images, "
+                 "or several page photos/scans",
             label_visibility="collapsed"
         )
-        st.markdown("<p style='color: #495057; font-size: 0.9rem; font-weight: 500; margin-top: 0.5rem;'>Supported: PDF, DOCX, TXT</p>", unsafe_allow_html=True)
+        st.markdown("<p style='color: #495057; font-size: 0.9rem; font-weight: 500; margin-top: 0.5rem;'>Supported: PDF, DOCX, TXT, MD, HTML, XLSX, CSV, ZIP, PNG, JPG, TIFF (select several images to combine them in order)</p>", unsafe_allow_html=True)
         
-        if uploaded_file is not None:
-            # Save uploaded file temporarily
-            with tempfile.NamedTemporaryFile(delete=False, suffix=Path(uploaded_file.name).suffix) as tmp_file:
-                tmp_file.write(uploaded_file.getvalue())
-                st.session_state.temp_file_path = tmp_file.name
+        # Streamlit reruns this script on every interaction: ingest an upload only when it changes
+        upload_id = tuple(getattr(f, "file_id", None) or (f.name, f.size) for f in uploaded_files)
+        is_new_upload = upload_id != st.session_state.upload_id
+        
+        uploaded_file = None
+        if len(uploaded_files) == 1:
+            uploaded_file = uploaded_files[0]
             
-            st.markdown(f"<p style='color: #28a745; font-weight: 600; font-size: 1rem; margin: 1rem 0;'>✓ {uploaded_file.name} is ready for processing</p>", unsafe_allow_html=True)
+            if is_new_upload:
+                # Kept in memory and hashed once; written to disk only if OCR needs a file path
+                previous = st.session_state.temp_file_path
+                st.session_state.temp_file_path = UploadedDocument(uploaded_file.name, uploaded_file.getvalue())
+                if isinstance(previous, UploadedDocument) and previous != st.session_state.temp_file_path:
+                    previous.discard()
+                st.session_state.upload_id = upload_id
+                cleanup_spool()
+        elif len(uploaded_files) > 1:
+            non_images = [f.name for f in uploaded_files if Path(f.name).suffix.lower() not in IMAGE_EXTENSIONS]
+            if non_images:
+                st.error(f"Multiple files can only be page images. Remove: {', '.join(non_images)}")
+            else:
+                if is_new_upload:
+                    # Page images go to OCR by path: one spooled folder per selection, numbered in upload order
+                    st.session_state.temp_file_path = spool_files([(f.name, f.getvalue()) for f in uploaded_files])
+                    st.session_state.upload_id = upload_id
+                    cleanup_spool()
+                uploaded_file = uploaded_files[0]
+        
+        if uploaded_file is not None:
+            ready_label = uploaded_file.name if len(uploaded_files) == 1 else f"{len(uploaded_files)} page images"
+            st.markdown(f"<p style='color: #28a745; font-weight: 600; font-size: 1rem; margin: 1rem 0;'>✓ {ready_label} is ready for processing</p>", unsafe_allow_html=True)
             
             st.markdown("### Step 2: Start AI Processing")
             
+            fused_mode = st.checkbox(
+                "Fused vision extraction for scanned documents",
+                value=Config.FUSED_VISION_EXTRACTION,
+                help="Send page images straight to requirement extraction (one call per page, in parallel) "
+                     "instead of transcribing the whole document first"
+            )
+            
             # Process button
             if st.button("START AI PROCESSING", type="primary", use_container_width=True):
                 try:
@@ -649,17 +687,63 @@ with tab1:
                     progress_bar = st.progress(0)
                     status_text = st.empty()
                     
+                    # Stage 1: Text extraction with live per-page progress
+                    status_text.markdown("### Stage 1/6: Extracting BRD Text...")
+                    st.session_state.current_stage = 1
+                    page_status = st.empty()
+                    
+                    def show_page_progress(event):
+                        """Advance the Stage 1 band of the progress bar as pages complete"""
+                        fraction = event['completed'] / max(event['total_pages'], 1)
+                        progress_bar.progress(min(fraction, 1.0) / 6)
+                        page_status.caption(
+                            f"Page {event['page']}/{event['total_pages']} ({event['source']}) · "
+                            f"{event['cache_hits']} from cache · ~{event['eta_seconds']:.0f}s remaining"
+                        )
+                    
+                    fused_requirements = None
+                    if fused_mode and is_scanned_document(st.session_state.temp_file_path):
+                        # Requirements come straight from the page images; the digest stands in for BRD text
+                        status_text.markdown("### Stage 1/6: Extracting Requirements from Page Images...")
+                        vision_extractor = VisionRequirementExtractor()
+                        fused_requirements, st.session_state.brd_text = vision_extractor.extract_requirements(
+                            os.fspath(st.session_state.temp_file_path),  # Renders pages from a file path
+                            progress_callback=show_page_progress
+                        )
+                        failed_pages = fused_requirements["_metadata"]["failed_pages"]
+                        if failed_pages:
+                            st.warning(
+                                f"⚠️ No requirements could be extracted from page(s) "
+                                f"{', '.join(map(str, failed_pages))}, even from their OCR text. "
+                                f"Review these pages manually, or process the document without fused extraction."
+                            )
+                    else:
+                        # Extract and store BRD text
+                        st.session_state.brd_text = brd_parser.extract_text_from_file(
+                            st.session_state.temp_file_path,
+                            progress_callback=show_page_progress
+                        )
+                    page_status.empty()
+                    
+                    normalization = brd_parser.last_normalization_stats
+                    if normalization and normalization["chars_removed"] > 0:
+                        st.caption(
+                            f"🧹 Removed {normalization['chars_removed']:,} characters "
+                            f"(~{normalization['tokens_removed']:,} tokens) of headers, footers, "
+                            f"page numbers and boilerplate before analysis"
+                        )
+                    
                     # Stage 1: BRD Parsing
                     status_text.markdown("### Stage 1/6: Analyzing BRD Structure...")
                     progress_bar.progress(1/6)
-                    st.session_state.current_stage = 1
                     
-                    parsing_result = brd_parser.parse_brd(st.session_state.temp_file_path)
+                    parsing_result = brd_parser.parse_brd(
+                        st.session_state.temp_file_path,
+                        brd_text=st.session_state.brd_text,
+                        outline=brd_parser.last_outline  # Markdown/HTML: the section outline, not the full text
+                    )
                     st.session_state.processed_data['parsing'] = parsing_result
                     
-                    # Extract and store BRD text
-                    st.session_state.brd_text = brd_parser.extract_text_from_file(st.session_state.temp_file_path)
-                    
                     # DEBUG: Print first 500 chars to verify OCR content
                     print("=" * 80)
                     print("DEBUG: BRD TEXT EXTRACTED")
@@ -668,73 +752,19 @@ with tab1:
                     print(st.session_state.brd_text[:500])
                     print("=" * 80)
                     
-                    # ===== COMBINED PROCESSING: Stages 2-4 (Save ~30-40s) =====
-                    # Try combined single-pass processing first (1 API call instead of 3)
-                    try:
-                        status_text.markdown("### Stages 2-4/6: Comprehensive Analysis (Single-Pass)...")
+                    # Spreadsheet/CSV requirement lists are already structured: map the rows instead of Stage 2
+                    if fused_requirements is None and \
+                            getattr(st.session_state.temp_file_path, "extension", None) in TABLE_EXTENSIONS:
+                        status_text.markdown("### Stage 2/6: Mapping Requirement Rows...")
                         progress_bar.progress(2/6)
                         st.session_state.current_stage = 2
-                        
-                        combined_processor = CombinedProcessor()
-                        start_time = time.time()
-                        
-                        # Single comprehensive API call
-                        comprehensive_result = combined_processor.process_comprehensive(
-                            st.session_state.brd_text,
-                            parsing_result
-                        )
-                        
-                        elapsed = time.time() - start_time
-                        print(f"✅ Combined processing completed in {elapsed:.2f}s")
-                        
-                        # Split result into separate components
-                        requirements, context, stories = combined_processor.split_comprehensive_result(
-                            comprehensive_result
-                        )
-                        
-                        # Store in session state
-                        st.session_state.processed_data['requirements'] = requirements
-                        st.session_state.processed_data['context'] = context
-                        st.session_state.processed_data['stories'] = stories
-                        
-                        # fast forward progress
-                        progress_bar.progress(4/6)
-                        st.session_state.current_stage = 4
-                        
-                        print("==" * 40)
-                        print("✅ COMBINED PROCESSING SUCCESS")
-                        print(f"📊 {len(requirements.get('functional_requirements', []))} functional requirements")
-                        print(f"📖 {len(stories.get('user_stories', []))} user stories")
-                        print(f"⏱️  Saved ~30-40s by using single API call")
-                        print("=" * 80)
-                        
-                    except Exception as combined_error:
-                        # FALLBACK: Use sequential processing if combined fails
-                        print(f"⚠️ Combined processing failed: {combined_error}")
-                        print("🔄 Falling back to sequential processing...")
-                        
-                        # Stage 2: Requirement Extraction
-                        status_text.markdown("### Stage 2/6: Extracting Requirements...")
-                        progress_bar.progress(2/6)
-                        st.session_state.current_stage = 2
-                        
-                        requirements = req_extractor.extract_requirements(
-                            st.session_state.brd_text,
-                            parsing_result
-                        )
+                        fused_requirements = req_extractor.extract_table_requirements(st.session_state.temp_file_path)
+                    
+                    if fused_requirements is not None:
+                        # Requirements already extracted from the page images or spreadsheet rows: only stages 3-4 remain
+                        requirements = fused_requirements
                         st.session_state.processed_data['requirements'] = requirements
                         
-                        # DEBUG: Print requirement extraction results
-                        print("=" * 80)
-                        print("DEBUG: REQUIREMENTS EXTRACTED (SEQUENTIAL FALLBACK)")
-                        print(f"Functional requirements: {len(requirements.get('functional_requirements', []))}")
-                        print(f"Non-functional requirements: {len(requirements.get('non_functional_requirements', []))}")
-                        if requirements.get('functional_requirements'):
-                            print("First functional requirement:")
-                            print(json.dumps(requirements['functional_requirements'][0], indent=2))
-                        print("=" * 80)
-                        
-                        # Stage 3: Context Synthesis
                         status_text.markdown("### Stage 3/6: Synthesizing Business Context...")
                         progress_bar.progress(3/6)
                         st.session_state.current_stage = 3
@@ -742,13 +772,94 @@ with tab1:
                         context = context_synth.synthesize_context(requirements)
                         st.session_state.processed_data['context'] = context
                         
-                        # Stage 4: User Story Generation
                         status_text.markdown("### Stage 4/6: Generating User Stories...")
                         progress_bar.progress(4/6)
                         st.session_state.current_stage = 4
                         
                         stories = story_gen.generate_stories(requirements, context)
                         st.session_state.processed_data['stories'] = stories
+                    else:
+                        # ===== COMBINED PROCESSING: Stages 2-4 (Save ~30-40s) =====
+                        # Try combined single-pass processing first (1 API call instead of 3)
+                        try:
+                            status_text.markdown("### Stages 2-4/6: Comprehensive Analysis (Single-Pass)...")
+                            progress_bar.progress(2/6)
+                            st.session_state.current_stage = 2
+                            
+                            combined_processor = CombinedProcessor()
+                            start_time = time.time()
+                            
+                            # Single comprehensive API call
+                            comprehensive_result = combined_processor.process_comprehensive(
+                                st.session_state.brd_text,
+                                parsing_result
+                            )
+                            
+                            elapsed = time.time() - start_time
+                            print(f"✅ Combined processing completed in {elapsed:.2f}s")
+                            
+                            # Split result into separate components
+                            requirements, context, stories = combined_processor.split_comprehensive_result(
+                                comprehensive_result
+                            )
+                            
+                            # Store in session state
+                            st.session_state.processed_data['requirements'] = requirements
+                            st.session_state.processed_data['context'] = context
+                            st.session_state.processed_data['stories'] = stories
+                            
+                            # fast forward progress
+                            progress_bar.progress(4/6)
+                            st.session_state.current_stage = 4
+                            
+                            print("==" * 40)
+                            print("✅ COMBINED PROCESSING SUCCESS")
+                            print(f"📊 {len(requirements.get('functional_requirements', []))} functional requirements")
+                            print(f"📖 {len(stories.get('user_stories', []))} user stories")
+                            print(f"⏱️  Saved ~30-40s by using single API call")
+                            print("=" * 80)
+                            
+                        except Exception as combined_error:
+                            # FALLBACK: Use sequential processing if combined fails
+                            print(f"⚠️ Combined processing failed: {combined_error}")
+                            print("🔄 Falling back to sequential processing...")
+                            
+                            # Stage 2: Requirement Extraction
+                            status_text.markdown("### Stage 2/6: Extracting Requirements...")
+                            progress_bar.progress(2/6)
+                            st.session_state.current_stage = 2
+                            
+                            requirements = req_extractor.extract_requirements(
+                                st.session_state.brd_text,
+                                parsing_result
+                            )
+                            st.session_state.processed_data['requirements'] = requirements
+                            
+                            # DEBUG: Print requirement extraction results
+                            print("=" * 80)
+                            print("DEBUG: REQUIREMENTS EXTRACTED (SEQUENTIAL FALLBACK)")
+                            print(f"Functional requirements: {len(requirements.get('functional_requirements', []))}")
+                            print(f"Non-functional requirements: {len(requirements.get('non_functional_requirements', []))}")
+                            if requirements.get('functional_requirements'):
+                                print("First functional requirement:")
+                                print(json.dumps(requirements['functional_requirements'][0], indent=2))
+                            print("=" * 80)
+                            
+                            # Stage 3: Context Synthesis
+                            status_text.markdown("### Stage 3/6: Synthesizing Business Context...")
+                            progress_bar.progress(3/6)
+                            st.session_state.current_stage = 3
+                            
+                            context = context_synth.synthesize_context(requirements)
+                            st.session_state.processed_data['context'] = context
+                            
+                            # Stage 4: User Story Generation
+                            status_text.markdown("### Stage 4/6: Generating User Stories...")
+                            progress_bar.progress(4/6)
+                            st.session_state.current_stage = 4
+                            
+                            stories = story_gen.generate_stories(requirements, context)
+                            st.session_state.processed_data['stories'] = stories
                     
                     
                     # ===== ASYNC VALIDATION (Step 3: Save ~15-20s) =====
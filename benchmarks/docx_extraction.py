@@ -0,0 +1,155 @@
+"""
+DOCX Extraction Benchmark
+Compares the previous python-docx extraction (paragraphs only) with the
+streaming word/document.xml reader on synthetic BRDs with requirement tables
+
+Each extractor runs in a fresh child process so peak RSS is per run.
+
+Usage:
+    python benchmarks/docx_extraction.py
+    python benchmarks/docx_extraction.py --pages 50 500 --output results.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+WORDS = ("system shall must user report export approve invoice meter customer account billing "
+         "outage notify dashboard audit login access record schedule payment request workflow").split()
+
+
+def make_docx(docx_path: Path, page_count: int, seed: int = 7):
+    """
+    Build a DOCX resembling a long BRD: per page a heading, requirement
+    paragraphs and a requirements table, separated by page breaks
+    """
+    import docx
+
+    rng = random.Random(seed)
+    document = docx.Document()
+    for page_num in range(page_count):
+        document.add_heading(f"{page_num + 1} Section {page_num + 1}", level=1)
+        for paragraph in range(12):
+            words = " ".join(rng.choice(WORDS) for _ in range(18))
+            document.add_paragraph(f"{page_num + 1}.{paragraph + 1} The {words}.")
+
+        table = document.add_table(rows=8, cols=4)
+        for row in range(8):
+            cells = (("ID", "Description", "Priority", "Category") if row == 0 else
+                     (f"FR-{page_num + 1}.{row}", " ".join(rng.choice(WORDS) for _ in range(10)),
+                      rng.choice(("High", "Medium", "Low")), rng.choice(("Billing", "Outage", "Access"))))
+            for col, value in enumerate(cells):
+                table.cell(row, col).text = value
+        document.add_page_break()
+    document.save(str(docx_path))
+
+
+def run_python_docx(docx_path: str) -> dict:
+    """Previous BRDParser path: python-docx, non-empty paragraphs only"""
+    import docx
+
+    start = time.perf_counter()
+    document = docx.Document(docx_path)
+    text = "\n\n".join(para.text for para in document.paragraphs if para.text.strip())
+    return {"seconds": round(time.perf_counter() - start, 3), "chars": len(text), "table_rows": 0,
+            "peak_rss_mb": _peak_rss_mb()}
+
+
+def run_streaming(docx_path: str) -> dict:
+    """Current BRDParser path: streaming reader with headings and table rows"""
+    from modules.docx_stream import iter_docx_blocks
+
+    start = time.perf_counter()
+    chars = table_rows = 0
+    for block in iter_docx_blocks(docx_path):
+        if block["type"] == "table_row":
+            table_rows += 1
+            chars += sum(len(cell) for cell in block["cells"])
+        else:
+            chars += len(block.get("text", ""))
+    return {"seconds": round(time.perf_counter() - start, 3), "chars": chars, "table_rows": table_rows,
+            "peak_rss_mb": _peak_rss_mb()}
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident memory of this process"""
+    if resource is None:
+        return 0.0
+    # ru_maxrss is KB on Linux, bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor, 1)
+
+
+def _git_revision() -> str:
+    """Short commit hash of the benchmarked tree, if available"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DOCX extraction (python-docx vs streaming reader)")
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 500], help="Synthetic document sizes")
+    parser.add_argument("--work-dir", default=None, help="Where synthetic documents are kept (reused between runs)")
+    parser.add_argument("--output", default=None, help="JSON results path (default: print only)")
+    args = parser.parse_args()
+
+    work_dir = Path(args.work_dir or Path(tempfile.gettempdir()) / "brd_docx_benchmark")
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    results = {
+        "benchmark": "docx_extraction",
+        "revision": _git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "cases": [],
+    }
+
+    context = multiprocessing.get_context("spawn")
+    for page_count in args.pages:
+        docx_path = work_dir / f"brd_{page_count}.docx"
+        if not docx_path.exists():
+            print(f"📄 Generating {page_count}-page synthetic DOCX...")
+            # In a child too: Linux carries the parent's peak RSS over into spawned children
+            with context.Pool(1) as pool:
+                pool.apply(make_docx, (docx_path, page_count))
+
+        case = {"pages": page_count, "file_mb": round(docx_path.stat().st_size / (1024 * 1024), 2)}
+        for name, runner in (("python_docx", run_python_docx), ("streaming", run_streaming)):
+            with context.Pool(1) as pool:
+                case[name] = pool.apply(runner, (str(docx_path),))
+        results["cases"].append(case)
+
+        old, new = case["python_docx"], case["streaming"]
+        print(f"  {page_count:>4} pages: python-docx {old['seconds']}s / {old['peak_rss_mb']} MB "
+              f"({old['chars']} chars, no tables), streaming {new['seconds']}s / {new['peak_rss_mb']} MB "
+              f"({new['chars']} chars, {new['table_rows']} table rows)")
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+        print(f"💾 Saved results to {args.output}")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+OCR Throughput Benchmark
+Runs AzureVisionOCR over synthetic scanned PDFs against a local fake Vision
+endpoint and writes the results as JSON for comparison across versions
+
+Usage:
+    python benchmarks/ocr_throughput.py
+    python benchmarks/ocr_throughput.py --pages 10 100 --workers 4 16 --dpi 150 250 --output results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+# The benchmark never talks to Azure, but AzureVisionOCR needs a client config
+os.environ.setdefault("AZURE_OPENAI_KEY", "benchmark")
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "http://127.0.0.1")
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+WORDS = ("system shall must user report export approve invoice meter customer account billing "
+         "outage notify dashboard audit login access record schedule payment request workflow").split()
+
+
+def make_scanned_pdf(pdf_path: Path, page_count: int, seed: int = 7):
+    """
+    Build a PDF whose pages are noisy grayscale scans of unique text
+
+    Every page differs, so blank/duplicate detection does not short-circuit
+    the Vision path.
+    """
+    import fitz
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    noise_rng = np.random.default_rng(seed)
+    shading = np.linspace(0, 40, 1275, dtype=np.float32)[None, :]
+
+    with fitz.open() as pdf_document:
+        for page_num in range(page_count):
+            img = Image.new("L", (1275, 1650), 255)
+            draw = ImageDraw.Draw(img)
+            for line in range(36):
+                words = " ".join(rng.choice(WORDS) for _ in range(12))
+                draw.text((90, 90 + line * 42), f"{page_num + 1}.{line + 1} {words}", fill=0)
+
+            # Scanner shading and sensor noise
+            pixels = np.asarray(img, dtype=np.float32) - shading
+            pixels += noise_rng.normal(0, 6, pixels.shape)
+            img = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+            buffer = io.BytesIO()
+            img.save(buffer, format="PNG")
+            page = pdf_document.new_page(width=612, height=792)
+            page.insert_image(page.rect, stream=buffer.getvalue())
+        pdf_document.save(str(pdf_path), deflate=True)
+
+
+class FakeVisionHandler(BaseHTTPRequestHandler):
+    """Answers Azure OpenAI chat completion calls with delimited page text after a simulated delay"""
+
+    latency = 0.2
+    latency_per_image = 0.05
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        content = body["messages"][-1]["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+
+        labels = [part["text"] for part in content if part["type"] == "text"][1:]
+        images = sum(1 for part in content if part["type"] == "image_url")
+        time.sleep(self.latency + self.latency_per_image * images)
+
+        sections = []
+        for label in labels:
+            match = re.match(r"(Page|Region) (\d+):", label)
+            if match:
+                sections.append(f"=== {match.group(1).upper()} {match.group(2)} ===\n"
+                                f"Transcribed text of {match.group(1).lower()} {match.group(2)}.")
+        text = "\n".join(sections) or "Transcribed text of a single page."
+
+        response = json.dumps({
+            "id": "benchmark",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "benchmark"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_endpoint(latency: float, latency_per_image: float) -> ThreadingHTTPServer:
+    """Start the fake Vision endpoint on a free local port"""
+    FakeVisionHandler.latency = latency
+    FakeVisionHandler.latency_per_image = latency_per_image
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeVisionHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _run_metrics(stats: dict) -> dict:
+    """Per-run metrics derived from AzureVisionOCR.last_run_stats"""
+    pages = max(1, stats["pages"])
+    images = max(1, stats["encoded_images"])
+    return {
+        "pages": stats["pages"],
+        "wall_time_s": stats["wall_time_s"],
+        "pages_per_sec": stats["pages_per_sec"],
+        "ocr_requests": stats["ocr_requests"],
+        "cache_hits": stats["cache_hits"],
+        "cache_hit_rate": round(stats["cache_hits"] / pages, 3),
+        "render_ms_per_page": round(stats["render_seconds"] * 1000 / images, 2),
+        "preprocess_ms_per_page": round(stats["preprocess_seconds"] * 1000 / images, 2),
+        "encode_ms_per_page": round(stats["encode_seconds"] * 1000 / images, 2),
+        "payload_bytes": stats["encoded_bytes"],
+        "payload_bytes_per_page": stats["bytes_per_page"],
+        "peak_rss_mb": stats["peak_rss_mb"],
+    }
+
+
+def run_case(pdf_path: str, endpoint: str, dpi: int, workers: int, verbose: bool = False) -> dict:
+    """
+    Run one benchmark case in the current process: a cold run, then a warm (cached) run
+
+    Runs in a fresh child process so peak RSS is per case.
+    """
+    from openai import AzureOpenAI
+    from config import Config
+    from modules.azure_vision_ocr import AzureVisionOCR, AdaptiveConcurrencyLimiter
+
+    ocr = AzureVisionOCR()
+    ocr.client = AzureOpenAI(api_key="benchmark", api_version=Config.AZURE_OPENAI_API_VERSION,
+                             azure_endpoint=endpoint, max_retries=0)
+    ocr.concurrency = AdaptiveConcurrencyLimiter(initial=workers, maximum=workers)
+    ocr.max_workers = workers
+    ocr.dpi = dpi
+    ocr.cache_dir = Path(tempfile.mkdtemp(prefix="brd_ocr_bench_cache_"))
+    ocr.write_searchable_pdf = False
+    ocr.local_ocr_enabled = False
+
+    runs = {}
+    for run_name in ("cold", "warm"):
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            for _ in ocr.iter_pdf_pages(pdf_path):
+                pass
+        runs[run_name] = _run_metrics(ocr.last_run_stats)
+
+    if resource is not None:
+        # ru_maxrss is KB on Linux, bytes on macOS
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        runs["process_peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor, 1)
+    return runs
+
+
+def _git_revision() -> str:
+    """Short commit hash of the benchmarked tree, if available"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AzureVisionOCR throughput against a fake Vision endpoint")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 500], help="Synthetic PDF sizes")
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 16], help="Concurrent Vision calls")
+    parser.add_argument("--dpi", type=int, nargs="+", default=[150, 250], help="Render resolutions")
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated seconds per Vision call")
+    parser.add_argument("--latency-per-image", type=float, default=0.05, help="Extra simulated seconds per image")
+    parser.add_argument("--work-dir", default=None, help="Where synthetic PDFs are kept (reused between runs)")
+    parser.add_argument("--output", default=None, help="JSON results path (default: print only)")
+    parser.add_argument("--verbose", action="store_true", help="Show OCR pipeline output")
+    args = parser.parse_args()
+
+    work_dir = Path(args.work_dir or Path(tempfile.gettempdir()) / "brd_ocr_benchmark")
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    server = start_fake_endpoint(args.latency, args.latency_per_image)
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"🧪 Fake Vision endpoint at {endpoint}")
+
+    results = {
+        "benchmark": "ocr_throughput",
+        "revision": _git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "settings": {"latency": args.latency, "latency_per_image": args.latency_per_image},
+        "cases": [],
+    }
+
+    context = multiprocessing.get_context("spawn")
+    try:
+        for page_count in args.pages:
+            pdf_path = work_dir / f"scanned_{page_count}.pdf"
+            if not pdf_path.exists():
+                print(f"📄 Generating {page_count}-page synthetic scan...")
+                make_scanned_pdf(pdf_path, page_count)
+
+            for dpi in args.dpi:
+                for workers in args.workers:
+                    with context.Pool(1) as pool:
+                        runs = pool.apply(run_case, (str(pdf_path), endpoint, dpi, workers, args.verbose))
+                    case = {"pages": page_count, "dpi": dpi, "workers": workers, **runs}
+                    results["cases"].append(case)
+
+                    cold = runs["cold"]
+                    print(f"  {page_count:>4} pages @ {dpi} dpi, {workers:>2} workers: "
+                          f"{cold['pages_per_sec']:>6} pages/s cold, {cold['wall_time_s']:.1f}s, "
+                          f"{cold['payload_bytes_per_page'] / 1024:.1f} KB/page, "
+                          f"render {cold['render_ms_per_page']} ms, preprocess {cold['preprocess_ms_per_page']} ms, "
+                          f"encode {cold['encode_ms_per_page']} ms, "
+                          f"warm cache hit rate {runs['warm']['cache_hit_rate']:.0%}")
+    finally:
+        server.shutdown()
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+        print(f"💾 Saved results to {args.output}")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+PDF Text Extraction Benchmark
+Compares the old serial PyPDF2 text extraction with PyMuPDF extraction
+(plain text, and the full layout scan used by BRDParser) in-process and
+sharded across worker processes, on synthetic text-layer BRDs
+
+Usage:
+    python benchmarks/pdf_text_extraction.py
+    python benchmarks/pdf_text_extraction.py --pages 50 300 --workers 2 4 8 --output results.json
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+WORDS = ("system shall must user report export approve invoice meter customer account billing "
+         "outage notify dashboard audit login access record schedule payment request workflow").split()
+
+
+def make_text_pdf(pdf_path: Path, page_count: int, seed: int = 7):
+    """
+    Build a text-layer PDF resembling a BRD: numbered requirement paragraphs,
+    with a ruled requirements table on every fifth page
+    """
+    import fitz
+
+    rng = random.Random(seed)
+    with fitz.open() as pdf_document:
+        for page_num in range(page_count):
+            page = pdf_document.new_page(width=612, height=792)
+            y = 72
+            page.insert_text((72, y), f"Section {page_num + 1}: Requirements", fontsize=14)
+            y += 28
+
+            if page_num % 5 == 4:
+                # Ruled table: ID | Description | Priority
+                columns = (72, 140, 470, 540)
+                for row in range(12):
+                    cells = (f"FR-{page_num + 1}.{row}" if row else "ID",
+                             " ".join(rng.choice(WORDS) for _ in range(8)) if row else "Description",
+                             rng.choice(("High", "Medium", "Low")) if row else "Priority")
+                    for col, cell in enumerate(cells):
+                        page.insert_text((columns[col] + 4, y + 14), cell, fontsize=9)
+                    page.draw_rect(fitz.Rect(columns[0], y, columns[-1], y + 20), width=0.5)
+                    for x in columns[1:-1]:
+                        page.draw_line((x, y), (x, y + 20), width=0.5)
+                    y += 20
+                y += 20
+
+            while y < 720:
+                words = " ".join(rng.choice(WORDS) for _ in range(14))
+                page.insert_text((72, y), f"{page_num + 1}.{(y - 72) // 16} The {words}.", fontsize=10)
+                y += 16
+        pdf_document.save(str(pdf_path), deflate=True)
+
+
+def bench_pypdf2(pdf_path: str) -> dict:
+    """Previous BRDParser path: serial pure-Python PyPDF2 extract_text"""
+    import PyPDF2
+
+    start = time.perf_counter()
+    with open(pdf_path, 'rb') as file:
+        texts = [page.extract_text() or "" for page in PyPDF2.PdfReader(file).pages]
+    return {"seconds": round(time.perf_counter() - start, 3), "chars": sum(len(text) for text in texts)}
+
+
+def bench_pymupdf_text(pdf_path: str) -> dict:
+    """Plain PyMuPDF get_text, in-process (lower bound without layout analysis)"""
+    import fitz
+
+    start = time.perf_counter()
+    with fitz.open(pdf_path) as pdf_document:
+        texts = [page.get_text() for page in pdf_document]
+    return {"seconds": round(time.perf_counter() - start, 3), "chars": sum(len(text) for text in texts)}
+
+
+def bench_layout_scan(pdf_path: str, workers: int) -> dict:
+    """Current BRDParser path: table-aware scan_pdf_layout, sharded when workers > 1"""
+    from config import Config
+    from modules.pdf_layout import scan_pdf_layout
+
+    # Force the requested worker count regardless of document size
+    Config.PDF_TEXT_PARALLEL_MIN_PAGES = 2 if workers > 1 else sys.maxsize
+    start = time.perf_counter()
+    result = scan_pdf_layout(pdf_path, max_workers=workers)
+    return {
+        "seconds": round(time.perf_counter() - start, 3),
+        "chars": sum(len(text) for text in result["page_texts"]),
+        "table_pages": len(result["table_pages"]),
+    }
+
+
+def _git_revision() -> str:
+    """Short commit hash of the benchmarked tree, if available"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF text-layer extraction (PyPDF2 vs PyMuPDF)")
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 300, 1000], help="Synthetic PDF sizes")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8], help="Worker processes for PyMuPDF")
+    parser.add_argument("--work-dir", default=None, help="Where synthetic PDFs are kept (reused between runs)")
+    parser.add_argument("--output", default=None, help="JSON results path (default: print only)")
+    args = parser.parse_args()
+
+    work_dir = Path(args.work_dir or Path(tempfile.gettempdir()) / "brd_pdf_text_benchmark")
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        import PyPDF2  # noqa: F401
+        has_pypdf2 = True
+    except ImportError:
+        print("⚠️ PyPDF2 not installed, skipping the baseline")
+        has_pypdf2 = False
+
+    results = {
+        "benchmark": "pdf_text_extraction",
+        "revision": _git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "cases": [],
+    }
+
+    for page_count in args.pages:
+        pdf_path = work_dir / f"text_{page_count}.pdf"
+        if not pdf_path.exists():
+            print(f"📄 Generating {page_count}-page synthetic BRD...")
+            make_text_pdf(pdf_path, page_count)
+
+        case = {"pages": page_count, "pymupdf_text": bench_pymupdf_text(str(pdf_path)), "layout_scan": {}}
+        if has_pypdf2:
+            case["pypdf2"] = bench_pypdf2(str(pdf_path))
+        for workers in args.workers:
+            case["layout_scan"][str(workers)] = bench_layout_scan(str(pdf_path), workers)
+        results["cases"].append(case)
+
+        baseline = f"PyPDF2 {case['pypdf2']['seconds']}s, " if has_pypdf2 else ""
+        scans = ", ".join(f"{workers}w {scan['seconds']}s" for workers, scan in case["layout_scan"].items())
+        print(f"  {page_count:>5} pages: {baseline}PyMuPDF text {case['pymupdf_text']['seconds']}s, "
+              f"layout scan {scans}")
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+        print(f"💾 Saved results to {args.output}")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
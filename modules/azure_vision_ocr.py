@@ -5,15 +5,25 @@ High-performance OCR using GPT-4o Vision with parallel processing and caching
 import base64
 import io
 import hashlib
+import re
 import shelve
-import gc
+import threading
+import zipfile
+import os
+import time
+from collections import deque
 from pathlib import Path
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict, Iterator, Callable
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from openai import AzureOpenAI
-from PIL import Image, ImageEnhance, ImageFilter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from openai import AzureOpenAI, RateLimitError, APITimeoutError
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter, ImageOps, features
 from config import Config
+from modules.pdf_layout import analyze_page_layout, merge_in_reading_order
+from modules.local_ocr import LocalOCR
+from modules.searchable_pdf import file_sha256, write_searchable_pdf
+from modules.extraction_cache import is_failed_page
 
 # PDF library check
 try:
@@ -23,10 +33,262 @@ except ImportError:
     PDF_SUPPORT = False
     print("⚠️ PyMuPDF not installed. PDF OCR will not be available.")
 
+# Optional: accurate cross-platform memory readings
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Delimiters the model is asked to emit between pages (or page regions) of a packed request
+PAGE_DELIMITER_PATTERN = re.compile(r"^\s*=+\s*PAGE\s+(\d+)\s*=+\s*$", re.MULTILINE | re.IGNORECASE)
+REGION_DELIMITER_PATTERN = re.compile(r"^\s*=+\s*REGION\s+(\d+)\s*=+\s*$", re.MULTILINE | re.IGNORECASE)
+
+# Text recorded for pages skipped by the blank-page pre-pass
+BLANK_PAGE_TEXT = "[Blank page]"
+
+# Appended to a page whose transcription hit the output token limit (see extraction_cache.FAILED_PAGE_MARKERS)
+TRUNCATED_PAGE_MARKER = "[OCR truncated - page exceeded the output limit]"
+
+# WebP support depends on how Pillow was built
+WEBP_SUPPORT = features.check("webp")
+
+# Vision detail level per page class: text needs full resolution, blanks do not
+DETAIL_BY_CONTENT_TYPE = {"text": "high", "photo": "auto", "blank": "low"}
+
+
+def _current_rss_mb() -> float:
+    """Resident set size of this process in MB (0.0 if it cannot be read)"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit for Vision calls
+    
+    The limit grows by roughly one slot per window of successful calls while
+    latency stays within tolerance of its running average, and is cut
+    multiplicatively on throttling (429) or timeouts.
+    """
+    
+    def __init__(self, initial: int = 3, minimum: int = 1, maximum: int = 16,
+                 decrease_factor: float = 0.5, latency_tolerance: float = 1.5):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self._limit = float(min(max(initial, self.minimum), self.maximum))
+        self._in_flight = 0
+        self._latency_avg = None
+        self._condition = threading.Condition()
+    
+    @property
+    def limit(self) -> int:
+        """Current number of concurrent calls allowed"""
+        return int(self._limit)
+    
+    def has_capacity(self) -> bool:
+        """Whether a call could start now without waiting for a slot"""
+        with self._condition:
+            return self._in_flight < int(self._limit)
+    
+    def acquire(self):
+        """Block until a call slot is available"""
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+    
+    def release(self, latency: Optional[float] = None, throttled: bool = False):
+        """Return a call slot and adjust the limit from the call outcome"""
+        with self._condition:
+            self._in_flight -= 1
+            
+            if throttled:
+                # Multiplicative decrease
+                self._limit = max(self.minimum, self._limit * self.decrease_factor)
+                print(f"  🐢 Vision throttled, concurrency reduced to {self.limit}")
+            elif latency is not None:
+                if self._latency_avg is None or latency <= self._latency_avg * self.latency_tolerance:
+                    # Additive increase: +1 slot per full window of successes
+                    self._limit = min(self.maximum, self._limit + 1.0 / self._limit)
+                
+                # Exponential moving average of call latency
+                if self._latency_avg is None:
+                    self._latency_avg = latency
+                else:
+                    self._latency_avg = 0.8 * self._latency_avg + 0.2 * latency
+            
+            self._condition.notify_all()
+
+
+# Shared by every AzureVisionOCR instance so concurrent sessions split one ceiling
+VISION_CONCURRENCY = AdaptiveConcurrencyLimiter(
+    initial=Config.OCR_INITIAL_CONCURRENCY,
+    maximum=Config.OCR_MAX_CONCURRENCY
+)
+
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp', '.webp', '.gif'}
+ARCHIVE_EXTENSIONS = {'.zip'}
+
+# Persistent OCR cache (results, page fingerprints, searchable PDFs), shared by all sessions
+OCR_CACHE_DIR = Path.home() / ".brd_ocr_cache"
+
+
+def _natural_sort_key(name: str):
+    """Sort key that orders page_2.jpg before page_10.jpg"""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', name)]
+
+
+class PdfPageSource:
+    """Pages of a PDF rendered with PyMuPDF"""
+    
+    def __init__(self, pdf_path: str, native_texts: Optional[Dict[int, str]] = None,
+                 sha256: Optional[str] = None):
+        self.path = Path(pdf_path)
+        self.document = fitz.open(pdf_path)
+        self.native_texts = native_texts or {}  # Pages whose text layer was already read by the caller
+        # Uploads are hashed once on upload (pass that hash, or the upload itself); other files are hashed here
+        self.sha256 = sha256 or getattr(pdf_path, "sha256", None) or file_sha256(pdf_path)
+    
+    def __len__(self) -> int:
+        return len(self.document)
+    
+    def cache_key(self, page_num: int) -> str:
+        """Cache key from file content and page number, so copies, re-uploads and touched files still hit"""
+        return hashlib.md5(f"pdf_{self.sha256}_{page_num}".encode()).hexdigest()
+    
+    def render(self, page_num: int, dpi: int) -> Image.Image:
+        """Render a page to an RGB image"""
+        mat = fitz.Matrix(dpi / 72, dpi / 72)
+        pix = self.document[page_num].get_pixmap(matrix=mat, alpha=False)
+        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        del pix  # Release the pixmap as soon as its samples are copied
+        return img
+    
+    def render_gray(self, page_num: int, dpi: int) -> np.ndarray:
+        """Render a page to a grayscale NumPy array"""
+        mat = fitz.Matrix(dpi / 72, dpi / 72)
+        pix = self.document[page_num].get_pixmap(matrix=mat, colorspace=fitz.csGRAY, alpha=False)
+        return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width].copy()
+    
+    def render_clip(self, page_num: int, bbox: Tuple[float, float, float, float], dpi: int) -> Image.Image:
+        """Render only a rectangular region of a page to an RGB image"""
+        mat = fitz.Matrix(dpi / 72, dpi / 72)
+        pix = self.document[page_num].get_pixmap(matrix=mat, clip=fitz.Rect(bbox), alpha=False)
+        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        del pix
+        return img
+    
+    def layout(self, page_num: int) -> dict:
+        """Native text blocks and image regions of a page (see pdf_layout.analyze_page_layout)"""
+        return analyze_page_layout(self.document[page_num])
+    
+    def has_text(self, page_num: int) -> bool:
+        """Whether a page has any text in its text layer"""
+        return bool(self.document[page_num].get_text().strip())
+    
+    def close(self):
+        self.document.close()
+
+
+class ImagePageSource:
+    """
+    Ordered pages from image files, folders and ZIP archives
+    
+    Folders and archive members are ordered by natural filename order and
+    every frame of a multi-frame TIFF becomes its own page. Images are read
+    lazily, one page at a time.
+    """
+    
+    def __init__(self, sources: List[str]):
+        self._archives = {}  # archive path -> open ZipFile
+        self._pages = []  # (archive path or None, file path or member name, frame, content digest)
+        for source in sources:
+            self._add_source(Path(source))
+    
+    def _add_source(self, path: Path):
+        """Expand a file, folder or archive into pages"""
+        if path.is_dir():
+            children = [
+                child for child in path.iterdir()
+                if child.is_file() and child.suffix.lower() in IMAGE_EXTENSIONS | ARCHIVE_EXTENSIONS
+            ]
+            for child in sorted(children, key=lambda child: _natural_sort_key(child.name)):
+                self._add_source(child)
+        elif path.suffix.lower() in ARCHIVE_EXTENSIONS:
+            archive = zipfile.ZipFile(path)
+            self._archives[str(path)] = archive
+            members = [
+                name for name in archive.namelist()
+                if not name.endswith('/') and not name.startswith('__MACOSX/')
+                and Path(name).suffix.lower() in IMAGE_EXTENSIONS
+            ]
+            for name in sorted(members, key=_natural_sort_key):
+                self._add_frames(str(path), name, archive.read(name))
+        elif path.suffix.lower() in IMAGE_EXTENSIONS:
+            self._add_frames(None, str(path), path.read_bytes())
+        else:
+            print(f"  ⚠️ Skipping unsupported file: {path.name}")
+    
+    def _add_frames(self, archive_path: Optional[str], name: str, data: bytes):
+        """Register one page per image frame"""
+        digest = hashlib.md5(data).hexdigest()
+        with Image.open(io.BytesIO(data)) as img:
+            frame_count = getattr(img, "n_frames", 1)
+        for frame in range(frame_count):
+            self._pages.append((archive_path, name, frame, digest))
+    
+    def __len__(self) -> int:
+        return len(self._pages)
+    
+    def cache_key(self, page_num: int) -> str:
+        """Cache key from image content and frame, so renamed copies still hit"""
+        _, _, frame, digest = self._pages[page_num]
+        return hashlib.md5(f"image_{digest}_{frame}".encode()).hexdigest()
+    
+    def _open_frame(self, page_num: int) -> Image.Image:
+        """Load a page's frame, upright according to its EXIF orientation"""
+        archive_path, name, frame, _ = self._pages[page_num]
+        if archive_path is None:
+            img = Image.open(name)
+        else:
+            img = Image.open(io.BytesIO(self._archives[archive_path].read(name)))
+        img.seek(frame)
+        return ImageOps.exif_transpose(img)
+    
+    def render(self, page_num: int, dpi: int) -> Image.Image:
+        """Load a page as RGB, capped to the size of a letter page at the given DPI"""
+        img = self._open_frame(page_num).convert("RGB")
+        img.thumbnail((int(11 * dpi), int(11 * dpi)), Image.LANCZOS)
+        return img
+    
+    def render_gray(self, page_num: int, dpi: int) -> np.ndarray:
+        """Load a page as a small grayscale array, scaled as a letter page at the given DPI"""
+        img = self._open_frame(page_num)
+        img.draft("L", (int(8.5 * dpi), int(11 * dpi)))  # Fast JPEG downscale on decode
+        img = img.convert("L")
+        img.thumbnail((int(11 * dpi), int(11 * dpi)), Image.BILINEAR)
+        return np.asarray(img, dtype=np.uint8)
+    
+    def close(self):
+        for archive in self._archives.values():
+            archive.close()
+
 
 class AzureVisionOCR:
     """Azure OpenAI Vision OCR with parallel processing and smart caching"""
     
+    # Shelve is not safe for concurrent writers, serialize cache access across threads
+    _cache_lock = threading.Lock()
+    
     def __init__(self):
         """Initialize Azure Vision OCR client and cache"""
         self.client = AzureOpenAI(
@@ -37,28 +299,69 @@ class AzureVisionOCR:
         self.deployment = Config.AZURE_OPENAI_DEPLOYMENT
         
         # Cache setup
-        self.cache_dir = Path.home() / ".brd_ocr_cache"
+        self.cache_dir = OCR_CACHE_DIR
         self.cache_dir.mkdir(exist_ok=True)
         self.cache_enabled = True
+        self.write_searchable_pdf = Config.OCR_SEARCHABLE_PDF  # Save OCR text back as a PDF text layer
         
         # Performance settings
-        self.max_workers = 3  # Parallel threads (respects Azure rate limits)
+        self.concurrency = VISION_CONCURRENCY  # Process-wide AIMD limit (respects Azure rate limits)
+        self.max_workers = self.concurrency.maximum  # Thread ceiling, live calls are gated by the limiter
+        self.max_throttle_retries = 3
         self.dpi = 250  # Balanced quality/speed
+        self.page_max_tokens = 8000  # Output budget per page, the same for single and packed requests
+        # Pages packed per Vision call, only as many as fit the deployment's output limit at the full per-page budget
+        self.pages_per_request = max(1, min(Config.OCR_PAGES_PER_REQUEST,
+                                            Config.OCR_MAX_OUTPUT_TOKENS // self.page_max_tokens))
+        self.max_in_flight_pages = Config.OCR_MAX_IN_FLIGHT_PAGES  # Backpressure cap on rendered/pending pages
+        
+        # Layout-aware mode: keep native text and OCR only embedded image regions
+        self.layout_aware = True
+        self.min_native_chars = 50  # Text layer size that makes a page "native"
+        
+        # Local pre-pass that avoids OCR for blank and repeated pages
+        self.skip_blank_pages = True
+        self.detect_duplicate_pages = True
+        self.thumbnail_dpi = 100  # Grayscale render used for the blank check and page hashes
+        self.blank_ink_threshold = 0.00015  # Max fraction of inked pixels on a blank page (a lone page number)
+        
+        # Page classifier used to pick codec, colour depth and detail level
+        self.classifier_size = 160  # Longest side (pixels) of the sampled page
+        self.photo_midtone_threshold = 0.2  # Share of mid-tone pixels that marks a photo
+        
+        # Encoding: 1-bit adaptive threshold for monochrome text pages, fast zlib
+        self.binarize_text_pages = True
+        self.binarize_block_size = 32  # Background grid cell (pixels) for adaptive threshold
+        self.binarize_offset = 24  # How much darker than background counts as ink
+        self.png_compress_level = 1  # zlib level; optimize=True costs far more than it saves
+        
+        # Straggler hedging: duplicate requests that run far past the usual latency
+        self.hedge_enabled = Config.OCR_HEDGE_ENABLED
+        self.hedge_percentile = Config.OCR_HEDGE_PERCENTILE  # Per-page latency percentile that marks a straggler
+        self.hedge_max_fraction = Config.OCR_HEDGE_MAX_FRACTION  # Cap on hedged requests per run
+        self.hedge_min_delay = 5.0  # Never hedge a request younger than this (seconds)
+        self.hedge_min_samples = 5  # Completed requests needed before latencies are trusted
+        self.hedge_check_interval = 0.5  # Seconds between straggler checks
+        
+        # Local Tesseract tier: runs first, only low-confidence pages go to Vision
+        self.local_ocr_enabled = Config.LOCAL_OCR_ENABLED
+        self.local_ocr = None  # LocalOCR for the current run, if Tesseract is installed
+        
+        # PyMuPDF documents are not thread-safe; rendering one page at a time also
+        # bounds full-resolution bitmaps in memory to a single page
+        self._render_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._request_local = threading.local()  # Timing of the OCR request copy running on this worker thread
+        self.last_run_stats = {}
     
-    def _get_cache_key(self, file_path: str, page_num: int) -> str:
-        """Generate cache key from file path, modified time, and page number"""
-        file_stat = Path(file_path).stat()
-        cache_string = f"{file_path}_{file_stat.st_mtime}_{file_stat.st_size}_{page_num}"
-        return hashlib.md5(cache_string.encode()).hexdigest()
-    
-    def _get_cached_result(self, cache_key: str) -> Optional[str]:
+    def get_cached_result(self, cache_key: str) -> Optional[str]:
         """Retrieve cached OCR result if available"""
         if not self.cache_enabled:
             return None
         
         try:
             cache_file = self.cache_dir / "ocr_cache"
-            with shelve.open(str(cache_file)) as cache:
+            with self._cache_lock, shelve.open(str(cache_file)) as cache:
                 if cache_key in cache:
                     print(f"  💾 Cache hit!")
                     return cache[cache_key]
@@ -67,25 +370,70 @@ class AzureVisionOCR:
         
         return None
     
-    def _save_to_cache(self, cache_key: str, result: str):
-        """Save OCR result to persistent cache"""
-        if not self.cache_enabled:
+    def save_to_cache(self, cache_key: str, result: str):
+        """Save OCR result to persistent cache (failed pages are never cached)"""
+        if not self.cache_enabled or is_failed_page(result):
             return
         
         try:
             cache_file = self.cache_dir / "ocr_cache"
-            with shelve.open(str(cache_file)) as cache:
+            with self._cache_lock, shelve.open(str(cache_file)) as cache:
                 cache[cache_key] = result
         except Exception as e:
             print(f"  ⚠️ Cache write error: {e}")
     
+    def create_completion(self, **kwargs):
+        """
+        Call the Vision deployment under the shared adaptive concurrency limit
+        
+        When run for an OCR request (see _run_request), the call's start is
+        recorded once it holds a slot, so hedging never counts time spent
+        queued on the limiter, rendering or backing off.
+        """
+        timing = getattr(self._request_local, "timing", None)
+        for attempt in range(self.max_throttle_retries + 1):
+            self.concurrency.acquire()
+            self.record_stat("ocr_requests")
+            start_time = time.time()
+            if timing is not None:
+                timing["started"] = start_time
+            try:
+                response = self.client.chat.completions.create(model=self.deployment, **kwargs)
+            except (RateLimitError, APITimeoutError) as e:
+                self.concurrency.release(throttled=True)
+                if attempt == self.max_throttle_retries:
+                    raise
+                print(f"  ⏳ Vision call throttled ({type(e).__name__}), retrying...")
+                time.sleep(2 ** attempt)
+                continue
+            except Exception:
+                self.concurrency.release()
+                raise
+            finally:
+                if timing is not None:
+                    timing["call_seconds"] += time.time() - start_time
+                    timing["started"] = None
+            
+            self.concurrency.release(latency=time.time() - start_time)
+            return response
+    
     def _preprocess_image(self, img: Image.Image) -> Image.Image:
-        """Enhance image for better OCR accuracy"""
+        """
+        Enhance image for better OCR accuracy
+        
+        Monochrome text pages are binarized to 1-bit, which is both cleaner
+        for OCR and far cheaper to encode. Photos and colourful pages keep
+        their colour and get the contrast/sharpen pass.
+        """
         # Auto-crop whitespace
-        bbox = img.getbbox()
+        bbox = ImageOps.invert(img.convert("L")).getbbox()
         if bbox:
             img = img.crop(bbox)
         
+        classification = self._classify_page_content(img)
+        if self.binarize_text_pages and classification["content_type"] == "text" and not classification["colorful"]:
+            return self._binarize(img)
+        
         # Enhance contrast for better text visibility
         enhancer = ImageEnhance.Contrast(img)
         img = enhancer.enhance(1.2)
@@ -95,79 +443,238 @@ class AzureVisionOCR:
         
         return img
     
-    def _detect_page_content_type(self, img: Image.Image) -> str:
-        """Detect if page is text-heavy or image-heavy"""
-        # Simple heuristic: check color variation
-        # Text pages typically have less color variation
-        extrema = img.convert('L').getextrema()
-        variation = extrema[1] - extrema[0]
+    def _binarize(self, img: Image.Image) -> Image.Image:
+        """
+        Adaptive threshold to a 1-bit image
+        
+        The local background is estimated on a coarse grid (box average) and
+        upsampled, so uneven lighting and scan shading do not swallow text.
+        A pixel is ink when it is noticeably darker than its background.
+        """
+        gray = img.convert("L")
+        block = self.binarize_block_size
+        coarse = gray.resize((max(1, gray.width // block), max(1, gray.height // block)), Image.BOX)
+        background = np.asarray(coarse.resize(gray.size, Image.BILINEAR), dtype=np.int16)
         
-        return "text" if variation < 200 else "image"
+        ink = np.asarray(gray, dtype=np.int16) < background - self.binarize_offset
+        return Image.fromarray(~ink)
     
-    def _encode_image_optimized(self, img: Image.Image, content_type: str = "text") -> Tuple[bytes, str]:
-        """Encode image with adaptive compression based on content"""
+    def _classify_page_content(self, img: Image.Image) -> dict:
+        """
+        Classify a page as text, photo or blank from a downsampled histogram
+        
+        Text pages are bimodal (paper plus dark ink), photos and shaded
+        diagrams have a large share of mid-tones, and blank pages have almost
+        no ink. Nearest-neighbour sampling keeps this well under a millisecond.
+        
+        Returns:
+            Dict with content_type ("text"/"photo"/"blank"), colorful, ink and midtones
+        """
+        scale = max(1, max(img.size) // self.classifier_size)
+        small = img.resize((max(1, img.width // scale), max(1, img.height // scale)), Image.NEAREST)
+        rgb = small.convert("RGB")
+        gray = np.asarray(rgb.convert("L"))
+        
+        histogram = np.bincount(gray.ravel(), minlength=256)
+        cumulative = np.cumsum(histogram) / gray.size
+        paper = int(np.searchsorted(cumulative, 0.9))  # 90th percentile brightness
+        
+        ink = float(cumulative[max(0, paper - 48)])
+        midtones = float(cumulative[min(paper - 24, 200)] - cumulative[55]) if paper > 80 else 1.0
+        red, green, blue = (np.asarray(channel, dtype=np.int16) for channel in rgb.split())
+        colorful = bool((np.abs(red - green) + np.abs(green - blue)).mean() > 12)
+        
+        if ink < self.blank_ink_threshold:
+            content_type = "blank"
+        elif midtones > self.photo_midtone_threshold:
+            content_type = "photo"
+        else:
+            content_type = "text"
+        
+        return {"content_type": content_type, "colorful": colorful, "ink": ink, "midtones": midtones}
+    
+    def _encode_image_optimized(self, img: Image.Image, classification: dict) -> Tuple[io.BytesIO, str]:
+        """
+        Encode image with codec and colour depth chosen from its classification
+        
+        Binarized pages go out as 1-bit PNG, other text pages as grayscale
+        PNG or a 16-colour palette when colour carries meaning (highlights,
+        RAG status). Photos use WebP (JPEG if Pillow lacks WebP), in
+        grayscale unless the page is colourful. Blank pages use a small
+        grayscale JPEG. PNG uses fast zlib settings instead of optimize.
+        
+        Returns:
+            (buffer holding the encoded image, mime type)
+        """
         buffer = io.BytesIO()
+        content_type = classification["content_type"]
+        colorful = classification["colorful"]
         
-        if content_type == "text":
+        if img.mode == "1" or content_type == "text":
             # PNG for text-heavy pages (lossless)
-            img.save(buffer, format='PNG', optimize=True)
+            if img.mode == "1":
+                pass
+            elif colorful:
+                img = img.convert("RGB").quantize(colors=16, method=Image.Quantize.FASTOCTREE)
+            else:
+                img = img.convert("L")
+            img.save(buffer, format='PNG', compress_level=self.png_compress_level)
             mime_type = "image/png"
+        elif content_type == "photo" and WEBP_SUPPORT:
+            img = img.convert("RGB" if colorful else "L")
+            img.save(buffer, format='WEBP', quality=80, method=0)
+            mime_type = "image/webp"
         else:
-            # JPEG for image-heavy pages (smaller size)
-            img.save(buffer, format='JPEG', quality=90, optimize=True)
+            # JPEG for photos and near-empty pages (smaller size)
+            img = img.convert("RGB" if colorful and content_type == "photo" else "L")
+            quality = 85 if content_type == "photo" else 60
+            img.save(buffer, format='JPEG', quality=quality)
             mime_type = "image/jpeg"
         
-        buffer.seek(0)
-        image_data = buffer.getvalue()
-        return image_data, mime_type
+        return buffer, mime_type
+    
+    def _encode_data_url(self, buffer: io.BytesIO, mime_type: str) -> str:
+        """
+        Base64-encode an image buffer into a data URL in chunks
+        
+        Chunks are multiples of 3 bytes so they concatenate into valid
+        base64; this avoids holding a copy of the raw bytes and a second
+        full-size bytes object alongside the final string.
+        """
+        chunk_size = 3 * 65536
+        parts = [f"data:{mime_type};base64,"]
+        with buffer.getbuffer() as view:
+            for start in range(0, len(view), chunk_size):
+                parts.append(base64.b64encode(view[start:start + chunk_size]).decode("ascii"))
+        buffer.close()
+        return "".join(parts)
     
-    def _extract_page_with_cache(self, pdf_document, page_num: int, total_pages: int, 
-                                  file_path: str, debug: bool = False, debug_dir: Path = None) -> str:
-        """Extract text from a single PDF page with caching"""
-        cache_key = self._get_cache_key(file_path, page_num)
+    def _render_page_image(self, pages, page_num: int,
+                           debug: bool = False, debug_dir: Path = None) -> Image.Image:
+        """Render a page to a preprocessed PIL image"""
+        start_time = time.perf_counter()
+        with self._render_lock:
+            img = pages.render(page_num, self.dpi)
+        self._sample_rss()
+        rendered_time = time.perf_counter()
+        self.record_stat("render_seconds", rendered_time - start_time)
+        
+        # Preprocess image for better accuracy
+        img = self._preprocess_image(img)
+        self.record_stat("preprocess_seconds", time.perf_counter() - rendered_time)
+        
+        # Save debug image if requested
+        if debug and debug_dir:
+            debug_path = debug_dir / f"page_{page_num + 1}.png"
+            img.save(debug_path, format='PNG')
+            print(f"  💾 Saved debug image: {debug_path}")
+        
+        return img
+    
+    def _encode_page_payload(self, img: Image.Image) -> dict:
+        """
+        Encode a page image for the Vision API
+        
+        Returns:
+            Dict with content (the image_url message part), size (encoded
+            bytes), mime_type and content_type
+        """
+        start_time = time.perf_counter()
+        classification = self._classify_page_content(img)
+        buffer, mime_type = self._encode_image_optimized(img, classification)
+        image_size = buffer.getbuffer().nbytes
+        data_url = self._encode_data_url(buffer, mime_type)
+        
+        self.record_stat("encoded_bytes", image_size)
+        self.record_stat("encoded_images")
+        self.record_stat("encode_seconds", time.perf_counter() - start_time)
+        
+        return {
+            "content": {
+                "type": "image_url",
+                "image_url": {
+                    "url": data_url,
+                    "detail": DETAIL_BY_CONTENT_TYPE[classification["content_type"]]
+                }
+            },
+            "size": image_size,
+            "mime_type": mime_type,
+            "content_type": classification["content_type"],
+        }
+    
+    def _clean_page_text(self, page_text: str) -> str:
+        """Strip model commentary that sometimes precedes the transcription"""
+        page_text = page_text.strip()
+        invalid_starts = [
+            "here is", "the text", "this document", "this page",
+            "i can see", "the image", "this is", "based on",
+            "extracted text", "the content", "from the"
+        ]
+        
+        if any(page_text.lower().startswith(start) for start in invalid_starts):
+            print(f"  ⚠️ Detected commentary, extracting pure text...")
+            lines = page_text.split('\n')
+            page_text = '\n'.join(lines[1:]) if len(lines) > 1 else page_text
+        
+        return page_text
+    
+    def _split_delimited_response(self, response_text: str, pattern: re.Pattern,
+                                  expected: set) -> Dict[int, str]:
+        """Split a packed response on numbered delimiters, keyed by the delimiter number"""
+        parts = pattern.split(response_text)
+        
+        # parts = [preamble, number, text, number, text, ...]
+        texts = {}
+        for i in range(1, len(parts) - 1, 2):
+            number = int(parts[i])
+            if number in expected:
+                texts[number] = self._clean_page_text(parts[i + 1])
+        
+        return texts
+    
+    def _split_packed_response(self, response_text: str, page_nums: List[int],
+                               truncated: bool = False) -> Dict[int, str]:
+        """
+        Split a packed multi-page response on its page delimiters
+        
+        Only pages whose text is known to be complete are returned. The
+        delimiters must appear once each and in page order, otherwise nothing
+        is trusted. The last delimited page is dropped when a later page has
+        no delimiter (its text may run into the next page) or the response
+        was cut off at the token limit.
+        """
+        expected = [page_num + 1 for page_num in page_nums]
+        delimited = [int(number) for number in PAGE_DELIMITER_PATTERN.findall(response_text)]
+        if delimited != expected[:len(delimited)]:
+            return {}
+        
+        page_texts = self._split_delimited_response(response_text, PAGE_DELIMITER_PATTERN, set(expected))
+        if delimited and (truncated or len(delimited) < len(expected)):
+            page_texts.pop(delimited[-1], None)
+        return {page_number - 1: text for page_number, text in page_texts.items()}
+    
+    def _extract_page_with_cache(self, pages, page_num: int, total_pages: int,
+                                 debug: bool = False, debug_dir: Path = None) -> str:
+        """Extract text from a single page with caching"""
+        cache_key = pages.cache_key(page_num)
         
         # Check cache first
-        cached_result = self._get_cached_result(cache_key)
+        cached_result = self.get_cached_result(cache_key)
         if cached_result:
             return cached_result
         
         print(f"🔍 Processing page {page_num + 1}/{total_pages} with Azure Vision OCR...")
         
         try:
-            # Get the page
-            page = pdf_document[page_num]
-            
-            # Render page to image
-            mat = fitz.Matrix(self.dpi/72, self.dpi/72)
-            pix = page.get_pixmap(matrix=mat, alpha=False)
+            img = self._render_page_image(pages, page_num, debug, debug_dir)
+            payload = self._encode_page_payload(img)
+            del img
             
-            # Convert to PIL Image
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            
-            # Clear pixmap to free memory
-            pix = None
-            gc.collect()
-            
-            # Preprocess image for better accuracy
-            img = self._preprocess_image(img)
-            
-            # Save debug image if requested
-            if debug and debug_dir:
-                debug_path = debug_dir / f"page_{page_num + 1}.png"
-                img.save(debug_path, format='PNG')
-                print(f"  💾 Saved debug image: {debug_path}")
-            
-            # Detect content type and encode accordingly
-            content_type = self._detect_page_content_type(img)
-            image_data, mime_type = self._encode_image_optimized(img, content_type)
-            base64_image = base64.b64encode(image_data).decode('utf-8')
-            
-            print(f"  📤 Image: {len(image_data) / 1024:.1f} KB ({content_type} page, {mime_type})")
+            print(f"  📤 Image: {payload['size'] / 1024:.1f} KB ({payload['content_type']} page, {payload['mime_type']})")
             
             # Extract text using Azure OpenAI Vision
             try:
-                response = self.client.chat.completions.create(
-                    model=self.deployment,
+                response = self.create_completion(
                     messages=[
                         {
                             "role": "user",
@@ -176,38 +683,26 @@ class AzureVisionOCR:
                                     "type": "text",
                                     "text": f"Extract all text from page {page_num + 1} of this business requirements document. Include tables, requirements, and technical specifications."
                                 },
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:{mime_type};base64,{base64_image}"
-                                    }
-                                }
+                                payload["content"]
                             ]
                         }
                     ],
                     temperature=0.0,
-                    max_tokens=8000
+                    max_tokens=self.page_max_tokens
                 )
                 
-                page_text = response.choices[0].message.content.strip()
-                
-                # Validate and clean response
-                invalid_starts = [
-                    "here is", "the text", "this document", "this page",
-                    "i can see", "the image", "this is", "based on",
-                    "extracted text", "the content", "from the"
-                ]
+                page_text = self._clean_page_text(response.choices[0].message.content)
                 
-                if any(page_text.lower().startswith(start) for start in invalid_starts):
-                    print(f"  ⚠️ Detected commentary, extracting pure text...")
-                    lines = page_text.split('\n')
-                    page_text = '\n'.join(lines[1:]) if len(lines) > 1 else page_text
+                # A page cut off at the output limit is kept for this run but never cached
+                if response.choices[0].finish_reason == "length":
+                    print(f"  ⚠️ Page {page_num + 1}: transcription cut off at {self.page_max_tokens} tokens")
+                    return f"{page_text}\n\n{TRUNCATED_PAGE_MARKER}"
                 
                 print(f"  ✅ Page {page_num + 1}: Extracted {len(page_text)} characters")
                 print(f"  📝 Preview: {page_text[:100]}...")
                 
                 # Save to cache
-                self._save_to_cache(cache_key, page_text)
+                self.save_to_cache(cache_key, page_text)
                 
                 return page_text
                 
@@ -221,59 +716,783 @@ class AzureVisionOCR:
             print(f"  ❌ {error_msg}")
             return f"--- Page {page_num + 1} ---\n[Rendering failed]"
     
-    def extract_text_from_image(self, image_path: str) -> str:
-        """Extract text from a single image file"""
+    def _extract_packed_pages(self, pages, page_nums: List[int], total_pages: int,
+                              debug: bool = False, debug_dir: Path = None) -> Dict[int, str]:
+        """
+        Extract text from several pages in a single Vision request
+        
+        Pages are sent as consecutive images, each introduced by a page label.
+        The model is asked to prefix each transcription with a delimiter line,
+        and the response is split back into per-page cache entries. Each page
+        gets the same output budget as a single-page request; pages the model
+        fails to delimit, or that may have been cut off, are not cached and
+        are retried individually.
+        
+        Args:
+            pages: Page source (PdfPageSource or ImagePageSource)
+            page_nums: Zero-based page numbers to pack into one request
+            total_pages: Total number of pages in the document
+            debug: Save intermediate images for debugging
+            debug_dir: Directory for debug images
+            
+        Returns:
+            Dict mapping page number to extracted text
+        """
+        if len(page_nums) == 1:
+            page_num = page_nums[0]
+            return {page_num: self._extract_page_with_cache(
+                pages, page_num, total_pages, debug, debug_dir
+            )}
+        
+        labels = ", ".join(str(page_num + 1) for page_num in page_nums)
+        print(f"🔍 Processing pages {labels}/{total_pages} in one Azure Vision OCR request...")
+        
+        page_texts = {}
         try:
-            with Image.open(image_path) as img:
-                # Convert to RGB if necessary
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Preprocess
-                img = self._preprocess_image(img)
-                
-                # Detect content and encode
-                content_type = self._detect_page_content_type(img)
-                image_data, mime_type = self._encode_image_optimized(img, content_type)
-                base64_image = base64.b64encode(image_data).decode('utf-8')
-                
-                # Call Azure OpenAI Vision API
-                response = self.client.chat.completions.create(
-                    model=self.deployment,
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": "Extract all text from this image. Include tables and formatted content."
-                                },
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:{mime_type};base64,{base64_image}"
-                                    }
-                                }
-                            ]
-                        }
-                    ],
-                    temperature=0.0,
-                    max_tokens=8000
+            content = [{
+                "type": "text",
+                "text": (
+                    f"Extract all text from the following {len(page_nums)} pages of this business "
+                    "requirements document. Include tables, requirements, and technical specifications. "
+                    "Transcribe each page separately and begin each page with a line containing exactly "
+                    "'=== PAGE <number> ===' using the page number given before its image."
                 )
+            }]
+            total_size = 0
+            for page_num in page_nums:
+                img = self._render_page_image(pages, page_num, debug, debug_dir)
+                payload = self._encode_page_payload(img)
+                del img
+                total_size += payload["size"]
+                content.append({"type": "text", "text": f"Page {page_num + 1}:"})
+                content.append(payload["content"])
+            
+            print(f"  📤 Images: {total_size / 1024:.1f} KB across {len(page_nums)} pages")
+            
+            response = self.create_completion(
+                messages=[{"role": "user", "content": content}],
+                temperature=0.0,
+                max_tokens=self.page_max_tokens * len(page_nums)
+            )
+            content = None  # Drop the base64 payloads before parsing the response
+            
+            truncated = response.choices[0].finish_reason == "length"
+            if truncated:
+                print(f"  ⚠️ Packed response for pages {labels} cut off at the token limit")
+            page_texts = self._split_packed_response(
+                response.choices[0].message.content, page_nums, truncated
+            )
+            for page_num, page_text in page_texts.items():
+                self.save_to_cache(pages.cache_key(page_num), page_text)
+            
+            print(f"  ✅ Pages {labels}: Extracted {sum(len(t) for t in page_texts.values())} characters")
+            
+        except Exception as e:
+            print(f"  ❌ Packed OCR failed for pages {labels}: {str(e)}")
+        
+        # Fall back to single-page requests for anything not cleanly delimited or cut off
+        for page_num in page_nums:
+            if page_num not in page_texts:
+                print(f"  ⚠️ Page {page_num + 1} missing or incomplete in packed response, retrying alone...")
+                page_texts[page_num] = self._extract_page_with_cache(
+                    pages, page_num, total_pages, debug, debug_dir
+                )
+        
+        return page_texts
+    
+    def _request_regions(self, pages, page_num: int, regions: Dict[int, Tuple[float, float, float, float]],
+                         debug: bool = False, debug_dir: Path = None) -> Dict[int, str]:
+        """
+        OCR image regions of a page in one multi-image request
+        
+        Args:
+            pages: Page source providing render_clip
+            page_num: Zero-based page number
+            regions: Region number -> bbox of the regions to send
+            debug: Save intermediate images for debugging
+            debug_dir: Directory for debug images
+        
+        Returns:
+            Region number -> text, for regions whose text is known to be
+            complete (a region cut off at the token limit is left out)
+        """
+        content = [{
+            "type": "text",
+            "text": (
+                f"The following {len(regions)} images are cropped from page {page_num + 1} of a business "
+                "requirements document. Extract all text from each image, including tables and labels. "
+                "Begin each image's text with a line containing exactly '=== REGION <number> ===' "
+                "using the region number given before the image."
+            )
+        }]
+        total_size = 0
+        for index, bbox in regions.items():
+            with self._render_lock:
+                img = pages.render_clip(page_num, bbox, self.dpi)
+            img = self._preprocess_image(img)
+            if debug and debug_dir:
+                img.save(debug_dir / f"page_{page_num + 1}_region_{index}.png", format='PNG')
+            payload = self._encode_page_payload(img)
+            del img
+            total_size += payload["size"]
+            content.append({"type": "text", "text": f"Region {index}:"})
+            content.append(payload["content"])
+        
+        print(f"  📤 Regions: {total_size / 1024:.1f} KB")
+        
+        response = self.create_completion(
+            messages=[{"role": "user", "content": content}],
+            temperature=0.0,
+            max_tokens=self.page_max_tokens
+        )
+        content = None
+        
+        response_text = response.choices[0].message.content
+        truncated = response.choices[0].finish_reason == "length"
+        region_texts = self._split_delimited_response(response_text, REGION_DELIMITER_PATTERN, set(regions))
+        delimited = [int(number) for number in REGION_DELIMITER_PATTERN.findall(response_text)]
+        if not delimited and len(regions) == 1 and not truncated:
+            region_texts = {next(iter(regions)): self._clean_page_text(response_text)}
+        elif truncated and delimited:
+            # The last region in the response may have been cut off mid-text
+            region_texts.pop(delimited[-1], None)
+        return region_texts
+    
+    def _extract_page_regions(self, pages, page_num: int, layout: dict, total_pages: int,
+                              debug: bool = False, debug_dir: Path = None) -> Dict[int, str]:
+        """
+        OCR only the image regions of a page that already has a text layer
+        
+        Native text blocks are kept as-is; the image regions are cropped and
+        sent in one multi-image request, and the results are merged back with
+        the text blocks in reading order. Regions missing from the response,
+        or cut off at the token limit, are retried one request each; if any
+        is still missing the page is marked as failed and not cached.
+        
+        Args:
+            pages: Page source providing render_clip
+            page_num: Zero-based page number
+            layout: Result of pages.layout(page_num)
+            total_pages: Total number of pages in the document
+            debug: Save intermediate images for debugging
+            debug_dir: Directory for debug images
+            
+        Returns:
+            Dict mapping page number to merged page text
+        """
+        regions = dict(enumerate(layout["image_regions"], start=1))
+        print(f"🔍 Processing {len(regions)} image region(s) on page {page_num + 1}/{total_pages} with Azure Vision OCR...")
+        
+        items = list(layout["text_blocks"])
+        region_texts = {}
+        try:
+            region_texts = self._request_regions(pages, page_num, regions, debug, debug_dir)
+            missing = [index for index in regions if index not in region_texts]
+            if missing and len(regions) > 1:
+                print(f"  🔁 Retrying region(s) {', '.join(map(str, missing))} on page {page_num + 1} one at a time")
+                for index in missing:
+                    region_texts.update(self._request_regions(pages, page_num, {index: regions[index]}, debug, debug_dir))
+            self.record_stat("image_regions_ocr", len(regions))
+        except Exception as e:
+            print(f"  ❌ Region OCR failed for page {page_num + 1}: {str(e)}")
+            items += [(regions[index], text) for index, text in region_texts.items()]
+            return {page_num: merge_in_reading_order(items) + f"\n\n[Image OCR failed - {str(e)}]"}
+        
+        items += [(regions[index], text) for index, text in region_texts.items()]
+        page_text = merge_in_reading_order(items)
+        missing = [index for index in regions if index not in region_texts]
+        if missing:
+            # Never cache a page with lost regions: later runs would replay it as complete
+            print(f"  ⚠️ Region(s) {', '.join(map(str, missing))} on page {page_num + 1} missing from the response")
+            return {page_num: f"{page_text}\n\n[Image OCR failed - region(s) {', '.join(map(str, missing))} missing from the response]"}
+        
+        self.save_to_cache(pages.cache_key(page_num), page_text)
+        print(f"  ✅ Page {page_num + 1}: {layout['text_chars']} native + "
+              f"{sum(len(t) for t in region_texts.values())} OCR characters")
+        return {page_num: page_text}
+    
+    def _page_thumbnail(self, pages, page_num: int) -> np.ndarray:
+        """Render a grayscale thumbnail of a page as a NumPy array"""
+        with self._render_lock:
+            return pages.render_gray(page_num, self.thumbnail_dpi)
+    
+    def _ink_mask(self, thumb: np.ndarray) -> np.ndarray:
+        """Boolean mask of pixels noticeably darker than the paper colour"""
+        paper = np.percentile(thumb, 90)
+        return thumb < paper - 48
+    
+    def _ink_coverage(self, thumb: np.ndarray) -> float:
+        """Fraction of the page (ignoring scanner margins) covered by ink"""
+        h, w = thumb.shape
+        my, mx = max(1, h // 25), max(1, w // 25)
+        body = thumb[my:h - my, mx:w - mx]
+        return float(np.count_nonzero(self._ink_mask(body))) / body.size
+    
+    def is_blank_page(self, pages, page_num: int, thumb: Optional[np.ndarray] = None) -> bool:
+        """A page is blank when it has no text layer and almost no ink (thumb: its thumbnail, if already rendered)"""
+        if hasattr(pages, "has_text"):
+            with self._render_lock:
+                if pages.has_text(page_num):
+                    return False
+        if thumb is None:
+            thumb = self._page_thumbnail(pages, page_num)
+        return self._ink_coverage(thumb) < self.blank_ink_threshold
+    
+    def page_layout(self, pages, page_num: int) -> Optional[dict]:
+        """Layout of a page (see PdfPageSource.layout), or None for sources without a text layer"""
+        if not hasattr(pages, "layout"):
+            return None
+        with self._render_lock:
+            return pages.layout(page_num)
+    
+    def encode_page(self, pages, page_num: int) -> dict:
+        """Render, preprocess and encode a page as an image_url message part for a Vision call"""
+        img = self._render_page_image(pages, page_num)
+        content = self._encode_page_payload(img)["content"]
+        del img
+        return content
+    
+    def extract_page_text(self, pages, page_num: int, total_pages: int) -> str:
+        """Transcribe one full page with a single-page Vision request (cached like pipeline pages)"""
+        return self._extract_page_with_cache(pages, page_num, total_pages)
+    
+    def _page_fingerprint(self, thumb: np.ndarray) -> str:
+        """
+        Content hash of a rendered page
+        
+        Pages are only treated as duplicates when their renders are identical,
+        so a changed version number or date always gets its own OCR.
+        """
+        digest = hashlib.sha256(f"{thumb.shape}".encode())
+        digest.update(thumb.tobytes())
+        return digest.hexdigest()
+    
+    def _lookup_duplicate_text(self, fingerprint: str) -> Optional[str]:
+        """Find OCR text of an identical page from any previously processed document"""
+        if not self.cache_enabled:
+            return None
+        
+        try:
+            cache_file = self.cache_dir / "ocr_cache"
+            with self._cache_lock, shelve.open(str(cache_file)) as cache:
+                return cache.get(f"page_sha256_{fingerprint}")
+        except Exception as e:
+            print(f"  ⚠️ Cache read error: {e}")
+        
+        return None
+    
+    def _remember_page_fingerprint(self, fingerprint: str, text: str):
+        """Index OCR text by page content hash so later identical pages can reuse it"""
+        if not self.cache_enabled or is_failed_page(text) or text.lstrip().startswith("["):
+            return
+        
+        try:
+            cache_file = self.cache_dir / "ocr_cache"
+            with self._cache_lock, shelve.open(str(cache_file)) as cache:
+                cache[f"page_sha256_{fingerprint}"] = text
+        except Exception as e:
+            print(f"  ⚠️ Cache write error: {e}")
+    
+    def _plan_page_batches(self, pages, total_pages: int,
+                           fingerprints: Dict[int, str]) -> Iterator[Tuple[str, object]]:
+        """
+        Walk pages in order, yielding pages that need no OCR and packed batches of the rest
+        
+        Pages whose native text the caller already has are passed through
+        untouched. Other PDF pages with an adequate text layer keep their native text, and only
+        their embedded image regions are queued for OCR. Blank pages (no text
+        layer, almost no ink) and pages whose render is identical to an
+        earlier page (in this or a previously cached document) are resolved
+        locally from a thumbnail.
+        Content hashes of pages sent to OCR are recorded so their text can be
+        indexed once it arrives.
+        When the local Tesseract tier is active, remaining pages are OCR'd
+        locally a few pages ahead, and only low-confidence pages are batched
+        for Vision.
+        
+        Yields:
+            ("cached", (page_num, text, source)), ("alias", (page_num, original_page_num)),
+            ("regions", (page_num, layout)) or ("batch", [page_num, ...])
+        """
+        seen = {}  # page content hash -> first page_num with it in this document
+        batch = []
+        local_pending = deque()  # (page_num, future) awaiting Tesseract, in page order
+        native_texts = getattr(pages, "native_texts", {})
+        for page_num in range(total_pages):
+            if page_num in native_texts:
+                self.record_stat("native_text_pages")
+                yield "cached", (page_num, native_texts[page_num], "text")
+                continue
+            
+            cached_result = self.get_cached_result(pages.cache_key(page_num))
+            if cached_result:
+                self.record_stat("cache_hits")
+                yield "cached", (page_num, cached_result, "cache")
+                continue
+            
+            layout = self.page_layout(pages, page_num) if self.layout_aware else None
+            if layout is not None:
+                if layout["text_chars"] >= self.min_native_chars:
+                    if layout["image_regions"]:
+                        yield "regions", (page_num, layout)
+                    else:
+                        self.record_stat("native_text_pages")
+                        yield "cached", (page_num, merge_in_reading_order(layout["text_blocks"]), "text")
+                    continue
+            
+            if self.skip_blank_pages or self.detect_duplicate_pages:
+                thumb = self._page_thumbnail(pages, page_num)
                 
-                text = response.choices[0].message.content
-                return text.strip()
+                if self.skip_blank_pages and self.is_blank_page(pages, page_num, thumb):
+                    print(f"  ⬜ Page {page_num + 1}: blank, skipping OCR")
+                    self.record_stat("blank_pages_skipped")
+                    yield "cached", (page_num, BLANK_PAGE_TEXT, "blank")
+                    continue
                 
+                if self.detect_duplicate_pages:
+                    fingerprint = self._page_fingerprint(thumb)
+                    original = seen.get(fingerprint)
+                    if original is not None:
+                        print(f"  ♻️ Page {page_num + 1}: duplicate of page {original + 1}, reusing text")
+                        self.record_stat("duplicate_pages_reused")
+                        yield "alias", (page_num, original)
+                        continue
+                    
+                    known_text = self._lookup_duplicate_text(fingerprint)
+                    if known_text is not None:
+                        print(f"  ♻️ Page {page_num + 1}: matches a previously OCR'd page, reusing text")
+                        self.record_stat("duplicate_pages_reused")
+                        yield "cached", (page_num, known_text, "duplicate")
+                        continue
+                    
+                    seen[fingerprint] = page_num
+                    fingerprints[page_num] = fingerprint
+            
+            if self.local_ocr is not None:
+                img = self._render_page_image(pages, page_num)
+                local_pending.append((page_num, self.local_ocr.submit(img)))
+                del img
+                # Keep every worker busy before blocking on the oldest page
+                if len(local_pending) < 2 * self.local_ocr.max_workers:
+                    continue
+                page_num, future = local_pending.popleft()
+                local_text = self._resolve_local_ocr(pages, page_num, future, fingerprints)
+                if local_text is not None:
+                    yield "cached", (page_num, local_text, "local")
+                    continue
+            
+            batch.append(page_num)
+            if len(batch) == self.pages_per_request:
+                yield "batch", batch
+                batch = []
+        
+        while local_pending:
+            page_num, future = local_pending.popleft()
+            local_text = self._resolve_local_ocr(pages, page_num, future, fingerprints)
+            if local_text is not None:
+                yield "cached", (page_num, local_text, "local")
+                continue
+            
+            batch.append(page_num)
+            if len(batch) == self.pages_per_request:
+                yield "batch", batch
+                batch = []
+        
+        if batch:
+            yield "batch", batch
+    
+    def _resolve_local_ocr(self, pages, page_num: int, future,
+                           fingerprints: Dict[int, str]) -> Optional[str]:
+        """
+        Wait for a page's Tesseract result and apply the confidence gate
+        
+        Returns:
+            The page text if Tesseract was confident enough (it is cached and
+            indexed like Vision output), else None to escalate to Vision
+        """
+        try:
+            page_text, confidence, word_count = future.result()
         except Exception as e:
-            return f"Error extracting text from image: {str(e)}"
+            print(f"  ⚠️ Page {page_num + 1}: local OCR failed ({e}), escalating to Vision")
+            self.record_stat("local_ocr_escalated")
+            return None
+        
+        if not self.local_ocr.is_confident(confidence, word_count):
+            print(f"  ⤴️ Page {page_num + 1}: local OCR confidence {confidence:.0f}% "
+                  f"({word_count} words), escalating to Vision")
+            self.record_stat("local_ocr_escalated")
+            return None
+        
+        print(f"  🖥️ Page {page_num + 1}: local OCR, {word_count} words at {confidence:.0f}% confidence")
+        self.record_stat("local_ocr_pages")
+        self.save_to_cache(pages.cache_key(page_num), page_text)
+        if page_num in fingerprints:
+            self._remember_page_fingerprint(fingerprints[page_num], page_text)
+        return page_text
+    
+    def iter_pdf_pages(self, pdf_path: str, debug: bool = False,
+                       progress_callback: Optional[Callable[[dict], None]] = None,
+                       native_texts: Optional[Dict[int, str]] = None,
+                       sha256: Optional[str] = None) -> Iterator[Tuple[int, str, str]]:
+        """
+        Stream OCR text for every page of a PDF in page order
+        
+        Args:
+            pdf_path: Path to PDF file
+            debug: Save intermediate images for debugging
+            progress_callback: Called in the consuming thread with a progress
+                event dict (see _progress_event) as each page is yielded
+            native_texts: Zero-based page number -> text for pages the caller
+                already extracted from the text layer; these are yielded as
+                "text" without layout analysis or OCR
+            sha256: Content hash of the PDF, if already known (skips reading
+                the file again to key the page cache)
+            
+        Yields:
+            Tuple of (zero-based page number, page text, source) where source
+            is "ocr", "local", "mixed", "text", "cache", "blank" or "duplicate"
+        
+        Once every page has been yielded, the OCR text is saved as a
+        searchable copy of the PDF (see modules.searchable_pdf) when
+        write_searchable_pdf is set.
+        """
+        pages = PdfPageSource(pdf_path, native_texts, sha256)
+        page_texts = {}
+        try:
+            for page_num, page_text, source in self._iter_pages(pages, self._debug_dir(pdf_path, debug), progress_callback):
+                if self.write_searchable_pdf:
+                    page_texts[page_num] = (page_text, source)
+                yield page_num, page_text, source
+        finally:
+            pages.close()
+        
+        if page_texts:
+            try:
+                write_searchable_pdf(pdf_path, page_texts, self.cache_dir, pages.sha256)
+            except Exception as e:
+                print(f"⚠️ Could not save searchable PDF: {e}")
+    
+    def iter_image_pages(self, sources: List[str], debug: bool = False,
+                         progress_callback: Optional[Callable[[dict], None]] = None) -> Iterator[Tuple[int, str, str]]:
+        """
+        Stream OCR text for image files, folders and ZIP archives as one ordered document
+        
+        Args:
+            sources: Image paths (including multi-frame TIFF), folders or ZIP archives;
+                pages are numbered in the order given, folders and archives in
+                natural filename order
+            debug: Save intermediate images for debugging
+            progress_callback: Optional per-page progress callback (see iter_pdf_pages)
+            
+        Yields:
+            Tuple of (zero-based page number, page text, source)
+        """
+        pages = ImagePageSource(sources)
+        try:
+            yield from self._iter_pages(pages, self._debug_dir(sources[0], debug), progress_callback)
+        finally:
+            pages.close()
+    
+    def _debug_dir(self, source_path: str, debug: bool) -> Optional[Path]:
+        """Setup the debug image directory next to the source if needed"""
+        if not debug:
+            return None
+        
+        debug_dir = Path(source_path).parent / "ocr_debug"
+        debug_dir.mkdir(exist_ok=True)
+        print(f"🐛 Debug mode: Images saved to {debug_dir}")
+        return debug_dir
+    
+    def _iter_pages(self, pages, debug_dir: Optional[Path],
+                    progress_callback: Optional[Callable[[dict], None]] = None) -> Iterator[Tuple[int, str, str]]:
+        """
+        Run the parallel, cached OCR pipeline over a page source in page order
+        
+        At most max_in_flight_pages pages are rendered or awaiting a Vision
+        response at any time, so memory stays flat regardless of page count.
+        Completed pages are yielded as soon as every earlier page is done.
+        Requests that run far past the run's usual per-page latency are
+        hedged (see _maybe_hedge). Run statistics are left in self.last_run_stats.
+        """
+        self.reset_stats()
+        start_time = time.time()
+        debug = debug_dir is not None
+        
+        if self.local_ocr_enabled:
+            self.local_ocr = LocalOCR()
+            if not self.local_ocr.available:
+                self.local_ocr = None
+        
+        try:
+            total_pages = len(pages)
+            self.last_run_stats["pages"] = total_pages
+            
+            fingerprints = {}  # page_num -> page content hash for pages sent to OCR
+            plan = self._plan_page_batches(pages, total_pages, fingerprints)
+            plan_exhausted = False
+            ready = {}  # Completed page texts waiting for earlier pages
+            aliases = {}  # duplicate page_num -> original page_num
+            alias_texts = {}  # Emitted text of fingerprinted pages, for later duplicates
+            in_flight = {}  # future -> request dict (batch, source, call, futures, timings)
+            in_flight_pages = 0
+            next_page = 0
+            page_latencies = deque(maxlen=200)  # Seconds per page of completed requests
+            hedge_state = {"submitted": 0, "hedged": 0, "losers": []}
+            
+            # Not a with-block: shutting down must not wait for the losing copy of a hedged request
+            executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            try:
+                while next_page < total_pages:
+                    # Top up the window without exceeding the in-flight page cap
+                    while not plan_exhausted and in_flight_pages < self.max_in_flight_pages:
+                        item = next(plan, None)
+                        if item is None:
+                            plan_exhausted = True
+                            break
+                        kind, payload = item
+                        if kind == "cached":
+                            page_num, page_text, source = payload
+                            ready[page_num] = (page_text, source)
+                        elif kind == "alias":
+                            page_num, original = payload
+                            aliases[page_num] = original
+                        elif kind == "regions":
+                            page_num, layout = payload
+                            call = (self._extract_page_regions, pages, page_num, layout, total_pages, debug, debug_dir)
+                            self._submit_request(executor, in_flight, [page_num], "mixed", call)
+                            hedge_state["submitted"] += 1
+                            in_flight_pages += 1
+                        else:
+                            call = (self._extract_packed_pages, pages, payload, total_pages, debug, debug_dir)
+                            self._submit_request(executor, in_flight, payload, "ocr", call)
+                            hedge_state["submitted"] += 1
+                            in_flight_pages += len(payload)
+                    
+                    # Stream every page whose predecessors are done
+                    while next_page in ready or next_page in aliases:
+                        if next_page in ready:
+                            page_text, source = ready.pop(next_page)
+                        else:
+                            page_text, source = alias_texts[aliases.pop(next_page)], "duplicate"
+                        if next_page in fingerprints:
+                            alias_texts[next_page] = page_text
+                        if progress_callback:
+                            progress_callback(self._progress_event(
+                                next_page, total_pages, source, page_text, start_time
+                            ))
+                        yield next_page, page_text, source
+                        next_page += 1
+                    
+                    if next_page >= total_pages or not in_flight:
+                        break
+                    
+                    done, _ = wait(
+                        in_flight, timeout=self.hedge_check_interval if self.hedge_enabled else None,
+                        return_when=FIRST_COMPLETED
+                    )
+                    for future in done:
+                        request = in_flight.pop(future, None)
+                        if request is None:
+                            continue  # The other copy of a hedged request already won
+                        
+                        # First copy back wins; the other copy is cancelled, or ignored if its
+                        # Vision call already started (it still holds a slot until it returns)
+                        for other in request["futures"]:
+                            if other is not future:
+                                in_flight.pop(other, None)
+                                if not other.cancel():
+                                    hedge_state["losers"].append(other)
+                        if len(request["futures"]) > 1 and future is request["futures"][-1]:
+                            self.record_stat("hedge_wins")
+                        
+                        batch, source = request["batch"], request["source"]
+                        in_flight_pages -= len(batch)
+                        try:
+                            for page_num, page_text in future.result().items():
+                                ready[page_num] = (page_text, source)
+                                if page_num in fingerprints:
+                                    self._remember_page_fingerprint(fingerprints[page_num], page_text)
+                            call_seconds = request["timings"][request["futures"].index(future)]["call_seconds"]
+                            if call_seconds:
+                                page_latencies.append(call_seconds / len(batch))
+                        except Exception as e:
+                            for page_num in batch:
+                                print(f"  ❌ Page {page_num + 1} failed: {e}")
+                                ready[page_num] = (f"[Error: {str(e)}]", source)
+                    
+                    if self.hedge_enabled:
+                        self._maybe_hedge(executor, in_flight, page_latencies, hedge_state)
+                    self._sample_rss()
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+        finally:
+            if self.local_ocr is not None:
+                self.local_ocr.close()
+                self.local_ocr = None
+            self.finish_stats(start_time)
+    
+    def _submit_request(self, executor: ThreadPoolExecutor, in_flight: dict,
+                        batch: List[int], source: str, call: tuple):
+        """Submit an OCR request and register it as in flight"""
+        timing = {"started": None, "call_seconds": 0.0}
+        future = executor.submit(self._run_request, timing, call)
+        in_flight[future] = {
+            "batch": batch,
+            "source": source,
+            "call": call,
+            "futures": [future],
+            "timings": [timing],
+        }
+    
+    def _run_request(self, timing: dict, call: tuple):
+        """Run one copy of an OCR request, recording the timing of its Vision calls"""
+        self._request_local.timing = timing
+        try:
+            return call[0](*call[1:])
+        finally:
+            self._request_local.timing = None
+    
+    def _maybe_hedge(self, executor: ThreadPoolExecutor, in_flight: dict,
+                     page_latencies: deque, hedge_state: dict):
+        """
+        Re-issue straggling requests so one slow Vision call cannot stall the document
+        
+        A request is a straggler once its current Vision call has run for more
+        than the hedge_percentile of per-page call latency seen so far in this
+        run (per page) and at least hedge_min_delay. Requests still queued on
+        the concurrency limit, rendering or backing off are never hedged, and
+        a hedge is only sent while the limiter has a free slot, since its copy
+        takes a slot like any other call. Whichever copy finishes first is
+        used. Hedges are capped at hedge_max_fraction of the run's requests so
+        they cannot eat the Vision quota; losing copies still running count
+        against that cap too, since they keep their slot and are still billed.
+        """
+        if len(page_latencies) < self.hedge_min_samples:
+            return
+        
+        hedge_state["losers"] = [loser for loser in hedge_state["losers"] if not loser.done()]
+        budget = max(1, int(hedge_state["submitted"] * self.hedge_max_fraction))
+        threshold = float(np.percentile(page_latencies, self.hedge_percentile))
+        now = time.time()
+        
+        for request in list(in_flight.values()):
+            if hedge_state["hedged"] + len(hedge_state["losers"]) >= budget:
+                return
+            if len(request["futures"]) > 1 or request["futures"][0].done():
+                continue
+            started = request["timings"][0]["started"]
+            if started is None:
+                continue
+            elapsed = now - started
+            if elapsed < self.hedge_min_delay or elapsed / len(request["batch"]) <= threshold:
+                continue
+            if not self.concurrency.has_capacity():
+                return
+            
+            pages_label = ", ".join(str(page_num + 1) for page_num in request["batch"])
+            print(f"  🏇 Page(s) {pages_label}: {elapsed:.1f}s without a response, sending a hedged request")
+            timing = {"started": None, "call_seconds": 0.0}
+            hedge = executor.submit(self._run_request, timing, request["call"])
+            request["futures"].append(hedge)
+            request["timings"].append(timing)
+            in_flight[hedge] = request
+            hedge_state["hedged"] += 1
+            self.record_stat("hedged_requests")
+    
+    def _progress_event(self, page_num: int, total_pages: int, source: str,
+                        page_text: str, start_time: float) -> dict:
+        """Build the progress event reported for a completed page"""
+        completed = page_num + 1
+        elapsed = time.time() - start_time
+        remaining = total_pages - completed
+        return {
+            "page": completed,
+            "total_pages": total_pages,
+            "completed": completed,
+            "source": source,
+            "cache_hits": self.last_run_stats.get("cache_hits", 0),
+            "elapsed_seconds": round(elapsed, 1),
+            "eta_seconds": round(elapsed / completed * remaining, 1),
+            "text": page_text,
+        }
+    
+    def reset_stats(self):
+        """Start a fresh set of per-run statistics"""
+        self.last_run_stats = {
+            "pages": 0,
+            "ocr_requests": 0,
+            "cache_hits": 0,
+            "blank_pages_skipped": 0,
+            "duplicate_pages_reused": 0,
+            "native_text_pages": 0,
+            "image_regions_ocr": 0,
+            "local_ocr_pages": 0,
+            "local_ocr_escalated": 0,
+            "hedged_requests": 0,
+            "hedge_wins": 0,
+            "render_seconds": 0.0,
+            "preprocess_seconds": 0.0,
+            "encoded_images": 0,
+            "encoded_bytes": 0,
+            "encode_seconds": 0.0,
+            "bytes_per_page": 0,
+            "wall_time_s": 0.0,
+            "pages_per_sec": 0.0,
+            "peak_rss_mb": _current_rss_mb(),
+            "max_in_flight_pages": self.max_in_flight_pages,
+        }
+    
+    def record_stat(self, key: str, amount=1):
+        """Increment a per-run counter (called from worker threads)"""
+        with self._stats_lock:
+            self.last_run_stats[key] = self.last_run_stats.get(key, 0) + amount
+    
+    def _sample_rss(self):
+        """Track the peak resident set size seen during the run"""
+        rss = _current_rss_mb()
+        with self._stats_lock:
+            if rss > self.last_run_stats.get("peak_rss_mb", 0.0):
+                self.last_run_stats["peak_rss_mb"] = rss
+    
+    def finish_stats(self, start_time: float):
+        """Finalize and report per-run statistics"""
+        stats = self.last_run_stats
+        stats["wall_time_s"] = round(time.time() - start_time, 3)
+        if stats["wall_time_s"] > 0:
+            stats["pages_per_sec"] = round(stats["pages"] / stats["wall_time_s"], 2)
+        stats["peak_rss_mb"] = round(stats["peak_rss_mb"], 1)
+        if stats["encoded_images"]:
+            stats["bytes_per_page"] = stats["encoded_bytes"] // stats["encoded_images"]
+        for key in ("render_seconds", "preprocess_seconds", "encode_seconds"):
+            stats[key] = round(stats[key], 3)
+        print(f"📊 OCR run: {stats['pages']} pages in {stats['wall_time_s']:.1f}s "
+              f"({stats['pages_per_sec']} pages/s), {stats['ocr_requests']} requests, "
+              f"{stats['cache_hits']} cache hits, {stats['blank_pages_skipped']} blank and "
+              f"{stats['duplicate_pages_reused']} duplicate pages skipped, "
+              f"{stats['native_text_pages']} native text pages, {stats['image_regions_ocr']} image regions OCR'd, "
+              f"{stats['local_ocr_pages']} local OCR pages ({stats['local_ocr_escalated']} escalated), "
+              f"{stats['hedged_requests']} hedged requests ({stats['hedge_wins']} won), "
+              f"{stats['bytes_per_page'] / 1024:.1f} KB/page, peak RSS {stats['peak_rss_mb']} MB")
     
-    def extract_text_from_pdf_pages(self, pdf_path: str, debug: bool = False) -> str:
+    def _join_pages(self, page_iterator: Iterator[Tuple[int, str, str]]) -> Tuple[str, int]:
+        """Join streamed page texts with page markers, returns (text, page count)"""
+        all_text = [
+            f"--- Page {page_num + 1} ---\n{page_text}"
+            for page_num, page_text, _ in page_iterator
+        ]
+        return "\n\n".join(all_text), len(all_text)
+    
+    def extract_text_from_pdf_pages(self, pdf_path: str, debug: bool = False,
+                                    progress_callback: Optional[Callable[[dict], None]] = None,
+                                    native_texts: Optional[Dict[int, str]] = None) -> str:
         """
         Extract text from all pages of a PDF using parallel processing
         
         Args:
             pdf_path: Path to PDF file
             debug: Save intermediate images for debugging
+            progress_callback: Optional per-page progress callback (see iter_pdf_pages)
+            native_texts: Text of pages that need no OCR (see iter_pdf_pages)
             
         Returns:
             Extracted text from all pages
@@ -284,51 +1503,15 @@ class AzureVisionOCR:
         try:
             print("📄 Processing PDF with parallel Azure Vision OCR...")
             
-            # Open PDF
-            pdf_document = fitz.open(pdf_path)
-            total_pages = len(pdf_document)
-            
-            # Setup debug directory if needed
-            debug_dir = None
-            if debug:
-                debug_dir = Path(pdf_path).parent / "ocr_debug"
-                debug_dir.mkdir(exist_ok=True)
-                print(f"🐛 Debug mode: Images saved to {debug_dir}")
-            
-            # Parallel processing of pages
-            page_results = {}
-            
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                # Submit all pages for processing
-                future_to_page = {
-                    executor.submit(
-                        self._extract_page_with_cache,
-                        pdf_document, page_num, total_pages, pdf_path, debug, debug_dir
-                    ): page_num
-                    for page_num in range(total_pages)
-                }
-                
-                # Collect results as they complete
-                for future in as_completed(future_to_page):
-                    page_num = future_to_page[future]
-                    try:
-                        page_text = future.result()
-                        page_results[page_num] = f"--- Page {page_num + 1} ---\n{page_text}"
-                    except Exception as e:
-                        print(f"  ❌ Page {page_num + 1} failed: {e}")
-                        page_results[page_num] = f"--- Page {page_num + 1} ---\n[Error: {str(e)}]"
-            
-            # Close PDF
-            pdf_document.close()
-            
-            # Combine results in page order
-            all_text = [page_results[i] for i in sorted(page_results.keys())]
-            result = "\n\n".join(all_text)
+            result, page_count = self._join_pages(
+                self.iter_pdf_pages(pdf_path, debug=debug, progress_callback=progress_callback,
+                                    native_texts=native_texts)
+            )
             
-            print(f"✅ Parallel OCR completed: {len(result)} chars from {total_pages} pages")
+            print(f"✅ Parallel OCR completed: {len(result)} chars from {page_count} pages")
             
-            if debug and debug_dir:
-                text_path = debug_dir / "extracted_text.txt"
+            if debug:
+                text_path = Path(pdf_path).parent / "ocr_debug" / "extracted_text.txt"
                 with open(text_path, 'w', encoding='utf-8') as f:
                     f.write(result)
                 print(f"💾 Saved extracted text to: {text_path}")
@@ -339,3 +1522,41 @@ class AzureVisionOCR:
             error_msg = f"Error processing PDF: {str(e)}"
             print(error_msg)
             return error_msg
+    
+    def extract_text_from_images(self, sources: List[str], debug: bool = False,
+                                 progress_callback: Optional[Callable[[dict], None]] = None) -> str:
+        """
+        Extract text from image files, folders and ZIP archives as one ordered document
+        
+        Args:
+            sources: Image paths (including multi-frame TIFF), folders or ZIP archives
+            debug: Save intermediate images for debugging
+            progress_callback: Optional per-page progress callback (see iter_pdf_pages)
+            
+        Returns:
+            Extracted text from all pages, in page order
+        """
+        try:
+            print("🖼️ Processing images with parallel Azure Vision OCR...")
+            
+            result, page_count = self._join_pages(
+                self.iter_image_pages(sources, debug=debug, progress_callback=progress_callback)
+            )
+            if page_count == 0:
+                return "Error processing images: no supported images found"
+            
+            print(f"✅ Parallel OCR completed: {len(result)} chars from {page_count} pages")
+            return result
+            
+        except Exception as e:
+            error_msg = f"Error processing images: {str(e)}"
+            print(error_msg)
+            return error_msg
+    
+    def extract_text_from_image(self, image_path: str) -> str:
+        """Extract text from a single image file (every frame of a multi-frame TIFF)"""
+        try:
+            page_texts = [page_text for _, page_text, _ in self.iter_image_pages([image_path])]
+            return "\n\n".join(page_texts)
+        except Exception as e:
+            return f"Error extracting text from image: {str(e)}"
@@ -2,19 +2,34 @@
 Task 1: BRD Parsing Module
 Analyzes uploaded BRD documents for structure and completeness
 """
-import PyPDF2
-import docx
+import io
+import os
+import re
+import time
+from contextlib import closing
 from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+from config import Config
 from modules.llm_service import LLMService
+from modules.azure_vision_ocr import IMAGE_EXTENSIONS, ARCHIVE_EXTENSIONS, OCR_CACHE_DIR
+from modules.pdf_layout import scan_pdf_layout, serialize_table
+from modules.docx_stream import iter_docx_blocks
+from modules.markup_stream import MARKUP_EXTENSIONS, build_section_tree, iter_markdown_blocks, iter_markup_blocks, render_outline
+from modules.searchable_pdf import find_searchable_pdf
+from modules.extraction_cache import ExtractionCache, content_key, document_key, is_failed_page
+from modules.text_normalizer import normalize_pages
+from modules.upload_ingest import UploadedDocument
+from modules.requirement_table import HEADER_SCAN_ROWS, TABLE_EXTENSIONS, is_header_row, iter_table_rows
+
+# Formats without fixed pages; a single-page document of these is returned without a page marker
+UNPAGED_EXTENSIONS = {'.docx', '.doc', '.txt', '.csv'} | MARKUP_EXTENSIONS
+
+# Spreadsheet rows per page of extracted text (the header row is repeated on each page)
+TABLE_PAGE_ROWS = 100
+
+# Page markers in joined document text
+PAGE_MARKER_PATTERN = re.compile(r"^--- Page (\d+)( \(OCR NEEDED\))? ---$\n?", re.MULTILINE)
 
-# OCR imports
-try:
-    import pytesseract
-    from pdf2image import convert_from_path
-    from PIL import Image
-    OCR_AVAILABLE = True
-except ImportError:
-    OCR_AVAILABLE = False
 
 class BRDParser:
     """Parse and analyze Business Requirement Documents"""
@@ -23,195 +38,457 @@ class BRDParser:
         self.llm_service = LLMService()
         self._cached_text = None  # Cache extracted text to avoid re-extraction
         self._cached_file_path = None
-        
-        # Try to set Tesseract path for Windows
-        if OCR_AVAILABLE:
-            try:
-                # Common Windows installation paths
-                import os
-                possible_paths = [
-                    r"C:\Program Files\Tesseract-OCR\tesseract.exe",
-                    r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
-                ]
-                for path in possible_paths:
-                    if os.path.exists(path):
-                        pytesseract.pytesseract.tesseract_cmd = path
-                        break
-            except:
-                pass
+        self.extraction_cache = ExtractionCache()  # Persistent, keyed by file content
+        self.normalize_text = Config.TEXT_NORMALIZATION  # Strip headers/footers/boilerplate before prompts
+        self.last_normalization_stats = None
+        self.last_outline = None  # Section outline of the last Markdown/HTML document, for Task 1
     
-    def extract_text_from_file(self, file_path: str) -> str:
+    def extract_text_from_file(self, file_path: Union[str, UploadedDocument],
+                               progress_callback: Optional[Callable[[dict], None]] = None) -> str:
         """
         Extract text content from various file formats
-        Uses caching to avoid re-extracting the same file
+        Uses caching to avoid re-extracting the same file: in memory for the
+        same path, and on disk (shared across sessions) for the same content
         
         Args:
-            file_path: Path to the uploaded BRD file
+            file_path: Path to the BRD file, image, ZIP archive of images, or
+                folder of images, or an in-memory UploadedDocument
+            progress_callback: Optional callback receiving a per-page progress
+                event dict (page, total_pages, completed, source, cache_hits,
+                elapsed_seconds, eta_seconds, text) for PDF and image extraction
             
         Returns:
-            Extracted text content
+            Extracted text content, with "--- Page N ---" markers between pages,
+            normalized for prompts when normalize_text is set (see text_normalizer).
+            For Markdown/HTML, last_outline is set to the document's section outline.
         """
         # Check cache first to avoid duplicate extraction
         if self._cached_file_path == file_path and self._cached_text is not None:
             print("📝 Using cached text (avoiding duplicate extraction)")
             return self._cached_text
         
-        path = Path(file_path)
-        extension = path.suffix.lower()
+        extension = file_path.extension if isinstance(file_path, UploadedDocument) else Path(file_path).suffix.lower()
+        pages = list(self.iter_pages(file_path, progress_callback))
+        if pages and self.normalize_text:
+            pages, self.last_normalization_stats = normalize_pages(pages)
+        if pages:
+            extracted_text = self._join_pages(pages, extension)
+        elif extension == '.pdf':
+            extracted_text = "⚠️ No text extracted from PDF"
+        else:
+            extracted_text = ""
+        
+        # Markup documents have an explicit heading tree: keep its outline as the Task 1 input
+        self.last_outline = None
+        if extension in MARKUP_EXTENSIONS and extracted_text:
+            tree = build_section_tree(iter_markdown_blocks(io.StringIO(extracted_text)))
+            if tree["children"]:
+                self.last_outline = render_outline(tree)
+                print(f"🌳 Section outline: {len(self.last_outline)} chars for {len(extracted_text)} chars of text")
+        
+        # Cache the result
+        self._cached_file_path = file_path
+        self._cached_text = extracted_text
+        
+        return extracted_text
+    
+    def iter_pages(self, file_path: Union[str, UploadedDocument],
+                   progress_callback: Optional[Callable[[dict], None]] = None) -> Iterator[Tuple[int, str, str]]:
+        """
+        Stream a document's text page by page, in page order, as pages complete
+        
+        PDFs and images yield one item per page. DOCX pages end at the page
+        breaks Word recorded in the file and TXT pages at form feeds; a
+        document without any is a single page. Spreadsheets and CSV files
+        yield TABLE_PAGE_ROWS rows per page, each page starting a new table. A document whose content was
+        extracted before is replayed from the extraction cache.
+        
+        Uploaded documents are read from memory (PDF text layers, DOCX, TXT)
+        and written to the upload spool only for steps that need a file path:
+        OCR, image ingestion and multi-process scans of large PDFs.
+        
+        Args:
+            file_path: Path to the BRD file, image, ZIP archive of images, or
+                folder of images, or an in-memory UploadedDocument
+            progress_callback: Optional per-page progress callback (see
+                extract_text_from_file)
+        
+        Yields:
+            Tuple of (zero-based page number, page text, source) where source
+            is "text" for text layers and text documents, an OCR source from
+            AzureVisionOCR.iter_pdf_pages, "cache" for replayed pages, or
+            "ocr_needed" for image-based PDF pages that could not be OCR'd
+        """
+        upload = file_path if isinstance(file_path, UploadedDocument) else None
+        extension = upload.extension if upload else Path(file_path).suffix.lower()
         
         if extension == '.pdf':
-            extracted_text = self._extract_from_pdf(file_path)
+            pages = self._iter_pdf_pages(file_path, progress_callback)
+        elif (not upload and Path(file_path).is_dir()) or extension in IMAGE_EXTENSIONS | ARCHIVE_EXTENSIONS:
+            pages = self._iter_image_pages(file_path, progress_callback)
         elif extension in ['.docx', '.doc']:
-            extracted_text = self._extract_from_docx(file_path)
+            pages = self._iter_docx_pages(file_path)
         elif extension == '.txt':
-            extracted_text = self._extract_from_txt(file_path)
+            pages = self._iter_txt_pages(file_path)
+        elif extension in TABLE_EXTENSIONS:
+            pages = self._iter_table_pages(file_path)
+        elif extension in MARKUP_EXTENSIONS:
+            pages = self._iter_markup_pages(file_path)
         else:
             raise ValueError(f"Unsupported file format: {extension}")
         
-        # Cache the result
-        self._cached_file_path = file_path
-        self._cached_text = extracted_text
+        # Same bytes seen before (any session, any upload name): skip extraction entirely
+        if upload:
+            cache_key = content_key(upload.sha256, extension)  # Hashed once on upload
+        else:
+            cache_key = document_key(file_path) if Path(file_path).is_file() else None
+        cached_text = self.extraction_cache.get(cache_key) if cache_key else None
+        if cached_text is not None:
+            print(f"📝 Using cached extraction for this document ({len(cached_text)} chars)")
+            yield from self._split_pages(cached_text)
+            return
         
-        return extracted_text
+        extracted_pages = []
+        for page in pages:
+            extracted_pages.append(page)
+            yield page
+        
+        if cache_key and extracted_pages and all(source != "ocr_needed" for _, _, source in extracted_pages):
+            self.extraction_cache.put(cache_key, self._join_pages(extracted_pages, extension))
     
-    def _extract_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF file with Groq Vision OCR fallback for image-based PDFs"""
-        text = []
+    def _join_pages(self, pages: List[Tuple[int, str, str]], extension: str) -> str:
+        """Join streamed pages with page markers (unpaged single-page documents stay unmarked)"""
+        if extension in UNPAGED_EXTENSIONS and len(pages) == 1:
+            return pages[0][1]
         
-        # First, try standard text extraction
-        try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                total_pages = len(pdf_reader.pages)
-                
-                for page_num, page in enumerate(pdf_reader.pages):
-                    page_text = page.extract_text()
-                    
-                    # Check if page has meaningful text (more than just whitespace/numbers)
-                    if page_text and len(page_text.strip()) > 50:
-                        text.append(f"--- Page {page_num + 1} ---\n{page_text}")
-                    else:
-                        # Page might be image-based, mark for OCR
-                        text.append(f"--- Page {page_num + 1} (OCR NEEDED) ---")
-        except Exception as e:
-            print(f"Standard PDF extraction failed: {e}")
-        
-        # Check if we got meaningful text
-        combined_text = "\n\n".join(text)
-        words_count = len(combined_text.split())
-        
-        # If we have very little text or many OCR NEEDED markers, use Azure Vision OCR
-        if words_count < 100 or combined_text.count("OCR NEEDED") > 0:
-            print(f"📸 PDF appears to be image-based ({words_count} words extracted)")
-            print("🚀 Using Azure OpenAI Vision OCR (enterprise-grade)...")
+        sections = []
+        for page_num, page_text, source in pages:
+            if source == "ocr_needed":
+                sections.append(f"--- Page {page_num + 1} (OCR NEEDED) ---")
+            else:
+                sections.append(f"--- Page {page_num + 1} ---\n{page_text}")
+        return "\n\n".join(sections)
+    
+    def _split_pages(self, text: str) -> Iterator[Tuple[int, str, str]]:
+        """Split joined document text back into pages (inverse of _join_pages)"""
+        markers = list(PAGE_MARKER_PATTERN.finditer(text))
+        if not markers or markers[0].start() != 0:
+            yield 0, text, "cache"
+            return
+        
+        for index, marker in enumerate(markers):
+            # Pages are separated by a blank line before the next marker
+            end = markers[index + 1].start() - 2 if index + 1 < len(markers) else len(text)
+            yield int(marker.group(1)) - 1, text[marker.end():end], "cache"
+    
+    def _iter_pdf_pages(self, file_path: Union[str, UploadedDocument],
+                        progress_callback: Optional[Callable[[dict], None]] = None) -> Iterator[Tuple[int, str, str]]:
+        """
+        Stream PDF pages, routing only image-based pages to OCR
+        
+        Pages with an adequate text layer keep their native text; pages
+        without one, and pages with image regions missing from the text
+        layer, go through the OCR pipeline, which yields them in page order
+        as they complete.
+        """
+        native_texts = {}  # page_num -> text for pages that need no OCR
+        original_path = file_path
+        
+        # A searchable copy from an earlier OCR run turns OCR into a plain text parse
+        searchable_path = find_searchable_pdf(file_path, OCR_CACHE_DIR, getattr(file_path, "sha256", None))
+        if searchable_path:
+            print(f"🔎 Using searchable PDF from a previous OCR run: {searchable_path.name}")
+            file_path = str(searchable_path)
+        
+        # PyMuPDF text layer (table-aware), split across processes for large PDFs
+        start_time = time.time()
+        layout_scan = scan_pdf_layout(file_path)
+        
+        # Copies saved before failed pages were excluded may hold OCR error text: start over from the original
+        if searchable_path and any(page_text and is_failed_page(page_text) for page_text in layout_scan["page_texts"]):
+            print("⚠️ Searchable PDF contains failed OCR pages, discarding it")
+            searchable_path.unlink(missing_ok=True)
+            searchable_path, file_path = None, original_path
+            layout_scan = scan_pdf_layout(file_path)
+        
+        page_texts = layout_scan["page_texts"]
+        total_pages = len(page_texts)
+        mixed_pages = set(layout_scan["image_region_pages"])
+        text_pages = set()  # Pages with meaningful native text
+        
+        for page_num, page_text in enumerate(page_texts):
+            # Check if page has meaningful text (more than just whitespace/numbers);
+            # in a searchable copy any text was already OCR'd (e.g. blank pages), only empty pages need OCR
+            if searchable_path:
+                if page_text and page_text.strip():
+                    text_pages.add(page_num)
+                    native_texts[page_num] = page_text
+            elif page_text and len(page_text.strip()) > 50:
+                text_pages.add(page_num)
+                if page_num not in mixed_pages:
+                    native_texts[page_num] = page_text
+        
+        # Text pages with embedded scans/diagrams need their image regions OCR'd
+        if mixed_pages and not searchable_path:
+            print(f"🖼️ {len(mixed_pages)} page(s) contain image regions without a text layer")
+        
+        # Pages without meaningful text or with image regions go to OCR; the rest keep their native text
+        next_page = 0
+        ocr_page_count = total_pages - len(native_texts)
+        if ocr_page_count:
+            print(f"📸 {ocr_page_count} of {total_pages} page(s) need OCR, "
+                  f"keeping native text for {len(native_texts)}")
+            print("🚀 Using OCR pipeline (local Tesseract when installed, Azure OpenAI Vision for the rest)...")
             
             try:
                 from modules.azure_vision_ocr import AzureVisionOCR
                 
                 azure_ocr = AzureVisionOCR()
-                # Disable debug mode for faster processing (no image saving)
-                ocr_text = azure_ocr.extract_text_from_pdf_pages(file_path, debug=False)
-                
-                # ALWAYS return after OCR attempt - do not continue to avoid infinite loop
-                if ocr_text and not ocr_text.startswith("Error"):
-                    print("✅ Azure Vision OCR successful!")
-                    return ocr_text  # Return immediately - DO NOT fall through
+                if searchable_path:
+                    # Only pages with an empty text layer are OCR'd again; the copy is kept as it is
+                    azure_ocr.write_searchable_pdf = False
+                # The OCR pipeline renders by file path: spool uploads to disk, reusing the upload's hash
+                ocr_pages = azure_ocr.iter_pdf_pages(
+                    os.fspath(file_path), debug=False, progress_callback=progress_callback,
+                    native_texts=native_texts, sha256=getattr(file_path, "sha256", None)
+                )
+                failed_pages = []
+                with closing(ocr_pages):
+                    for page_num, page_text, source in ocr_pages:
+                        if is_failed_page(page_text):
+                            failed_pages.append(page_num + 1)
+                        yield page_num, page_text, source
+                        next_page = page_num + 1
+                if failed_pages:
+                    print(f"⚠️ Azure Vision OCR finished, but OCR failed on page(s) {', '.join(map(str, failed_pages))}")
                 else:
-                    print(f"⚠️ OCR returned: {ocr_text[:100] if ocr_text else 'No text'}")
-                    return combined_text if combined_text.strip() else "No text extracted from PDF"
-                    
+                    print("✅ Azure Vision OCR successful!")
+                return
             except Exception as e:
+                # Keep whatever native text the remaining pages have
                 print(f"⚠️ Azure Vision OCR failed: {e}")
-                return combined_text if combined_text.strip() else f"OCR Error: {str(e)}"
         
-        # Only reach here if standard extraction worked
-        return combined_text if combined_text.strip() else "⚠️ No text extracted from PDF"
+        # Without OCR, progress is reported here as each page is returned (OCR reports its own pages)
+        for page_num in range(next_page, total_pages):
+            if page_num in text_pages:
+                page = (page_num, page_texts[page_num], "text")
+            else:
+                # Page might be image-based and still needs OCR
+                page = (page_num, "", "ocr_needed")
+            if progress_callback:
+                elapsed = time.time() - start_time
+                progress_callback({
+                    "page": page_num + 1,
+                    "total_pages": total_pages,
+                    "completed": page_num + 1,
+                    "source": page[2],
+                    "cache_hits": 0,
+                    "elapsed_seconds": round(elapsed, 1),
+                    "eta_seconds": round(elapsed / (page_num + 1) * (total_pages - page_num - 1), 1),
+                    "text": page[1],
+                })
+            yield page
     
-    def _extract_with_ocr(self, file_path: str, use_mistral: bool = False) -> str:
-        """Extract text from PDF using Tesseract OCR
+    def _iter_image_pages(self, file_path: Union[str, UploadedDocument],
+                          progress_callback: Optional[Callable[[dict], None]] = None) -> Iterator[Tuple[int, str, str]]:
+        """Stream OCR text for an image, multi-frame TIFF, ZIP archive or folder via Azure Vision OCR"""
+        from modules.azure_vision_ocr import AzureVisionOCR
         
-        Args:
-            file_path: Path to PDF file
-            use_mistral: Reserved for future implementation
+        print("🚀 Using Azure OpenAI Vision OCR for image ingestion...")
+        azure_ocr = AzureVisionOCR()
+        page_count = 0
+        with closing(azure_ocr.iter_image_pages([os.fspath(file_path)], progress_callback=progress_callback)) as ocr_pages:
+            for page in ocr_pages:
+                page_count += 1
+                yield page
+        
+        if page_count == 0:
+            raise ValueError("Error processing images: no supported images found")
+    
+    def _iter_docx_pages(self, file_path: Union[str, UploadedDocument]) -> Iterator[Tuple[int, str, str]]:
         """
-        if not OCR_AVAILABLE:
-            return "⚠️ OCR libraries not available. Install: pip install pytesseract pdf2image Pillow"
+        Stream DOCX text, grouped into pages at the page breaks Word recorded
         
-        try:
-            # Check if poppler is available
-            try:
-                from pdf2image import convert_from_path
-                # Test conversion with first page only
-                images = convert_from_path(file_path, dpi=200, first_page=1, last_page=1)
-            except Exception as poppler_error:
-                if "Unable to get page count" in str(poppler_error) or "poppler" in str(poppler_error).lower():
-                    return """⚠️ Poppler not found. OCR requires poppler-utils.
-
-📥 Installation for Windows:
-1. Download: https://github.com/oschwartz10612/poppler-windows/releases/
-2. Extract to C:\\Program Files\\poppler
-3. Add C:\\Program Files\\poppler\\Library\\bin to PATH
-4. Restart the app
-
-OR: Use a text-based PDF instead of a scanned image PDF."""
-                raise
-            
-            print(f"📸 Using Tesseract OCR on {len(images)} page(s)...")
-            
-            # Now process all pages
-            images = convert_from_path(file_path, dpi=200)
+        Reads word/document.xml incrementally (see docx_stream), so memory is
+        bounded by the largest page and table rather than the document.
+        """
+        source = file_path.open() if isinstance(file_path, UploadedDocument) else file_path
+        return self._iter_block_pages(iter_docx_blocks(source))
+    
+    def _iter_markup_pages(self, file_path: Union[str, UploadedDocument]) -> Iterator[Tuple[int, str, str]]:
+        """Stream Markdown/HTML text as one page, read incrementally (see markup_stream)"""
+        return self._iter_block_pages(iter_markup_blocks(file_path))
+    
+    def _iter_block_pages(self, blocks: Iterator[dict]) -> Iterator[Tuple[int, str, str]]:
+        """
+        Render streamed document blocks (docx_stream/markup_stream) as page texts
+        
+        Headings are marked with their level ("## Title"), list items are
+        indented by depth with their marker, and tables are serialized as
+        rows. A page ends at each page_break block.
+        """
+        page_num = 0
+        text = []
+        table_rows = []
+        table_count = 0
+        in_list = False
+        
+        def flush_table():
+            nonlocal table_rows, table_count
+            if table_rows:
+                table_count += 1
+                text.append(serialize_table(table_rows, page_num, table_count))
+                table_rows = []
+        
+        for block in blocks:
+            if block["type"] == "table_row":
+                if block["row"] == 0:
+                    flush_table()
+                table_rows.append(block["cells"])
+                in_list = False
+                continue
             
-            ocr_text = []
-            for page_num, image in enumerate(images):
-                # Perform OCR on each page
-                page_text = pytesseract.image_to_string(image, lang='eng')
-                
-                if page_text.strip():
-                    ocr_text.append(f"--- Page {page_num + 1} (OCR) ---\n{page_text}")
+            flush_table()
+            if block["type"] == "list_item":
+                item = f"{'  ' * block['level']}{block['marker']} {block['text']}"
+                # Items of one list stay on consecutive lines
+                if in_list:
+                    text[-1] += "\n" + item
                 else:
-                    ocr_text.append(f"--- Page {page_num + 1} (No text detected) ---")
-            
-            result = "\n\n".join(ocr_text)
-            print(f"✅ Tesseract OCR completed: Extracted {len(result)} characters from {len(images)} pages")
-            return result
+                    text.append(item)
+                in_list = True
+                continue
             
-        except Exception as e:
-            error_msg = f"❌ OCR failed: {str(e)}"
-            print(error_msg)
-            return error_msg
+            in_list = False
+            if block["type"] == "heading":
+                text.append(f"{'#' * block['level']} {block['text']}")
+            elif block["type"] == "paragraph":
+                text.append(block["text"])
+            elif block["type"] == "page_break":
+                if text:
+                    yield page_num, "\n\n".join(text), "text"
+                    text = []
+                page_num += 1
+                table_count = 0
+        
+        flush_table()
+        if text:
+            yield page_num, "\n\n".join(text), "text"
     
-    def _extract_from_docx(self, file_path: str) -> str:
-        """Extract text from DOCX file"""
-        doc = docx.Document(file_path)
-        text = []
-        for i, para in enumerate(doc.paragraphs):
-            if para.text.strip():
-                text.append(para.text)
-        return "\n\n".join(text)
+    def _iter_txt_pages(self, file_path: Union[str, UploadedDocument]) -> Iterator[Tuple[int, str, str]]:
+        """Stream a TXT file page by page, splitting at form feeds"""
+        if isinstance(file_path, UploadedDocument):
+            file = file_path.text_stream()
+        else:
+            file = open(file_path, 'r', encoding='utf-8')
+        with file:
+            page_num = 0
+            lines = []
+            for line in file:
+                while '\f' in line:
+                    before, line = line.split('\f', 1)
+                    lines.append(before)
+                    yield page_num, "".join(lines), "text"
+                    page_num += 1
+                    lines = []
+                lines.append(line)
+            # A trailing form feed does not start another page
+            if page_num == 0 or any(line.strip() for line in lines):
+                yield page_num, "".join(lines), "text"
     
-    def _extract_from_txt(self, file_path: str) -> str:
-        """Extract text from TXT file"""
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return file.read()
+    def _iter_table_pages(self, file_path: Union[str, UploadedDocument]) -> Iterator[Tuple[int, str, str]]:
+        """
+        Stream spreadsheet and CSV rows as serialized tables
+        
+        Each sheet's header row is found among its first HEADER_SCAN_ROWS
+        rows (title rows above it are kept as text on the sheet's first page;
+        without a recognizable header the first row is used) and repeated on
+        every page. A new sheet starts a new page headed by its name.
+        """
+        page_num = sheet_start = 0
+        current_sheet = None
+        preamble, header, rows = [], None, []
+        
+        def page_text():
+            lines = [f"# {current_sheet}"] if current_sheet else []
+            lines.extend(" ".join(cells) for cells in preamble)
+            lines.append(serialize_table([header] + rows, page_num, 1))
+            return "\n".join(lines)
+        
+        def flush_sheet():
+            nonlocal header, rows, preamble
+            if header is None and preamble:
+                header, rows, preamble = preamble[0], preamble[1:] + rows, []
+            if header is not None and (rows or page_num == sheet_start):
+                return page_text()
+            return None
+        
+        for sheet, _, cells in iter_table_rows(file_path):
+            if sheet != current_sheet:
+                text = flush_sheet() if current_sheet is not None else None
+                if text is not None:
+                    yield page_num, text, "text"
+                    page_num += 1
+                current_sheet, sheet_start, preamble, header, rows = sheet, page_num, [], None, []
+            
+            while cells and not cells[-1]:
+                cells.pop()
+            if not cells:
+                continue
+            if header is None:
+                if is_header_row(cells):
+                    header = cells
+                elif len(preamble) < HEADER_SCAN_ROWS:
+                    preamble.append(cells)
+                else:
+                    # No recognizable header: the first row is the header
+                    header, rows, preamble = preamble[0], preamble[1:] + [cells], []
+                continue
+            
+            rows.append(cells)
+            if len(rows) == TABLE_PAGE_ROWS:
+                yield page_num, page_text(), "text"
+                page_num += 1
+                preamble, rows = [], []
+        
+        text = flush_sheet()
+        if text is not None:
+            yield page_num, text, "text"
     
-    def parse_brd(self, file_path: str) -> dict:
+    def parse_brd(self, file_path: str, brd_text: Optional[str] = None,
+                  outline: Optional[str] = None) -> dict:
         """
         Parse BRD and analyze its structure and completeness
         
         Args:
             file_path: Path to BRD file
+            brd_text: Text to analyze instead of extracting it from the file
+                (e.g. the page digest from fused vision extraction)
+            outline: Section outline to analyze instead of the full text
+                (last_outline, for Markdown/HTML documents)
             
         Returns:
             JSON result from Task 1 analysis
         """
         # Extract text from file
-        brd_text = self.extract_text_from_file(file_path)
+        if brd_text is None:
+            brd_text = self.extract_text_from_file(file_path)
         
         # Load prompt template
         system_prompt = self.llm_service.load_prompt_template('task1_brd_parsing')
         
-        # Prepare user prompt with BRD content
-        user_prompt = f"""Analyze the following Business Requirement Document:
+        # Prepare user prompt with BRD content, or its section outline when the document has one
+        if outline:
+            user_prompt = f"""Analyze the following Business Requirement Document from its section outline.
+Each line is one section: its number and heading, what it contains, and the start of its text.
+Use the section numbers and headings as locations.
+
+BRD OUTLINE:
+{outline}
+
+Perform a thorough analysis and return the JSON structure as specified."""
+        else:
+            user_prompt = f"""Analyze the following Business Requirement Document:
 
 BRD CONTENT:
 {brd_text}
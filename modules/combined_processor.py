@@ -5,7 +5,9 @@ This reduces total API calls from 3 to 1, saving approximately 30-40 seconds
 """
 
 import json
+from config import Config
 from modules.llm_service import LLMService
+from modules.requirement_prefilter import build_candidate_excerpt
 
 
 class CombinedProcessor:
@@ -25,6 +27,12 @@ class CombinedProcessor:
         """
         Perform comprehensive processing in a single API call
         
+        Long BRDs are sent as requirement-candidate excerpts (see
+        requirement_prefilter), the same input Task 2 extraction gets; context
+        synthesis then works from those excerpts, which keep the objective,
+        stakeholder, scope and risk sections, and from the structure analysis,
+        which outlines the whole document.
+        
         Args:
             brd_text: Full text extracted from BRD
             parsing_result: Structure analysis from BRD parser
@@ -35,6 +43,17 @@ class CombinedProcessor:
         # Load combined prompt template
         system_prompt = self.llm_service.load_prompt_template('combined_processing')
         
+        excerpt = build_candidate_excerpt(brd_text) if Config.REQUIREMENT_PREFILTER else None
+        if excerpt:
+            content_label = ("BRD EXCERPTS (candidate requirement statements and the objective, stakeholder, "
+                             "scope, assumption, constraint, risk and dependency sections, with their page "
+                             "markers, headings, table headers and surrounding context; [...] marks omitted "
+                             "text, and the structure analysis above outlines the whole document)")
+            brd_content = excerpt[0]
+        else:
+            content_label = "FULL BRD TEXT"
+            brd_content = brd_text
+        
         # Prepare comprehensive user prompt
         user_prompt = f"""Perform comprehensive analysis of the following BRD.
 
@@ -43,8 +62,8 @@ EXTRACT requirements, SYNTHESIZE context, and GENERATE user stories ALL IN ONE P
 BRD STRUCTURE ANALYSIS:
 {json.dumps(parsing_result, indent=2)}
 
-FULL BRD TEXT:
-{brd_text}
+{content_label}:
+{brd_content}
 
 Return the complete JSON structure with ALL sections:
 - requirements (business_objectives, stakeholders, functional_requirements, non_functional_requirements, constraints, assumptions, risks, dependencies)
@@ -56,7 +75,7 @@ Return the complete JSON structure with ALL sections:
 Be thorough and comprehensive. This is a single-pass analysis."""
         
         print("🚀 Starting comprehensive single-pass processing...")
-        print(f"📊 BRD length: {len(brd_text)} characters")
+        print(f"📊 BRD length: {len(brd_text)} characters ({len(brd_content)} sent)")
         
         # Execute comprehensive prompt with higher temperature for creativity in story generation
         result = self.llm_service.execute_prompt(
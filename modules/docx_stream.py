@@ -0,0 +1,179 @@
+"""
+Streaming DOCX Reader Module
+Reads word/document.xml incrementally and emits paragraphs, headings, table
+rows and page breaks in document order, without loading the whole document
+"""
+import re
+import zipfile
+from typing import BinaryIO, Dict, Iterator, List, Optional, Union
+from lxml import etree
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W = f"{{{W_NS}}}"
+
+# Style names Word uses for built-in headings ("heading 1", "Heading 2", ...)
+HEADING_STYLE_PATTERN = re.compile(r"^heading\s*(\d)$", re.IGNORECASE)
+
+
+def _heading_levels(archive: zipfile.ZipFile) -> Dict[str, int]:
+    """
+    Map paragraph style IDs to heading levels from word/styles.xml
+    
+    A style is a heading if it is named "heading N", has an outline level,
+    or is based on a heading style. "Title" counts as level 1.
+    """
+    try:
+        styles = etree.fromstring(archive.read("word/styles.xml"))
+    except KeyError:
+        return {}
+    
+    direct = {}
+    based_on = {}
+    for style in styles.iter(f"{W}style"):
+        if style.get(f"{W}type") != "paragraph":
+            continue
+        style_id = style.get(f"{W}styleId")
+        name = style.find(f"{W}name")
+        name = name.get(f"{W}val", "") if name is not None else ""
+        outline = style.find(f"{W}pPr/{W}outlineLvl")
+        
+        match = HEADING_STYLE_PATTERN.match(name.strip())
+        if match:
+            direct[style_id] = int(match.group(1))
+        elif outline is not None and outline.get(f"{W}val", "").isdigit() and int(outline.get(f"{W}val")) < 9:
+            direct[style_id] = int(outline.get(f"{W}val")) + 1
+        elif name.strip().lower() == "title":
+            direct[style_id] = 1
+        
+        parent = style.find(f"{W}basedOn")
+        if parent is not None:
+            based_on[style_id] = parent.get(f"{W}val")
+    
+    levels = {}
+    for style_id in based_on.keys() | direct.keys():
+        current, hops = style_id, 0
+        while current is not None and current not in direct and hops < 10:
+            current, hops = based_on.get(current), hops + 1
+        if current in direct:
+            levels[style_id] = direct[current]
+    return levels
+
+
+def _paragraph_text(paragraph) -> str:
+    """Visible text of a w:p element (tabs and line breaks kept, deleted text skipped)"""
+    parts = []
+    for element in paragraph.iter(f"{W}t", f"{W}tab", f"{W}br", f"{W}cr"):
+        if element.tag == f"{W}t":
+            parts.append(element.text or "")
+        elif element.tag == f"{W}tab":
+            parts.append("\t")
+        elif element.get(f"{W}type") in (None, "textWrapping"):
+            parts.append("\n")
+    return "".join(parts)
+
+
+def _page_break_position(paragraph) -> Optional[str]:
+    """Where a paragraph's first page break falls: 'before' or 'after' its text, or None"""
+    seen_text = False
+    for element in paragraph.iter(f"{W}t", f"{W}br", f"{W}lastRenderedPageBreak"):
+        if element.tag == f"{W}t":
+            seen_text = seen_text or bool(element.text)
+        elif element.tag == f"{W}lastRenderedPageBreak" or element.get(f"{W}type") == "page":
+            return "after" if seen_text else "before"
+    return None
+
+
+def _row_cells(row) -> List[str]:
+    """Cell texts of a w:tr element; nested tables are flattened into their cell"""
+    cells = []
+    for cell in row.iterchildren(f"{W}tc"):
+        text = " ".join(_paragraph_text(paragraph) for paragraph in cell.iter(f"{W}p"))
+        cells.append(" ".join(text.split()))
+    return cells
+
+
+def _release(element):
+    """Free a processed element and the already-processed siblings before it"""
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def iter_docx_blocks(source: Union[str, BinaryIO]) -> Iterator[dict]:
+    """
+    Stream the body of a DOCX document in document order
+    
+    Only the element being read is kept in memory; processed paragraphs and
+    table rows are released as soon as they are emitted.
+    
+    Args:
+        source: Path to a .docx file, or a binary file object
+    
+    Yields:
+        Dicts with a "type" key:
+        - {"type": "heading", "level": int, "text": str}
+        - {"type": "paragraph", "text": str}
+        - {"type": "table_row", "table": int, "row": int, "cells": [str]}
+          (table is a one-based count of top-level tables, row zero-based)
+        - {"type": "page_break"} at explicit and last-rendered page breaks
+        Empty paragraphs are skipped.
+    """
+    with zipfile.ZipFile(source) as archive:
+        heading_levels = _heading_levels(archive)
+        
+        with archive.open("word/document.xml") as document:
+            table_depth = 0
+            table_count = 0
+            row_index = 0
+            for event, element in etree.iterparse(document, events=("start", "end"),
+                                                  tag=(f"{W}p", f"{W}tbl", f"{W}tr")):
+                if element.tag == f"{W}tbl":
+                    if event == "start":
+                        table_depth += 1
+                        if table_depth == 1:
+                            table_count += 1
+                            row_index = 0
+                    else:
+                        table_depth -= 1
+                        if table_depth == 0:
+                            _release(element)
+                    continue
+                
+                if event != "end":
+                    continue
+                
+                if element.tag == f"{W}tr":
+                    if table_depth == 1:
+                        cells = _row_cells(element)
+                        if any(cells):
+                            yield {"type": "table_row", "table": table_count, "row": row_index, "cells": cells}
+                            row_index += 1
+                        _release(element)
+                    continue
+                
+                # Paragraphs inside tables are read with their row
+                if table_depth:
+                    continue
+                
+                break_position = _page_break_position(element)
+                if break_position == "before":
+                    yield {"type": "page_break"}
+                
+                text = _paragraph_text(element)
+                if text.strip():
+                    style = element.find(f"{W}pPr/{W}pStyle")
+                    outline = element.find(f"{W}pPr/{W}outlineLvl")
+                    level = heading_levels.get(style.get(f"{W}val")) if style is not None else None
+                    if outline is not None and outline.get(f"{W}val", "").isdigit() and int(outline.get(f"{W}val")) < 9:
+                        level = int(outline.get(f"{W}val")) + 1
+                    
+                    if level:
+                        yield {"type": "heading", "level": level, "text": text.strip()}
+                    else:
+                        yield {"type": "paragraph", "text": text}
+                
+                if break_position == "after":
+                    yield {"type": "page_break"}
+                _release(element)
@@ -0,0 +1,135 @@
+"""
+Extraction Cache Module
+Persistent, content-addressed cache of extracted document text, shared by
+every session and worker process on the machine
+"""
+import hashlib
+import sqlite3
+import time
+import zlib
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+from config import Config
+
+# Bump whenever a change to extraction alters its output, so stale text is never reused
+EXTRACTOR_VERSION = "5"
+
+# Failed extractions (whole-document messages, or a page that errored) are never cached
+FAILED_EXTRACTION_PREFIXES = ("OCR Error", "Error processing", "No text extracted", "⚠️")
+
+# Text the OCR pipeline leaves in a page it could not fully transcribe (shared with azure_vision_ocr
+# and searchable_pdf, so a failed page is never cached, indexed or written to a text layer)
+FAILED_PAGE_MARKERS = ("[Error: ", "[OCR failed - ", "[Rendering failed]", "[Image OCR failed - ", "[OCR truncated - ")
+
+
+def is_failed_page(text: str) -> bool:
+    """Whether page (or document) text contains a failed-page marker"""
+    return any(marker in text for marker in FAILED_PAGE_MARKERS)
+
+
+def content_key(sha256: str, extension: str) -> str:
+    """Cache key from an already computed content hash and the file type"""
+    return f"{sha256}:{extension.lower()}:v{EXTRACTOR_VERSION}"
+
+
+def document_key(file_path: str) -> str:
+    """
+    Content key for a document: hash of its bytes, file type and extractor version
+    
+    The same document uploaded under any name or temp path maps to one key.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return content_key(digest.hexdigest(), Path(file_path).suffix)
+
+
+class ExtractionCache:
+    """
+    SQLite-backed text cache with least-recently-used eviction
+    
+    SQLite handles locking between processes, so Streamlit sessions and
+    worker processes can share one cache file. Text is stored compressed, and
+    the oldest entries are evicted once the total exceeds max_bytes.
+    """
+    
+    def __init__(self, cache_path: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.cache_path = cache_path or Path.home() / ".brd_ocr_cache" / "extraction_cache.sqlite"
+        self.max_bytes = max_bytes or Config.EXTRACTION_CACHE_MAX_MB * 1024 * 1024
+        self.enabled = Config.EXTRACTION_CACHE_ENABLED
+        if self.enabled:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with closing(self._connect()) as connection, connection:
+                connection.execute("PRAGMA journal_mode=WAL")  # Readers never block the writer
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS documents ("
+                    "key TEXT PRIMARY KEY, text BLOB NOT NULL, size INTEGER NOT NULL, "
+                    "created REAL NOT NULL, accessed REAL NOT NULL)"
+                )
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a short-lived connection (safe across threads and processes)"""
+        return sqlite3.connect(str(self.cache_path), timeout=30)
+    
+    def get(self, key: str) -> Optional[str]:
+        """Look up extracted text by document key, marking the entry as recently used"""
+        if not self.enabled:
+            return None
+        
+        try:
+            with closing(self._connect()) as connection, connection:
+                row = connection.execute("SELECT text FROM documents WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                connection.execute("UPDATE documents SET accessed = ? WHERE key = ?", (time.time(), key))
+            text = zlib.decompress(row[0]).decode("utf-8")
+            # Entries written before a failure marker was recognized are extracted again
+            return None if is_failed_page(text) else text
+        except Exception as e:
+            print(f"⚠️ Extraction cache read error: {e}")
+            return None
+    
+    def put(self, key: str, text: str):
+        """Store extracted text, then evict least-recently-used entries over the size limit"""
+        if not self.enabled or not text.strip():
+            return
+        if text.startswith(FAILED_EXTRACTION_PREFIXES) or is_failed_page(text):
+            return
+        
+        blob = zlib.compress(text.encode("utf-8"), 6)
+        if len(blob) > self.max_bytes:
+            return
+        
+        try:
+            with closing(self._connect()) as connection, connection:
+                now = time.time()
+                connection.execute(
+                    "INSERT OR REPLACE INTO documents (key, text, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, blob, len(blob), now, now)
+                )
+                self._evict(connection)
+        except Exception as e:
+            print(f"⚠️ Extraction cache write error: {e}")
+    
+    def _evict(self, connection: sqlite3.Connection):
+        """Delete the least recently used entries until the cache fits in max_bytes"""
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        evicted = 0
+        for key, size in connection.execute("SELECT key, size FROM documents ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            connection.execute("DELETE FROM documents WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        print(f"🧹 Extraction cache: evicted {evicted} least recently used document(s)")
+    
+    def clear(self):
+        """Remove every cached document"""
+        if self.enabled:
+            with closing(self._connect()) as connection, connection:
+                connection.execute("DELETE FROM documents")
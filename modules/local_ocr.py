@@ -0,0 +1,120 @@
+"""
+Local OCR Module
+Process-parallel Tesseract OCR tier that runs before Azure Vision and
+escalates low-confidence pages
+"""
+import io
+import os
+import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Optional, Tuple
+from PIL import Image
+from config import Config
+
+# Tesseract check
+try:
+    import pytesseract
+    TESSERACT_SUPPORT = True
+except ImportError:
+    TESSERACT_SUPPORT = False
+
+# Common Windows installation paths, used when tesseract is not on PATH
+WINDOWS_TESSERACT_PATHS = [
+    r"C:\Program Files\Tesseract-OCR\tesseract.exe",
+    r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
+]
+
+
+def find_tesseract_cmd() -> Optional[str]:
+    """
+    Locate the tesseract executable
+    
+    Returns:
+        TESSERACT_CMD if set, else tesseract on PATH, else a standard Windows
+        install location; None if Tesseract is not installed
+    """
+    if Config.TESSERACT_CMD:
+        return Config.TESSERACT_CMD if os.path.exists(Config.TESSERACT_CMD) else None
+    
+    on_path = shutil.which("tesseract")
+    if on_path:
+        return on_path
+    
+    return next((path for path in WINDOWS_TESSERACT_PATHS if os.path.exists(path)), None)
+
+
+def _ocr_image_bytes(image_bytes: bytes, tesseract_cmd: str, lang: str) -> Tuple[str, float, int]:
+    """
+    OCR one encoded page image (runs in a worker process)
+    
+    Returns:
+        (text, mean word confidence 0-100, word count)
+    """
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        data = pytesseract.image_to_data(img, lang=lang, output_type=pytesseract.Output.DICT)
+    
+    # Rebuild lines and paragraphs from Tesseract's word boxes
+    lines = {}
+    confidences = []
+    for index, word in enumerate(data["text"]):
+        confidence = float(data["conf"][index])
+        if confidence < 0 or not word.strip():
+            continue
+        confidences.append(confidence)
+        key = (data["block_num"][index], data["par_num"][index], data["line_num"][index])
+        lines.setdefault(key, []).append(word.strip())
+    
+    paragraphs = {}
+    for (block_num, par_num, _), words in sorted(lines.items()):
+        paragraphs.setdefault((block_num, par_num), []).append(" ".join(words))
+    text = "\n\n".join("\n".join(paragraph) for paragraph in paragraphs.values())
+    
+    mean_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return text, mean_confidence, len(confidences)
+
+
+class LocalOCR:
+    """Tesseract OCR over a process pool, with a confidence gate for escalation"""
+    
+    def __init__(self, max_workers: Optional[int] = None):
+        self.tesseract_cmd = find_tesseract_cmd() if TESSERACT_SUPPORT else None
+        self.lang = Config.LOCAL_OCR_LANG
+        self.min_confidence = Config.LOCAL_OCR_MIN_CONFIDENCE
+        self.min_words = 5  # Fewer words than this usually means handwriting or a figure
+        self.max_workers = max_workers or Config.LOCAL_OCR_WORKERS or os.cpu_count() or 1
+        self._executor = None
+    
+    @property
+    def available(self) -> bool:
+        """Check whether pytesseract and the tesseract binary are both present"""
+        return self.tesseract_cmd is not None
+    
+    def submit(self, img: Image.Image) -> Future:
+        """
+        Queue a preprocessed page image for OCR
+        
+        Returns:
+            Future resolving to (text, mean word confidence, word count)
+        """
+        if self._executor is None:
+            # Spawned workers do not inherit the Vision thread pool or open PDFs
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG", compress_level=1)
+        return self._executor.submit(_ocr_image_bytes, buffer.getvalue(), self.tesseract_cmd, self.lang)
+    
+    def is_confident(self, confidence: float, word_count: int) -> bool:
+        """Decide whether a Tesseract result is good enough to skip Vision"""
+        return word_count >= self.min_words and confidence >= self.min_confidence
+    
+    def close(self):
+        """Shut down the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,483 @@
+"""
+Streaming Markdown/HTML Reader Module
+Reads Markdown and HTML documents (e.g. Confluence exports) incrementally and
+emits headings, paragraphs, list items and table rows in document order, and
+builds the heading tree used as a compact outline for BRD structure analysis
+"""
+import codecs
+import io
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+MARKDOWN_EXTENSIONS = {'.md', '.markdown'}
+HTML_EXTENSIONS = {'.html', '.htm'}
+MARKUP_EXTENSIONS = MARKDOWN_EXTENSIONS | HTML_EXTENSIONS
+
+# Characters of text read per parser step
+CHUNK_CHARS = 64 * 1024
+
+# Characters of a section's first text shown in its outline line
+EXCERPT_CHARS = 160
+
+ATX_HEADING_PATTERN = re.compile(r"^ {0,3}(#{1,6})\s+(.*?)(\s+#+)?\s*$")
+SETEXT_UNDERLINE_PATTERN = re.compile(r"^ {0,3}(=+|-+)\s*$")
+LIST_ITEM_PATTERN = re.compile(r"^(\s*)([-*+]|\d{1,3}[.)])\s+(.*)$")
+TABLE_SEPARATOR_PATTERN = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$")
+FENCE_PATTERN = re.compile(r"^\s*(```|~~~)")
+THEMATIC_BREAK_PATTERN = re.compile(r"^([-*_])(\s*\1){2,}$")
+# Tables already serialized by pdf_layout.serialize_table ("[Table 2.1: 8 rows]" then "a | b" rows)
+SERIALIZED_TABLE_PATTERN = re.compile(r"^\[Table \d+\.\d+: \d+ rows\]$")
+# Headings that carry their own section number ("2.1 Billing", "3. Scope", "A.1 Glossary")
+NUMBERED_TITLE_PATTERN = re.compile(r"^([A-Z]|\d+)(\.\d+)*\.?\s")
+
+# HTML elements whose content is never document text
+HTML_SKIP_TAGS = {"script", "style", "head", "nav", "noscript", "template", "svg", "button", "form"}
+# HTML elements that end the current paragraph
+HTML_BLOCK_TAGS = {"p", "div", "section", "article", "main", "header", "footer", "aside", "blockquote",
+                   "pre", "dl", "dt", "dd", "figure", "figcaption", "hr", "address", "details", "summary"}
+HTML_CHARSET_PATTERN = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+
+
+def _open_text(source, encoding: str = "utf-8"):
+    """Text stream for a path, an in-memory uploaded document, or an already open text stream"""
+    if hasattr(source, "read"):
+        return source
+    if hasattr(source, "data"):
+        return io.TextIOWrapper(source.open(), encoding=encoding, errors="replace")
+    return open(source, 'r', encoding=encoding, errors="replace")
+
+
+def _split_table_row(line: str) -> List[str]:
+    """Cells of a Markdown pipe-table row (outer pipes optional, "\\|" kept as text)"""
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|") and not line.endswith("\\|"):
+        line = line[:-1]
+    return [" ".join(cell.replace("\\|", "|").split()) for cell in re.split(r"(?<!\\)\|", line)]
+
+
+def iter_markdown_blocks(source) -> Iterator[dict]:
+    """
+    Stream a Markdown document in document order, one line at a time
+    
+    Handles ATX ("## Title") and setext headings, bulleted and numbered
+    lists (nesting from indentation), GitHub pipe tables, tables serialized
+    by pdf_layout.serialize_table, block quotes, fenced code and YAML front
+    matter (skipped).
+    
+    Args:
+        source: Path to a .md file, an in-memory uploaded document, or an
+            open text stream
+    
+    Yields:
+        Dicts with a "type" key, as iter_docx_blocks:
+        - {"type": "heading", "level": int, "text": str}
+        - {"type": "paragraph", "text": str}
+        - {"type": "list_item", "level": int, "marker": str, "text": str}
+          (level is the zero-based nesting depth, marker "-" or "3.")
+        - {"type": "table_row", "table": int, "row": int, "cells": [str]}
+    """
+    paragraph = []
+    list_item = None
+    table_count = 0
+    table_row = None  # Next row index while inside a table
+    serialized_table = False
+    fence = None
+    fenced = []
+    
+    def flush():
+        nonlocal paragraph, list_item
+        blocks = []
+        if list_item is not None:
+            blocks.append(list_item)
+            list_item = None
+        if paragraph:
+            blocks.append({"type": "paragraph", "text": "\n".join(paragraph)})
+            paragraph = []
+        return blocks
+    
+    with _open_text(source) as text:
+        for line_number, line in enumerate(text):
+            line = line.rstrip("\r\n")
+            
+            # YAML front matter
+            if line_number == 0 and line.strip() == "---":
+                fence = "---"
+                continue
+            if fence == "---":
+                if line.strip() in ("---", "..."):
+                    fence = None
+                continue
+            
+            # Fenced code is kept verbatim as one paragraph
+            match = FENCE_PATTERN.match(line)
+            if fence:
+                if match and match.group(1) == fence:
+                    yield {"type": "paragraph", "text": "\n".join(fenced)}
+                    fence, fenced = None, []
+                else:
+                    fenced.append(line)
+                continue
+            if match:
+                yield from flush()
+                table_row = None
+                fence = match.group(1)
+                continue
+            
+            stripped = line.strip()
+            if stripped.startswith(">"):
+                stripped = stripped.lstrip("> ").strip()
+            
+            if table_row is not None:
+                # Pipe tables end at a line without pipes, serialized tables at a blank line
+                if stripped and ("|" in stripped or serialized_table):
+                    cells = _split_table_row(stripped) if "|" in stripped else [stripped]
+                    if any(cells):
+                        yield {"type": "table_row", "table": table_count, "row": table_row, "cells": cells}
+                        table_row += 1
+                    continue
+                table_row = None
+            
+            if not stripped:
+                yield from flush()
+                continue
+            
+            match = ATX_HEADING_PATTERN.match(line)
+            if match:
+                yield from flush()
+                yield {"type": "heading", "level": len(match.group(1)), "text": match.group(2).strip()}
+                continue
+            
+            match = SETEXT_UNDERLINE_PATTERN.match(line)
+            if match and paragraph and list_item is None:
+                title = " ".join(paragraph)
+                paragraph = []
+                yield {"type": "heading", "level": 1 if match.group(1)[0] == "=" else 2, "text": title}
+                continue
+            
+            if THEMATIC_BREAK_PATTERN.match(stripped):
+                yield from flush()
+                continue
+            
+            if SERIALIZED_TABLE_PATTERN.match(stripped):
+                yield from flush()
+                table_count += 1
+                table_row, serialized_table = 0, True
+                continue
+            
+            if TABLE_SEPARATOR_PATTERN.match(stripped) and "-" in stripped and paragraph and "|" in paragraph[-1]:
+                header = paragraph.pop()
+                yield from flush()
+                table_count += 1
+                yield {"type": "table_row", "table": table_count, "row": 0, "cells": _split_table_row(header)}
+                table_row, serialized_table = 1, False
+                continue
+            
+            match = LIST_ITEM_PATTERN.match(line)
+            if match:
+                yield from flush()
+                list_item = {"type": "list_item", "level": len(match.group(1).expandtabs(4)) // 2,
+                             "marker": match.group(2), "text": match.group(3).strip()}
+                continue
+            
+            if list_item is not None and line[:1].isspace():
+                list_item["text"] += " " + stripped  # Continuation of the item
+                continue
+            
+            if list_item is not None:
+                yield from flush()
+            paragraph.append(stripped)
+        
+        if fenced:
+            yield {"type": "paragraph", "text": "\n".join(fenced)}
+        yield from flush()
+
+
+class _HTMLBlockParser(HTMLParser):
+    """Collects document blocks from HTML fed in chunks (see iter_html_blocks)"""
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self.parts = []
+        self.skip_depth = 0
+        self.pre_depth = 0
+        self.heading_level = None
+        self.lists = []  # Open lists: [ordered, items seen]
+        self.items = []  # Open list items: (level, marker)
+        self.table_depth = 0
+        self.table_count = 0
+        self.row_index = 0
+        self.row = None
+        self.cell = None
+    
+    def _text(self) -> str:
+        text = "".join(self.parts)
+        self.parts = []
+        if self.pre_depth:
+            return text.strip("\n")
+        return "\n".join(" ".join(line.split()) for line in text.split("\n")).strip()
+    
+    def _flush(self):
+        """End the current paragraph, list item text or heading"""
+        text = self._text()
+        if not text:
+            return
+        if self.heading_level:
+            self.blocks.append({"type": "heading", "level": self.heading_level, "text": " ".join(text.split())})
+        elif self.items:
+            level, marker = self.items[-1]
+            self.blocks.append({"type": "list_item", "level": level, "marker": marker, "text": text})
+        else:
+            self.blocks.append({"type": "paragraph", "text": text})
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in HTML_SKIP_TAGS:
+            self.skip_depth += 1
+        if self.skip_depth:
+            return
+        
+        if self.table_depth and self.cell is not None:
+            # Inside a cell only text matters; nested tables are flattened into it
+            if tag == "table":
+                self.table_depth += 1
+            elif tag in ("br", "p", "li", "div", "td", "th"):
+                self.cell.append(" ")
+            return
+        
+        if re.fullmatch(r"h[1-6]", tag):
+            self._flush()
+            self.heading_level = int(tag[1])
+        elif tag in HTML_BLOCK_TAGS:
+            self._flush()
+            if tag == "pre":
+                self.pre_depth += 1
+        elif tag == "br":
+            self.parts.append("\n")
+        elif tag in ("ul", "ol"):
+            self._flush()
+            self.lists.append([tag == "ol", 0])
+        elif tag == "li":
+            self._flush()
+            if self.lists:
+                self.lists[-1][1] += 1
+                ordered, count = self.lists[-1]
+                self.items.append((len(self.lists) - 1, f"{count}." if ordered else "-"))
+            else:
+                self.items.append((0, "-"))
+        elif tag == "table":
+            self._flush()
+            self.table_depth += 1
+            self.table_count += 1
+            self.row_index = 0
+        elif tag == "tr" and self.table_depth == 1:
+            self.row = []
+        elif tag in ("td", "th") and self.table_depth == 1:
+            self.cell = []
+    
+    def handle_endtag(self, tag):
+        if tag in HTML_SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+            return
+        if self.skip_depth:
+            return
+        
+        if self.table_depth:
+            if tag == "table":
+                self.table_depth -= 1
+                if self.table_depth == 0:
+                    self.cell = self.row = None
+            elif self.table_depth == 1 and tag in ("td", "th") and self.cell is not None:
+                if self.row is not None:
+                    self.row.append(" ".join("".join(self.cell).split()))
+                self.cell = None
+            elif self.table_depth == 1 and tag == "tr" and self.row is not None:
+                if any(self.row):
+                    self.blocks.append({"type": "table_row", "table": self.table_count,
+                                        "row": self.row_index, "cells": self.row})
+                    self.row_index += 1
+                self.row = None
+            return
+        
+        if re.fullmatch(r"h[1-6]", tag):
+            self._flush()
+            self.heading_level = None
+        elif tag in HTML_BLOCK_TAGS:
+            self._flush()
+            if tag == "pre":
+                self.pre_depth = max(0, self.pre_depth - 1)
+        elif tag == "li":
+            self._flush()
+            if self.items:
+                self.items.pop()
+        elif tag in ("ul", "ol"):
+            self._flush()
+            if self.lists:
+                self.lists.pop()
+    
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        if self.table_depth:
+            if self.cell is not None:
+                self.cell.append(data)
+            return
+        self.parts.append(data)
+    
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def _html_encoding(source) -> str:
+    """Charset declared in the first 4 KB of an HTML file (default UTF-8)"""
+    if hasattr(source, "read"):
+        return "utf-8"
+    if hasattr(source, "data"):
+        head = source.data[:4096]
+    else:
+        with open(source, 'rb') as file:
+            head = file.read(4096)
+    match = HTML_CHARSET_PATTERN.search(head)
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+def iter_html_blocks(source) -> Iterator[dict]:
+    """
+    Stream an HTML document in document order
+    
+    The document is fed to the parser in CHUNK_CHARS pieces and blocks are
+    yielded as soon as they close. Scripts, styles, <head> and navigation
+    are skipped.
+    
+    Args:
+        source: Path to an .html file, an in-memory uploaded document, or an
+            open text stream
+    
+    Yields:
+        Block dicts as iter_markdown_blocks
+    """
+    parser = _HTMLBlockParser()
+    with _open_text(source, _html_encoding(source)) as text:
+        for chunk in iter(lambda: text.read(CHUNK_CHARS), ""):
+            parser.feed(chunk)
+            yield from parser.blocks
+            parser.blocks = []
+    parser.close()
+    yield from parser.blocks
+
+
+def iter_markup_blocks(source) -> Iterator[dict]:
+    """
+    Stream a Markdown or HTML document (see iter_markdown_blocks and iter_html_blocks)
+    
+    Args:
+        source: Path to a .md/.markdown/.html/.htm file, or an in-memory uploaded document
+    """
+    extension = source.extension if hasattr(source, "data") else Path(source).suffix.lower()
+    if extension in HTML_EXTENSIONS:
+        return iter_html_blocks(source)
+    if extension in MARKDOWN_EXTENSIONS:
+        return iter_markdown_blocks(source)
+    raise ValueError(f"Unsupported markup format: {extension}")
+
+
+def _section(level: int, title: str, number: str) -> dict:
+    """Empty section node for build_section_tree"""
+    return {"level": level, "title": title, "number": number, "paragraphs": 0, "list_items": 0,
+            "tables": 0, "table_rows": 0, "words": 0, "excerpt": "", "children": []}
+
+
+def build_section_tree(blocks) -> dict:
+    """
+    Build the heading tree of a block stream
+    
+    Every heading opens a section under the nearest shallower heading and
+    is numbered by position ("2", "2.1", ...). Sections count their own
+    paragraphs, list items, tables and words, and keep the start of their
+    first text as an excerpt.
+    
+    Args:
+        blocks: Block dicts from iter_markup_blocks, iter_markdown_blocks or iter_docx_blocks
+    
+    Returns:
+        Root section (level 0, holding content before the first heading) with
+        nested "children"
+    """
+    root = _section(0, "", "")
+    stack = [root]
+    tables_seen = set()
+    for block in blocks:
+        if block["type"] == "heading":
+            while len(stack) > 1 and stack[-1]["level"] >= block["level"]:
+                stack.pop()
+            parent = stack[-1]
+            number = f"{parent['number']}.{len(parent['children']) + 1}".lstrip(".")
+            section = _section(block["level"], block["text"], number)
+            parent["children"].append(section)
+            stack.append(section)
+            continue
+        
+        section = stack[-1]
+        if block["type"] == "table_row":
+            text = " | ".join(block["cells"])
+            if block["table"] not in tables_seen:
+                tables_seen.add(block["table"])
+                section["tables"] += 1
+            else:
+                section["table_rows"] += 1
+        else:
+            text = block.get("text", "")
+            section["list_items" if block["type"] == "list_item" else "paragraphs"] += 1
+        section["words"] += len(text.split())
+        if not section["excerpt"] and text.strip():
+            section["excerpt"] = " ".join(text.split())[:EXCERPT_CHARS]
+    return root
+
+
+def render_outline(root: dict, excerpt_chars: Optional[int] = EXCERPT_CHARS) -> str:
+    """
+    Render a section tree as an indented outline, one line per section
+    
+    Each line has the section number (unless the heading has its own) and
+    title, its content counts and the start of its text, e.g.
+    '  2.1 Billing — 2 paragraphs, 1 table (8 rows), 180 words: "The system shall..."'
+    """
+    lines = []
+    
+    def describe(section: dict) -> str:
+        counts = []
+        for key, label in (("paragraphs", "paragraph"), ("list_items", "list item")):
+            if section[key]:
+                counts.append(f"{section[key]} {label}{'s' if section[key] != 1 else ''}")
+        if section["tables"]:
+            counts.append(f"{section['tables']} table{'s' if section['tables'] != 1 else ''} "
+                          f"({section['table_rows']} rows)")
+        if section["words"]:
+            counts.append(f"{section['words']} words")
+        description = ", ".join(counts) or "empty"
+        if excerpt_chars and section["excerpt"]:
+            excerpt = section["excerpt"][:excerpt_chars]
+            description += f': "{excerpt}{"..." if len(excerpt) >= excerpt_chars else ""}"'
+        return description
+    
+    def walk(section: dict, depth: int):
+        for child in section["children"]:
+            title = child["title"]
+            if not NUMBERED_TITLE_PATTERN.match(title):
+                title = f"{child['number']} {title}"
+            lines.append(f"{'  ' * depth}{title} — {describe(child)}")
+            walk(child, depth + 1)
+    
+    if root["words"]:
+        lines.append(f"(Before the first heading) — {describe(root)}")
+    walk(root, 0)
+    return "\n".join(lines)
@@ -0,0 +1,317 @@
+"""
+PDF Layout Analysis Module
+Splits PDF pages into native text blocks, tables and image regions using PyMuPDF
+"""
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+from config import Config
+
+# PDF library check
+try:
+    import fitz  # PyMuPDF
+    PDF_SUPPORT = True
+except ImportError:
+    PDF_SUPPORT = False
+
+BBox = Tuple[float, float, float, float]
+
+# Image regions smaller than this fraction of the page (logos, icons) are ignored
+MIN_IMAGE_AREA_FRACTION = 0.03
+
+# Image regions already covered by this many characters of native text
+# (e.g. scans with an existing OCR layer) are not re-OCR'd
+COVERED_REGION_MIN_CHARS = 30
+
+# Vector segments a page needs before table detection runs: a ruled table with
+# a header and one row has at least three horizontal and two vertical rules
+MIN_TABLE_HORIZONTAL_RULES = 3
+MIN_TABLE_VERTICAL_RULES = 2
+
+# Points a segment may slant, or a filled rectangle may be thick, and still count as a rule
+RULE_TOLERANCE = 2.0
+
+
+def _area(bbox: BBox) -> float:
+    """Area of a bounding box (0 if empty)"""
+    return max(0.0, bbox[2] - bbox[0]) * max(0.0, bbox[3] - bbox[1])
+
+
+def _intersection(first: BBox, second: BBox) -> BBox:
+    """Overlap of two bounding boxes"""
+    return (max(first[0], second[0]), max(first[1], second[1]),
+            min(first[2], second[2]), min(first[3], second[3]))
+
+
+def _center_inside(inner: BBox, outer: BBox) -> bool:
+    """Check whether the center of one box lies inside another"""
+    cx, cy = (inner[0] + inner[2]) / 2, (inner[1] + inner[3]) / 2
+    return outer[0] <= cx <= outer[2] and outer[1] <= cy <= outer[3]
+
+
+def _clean_table_rows(rows: List[List[str]]) -> List[List[str]]:
+    """Collapse cell whitespace and drop empty rows and columns"""
+    cleaned = [[" ".join(str(cell or "").split()) for cell in row] for row in rows]
+    cleaned = [row for row in cleaned if any(row)]
+    if not cleaned:
+        return []
+    
+    width = max(len(row) for row in cleaned)
+    cleaned = [row + [""] * (width - len(row)) for row in cleaned]
+    keep = [col for col in range(width) if any(row[col] for row in cleaned)]
+    return [[row[col] for col in keep] for row in cleaned]
+
+
+def _count_rules(drawings) -> Tuple[int, int]:
+    """
+    Count horizontal and vertical rules among a page's vector drawings
+    
+    Lines count by direction; a rectangle counts as one rule when it is a thin
+    filled bar, otherwise as its four edges.
+    
+    Returns:
+        (horizontal rules, vertical rules)
+    """
+    horizontal = vertical = 0
+    for drawing in drawings:
+        for item in drawing["items"]:
+            if item[0] == "l":
+                (x0, y0), (x1, y1) = item[1], item[2]
+                if abs(y1 - y0) <= RULE_TOLERANCE:
+                    horizontal += 1
+                elif abs(x1 - x0) <= RULE_TOLERANCE:
+                    vertical += 1
+            elif item[0] == "re":
+                x0, y0, x1, y1 = item[1]
+                thin_height, thin_width = abs(y1 - y0) <= RULE_TOLERANCE, abs(x1 - x0) <= RULE_TOLERANCE
+                horizontal += 1 if thin_height else 0 if thin_width else 2
+                vertical += 1 if thin_width else 0 if thin_height else 2
+    return horizontal, vertical
+
+
+def extract_tables(page) -> List[Tuple[BBox, List[List[str]]]]:
+    """
+    Detect ruled tables on a page with PyMuPDF table detection
+    
+    Args:
+        page: PyMuPDF page
+    
+    Returns:
+        List of (bbox, rows) with the header as the first row
+    """
+    if not hasattr(page, "find_tables"):
+        return []
+    
+    # Ruled tables are built from vector lines; table detection is by far the
+    # slowest step per page, so it only runs when the drawings can form a grid
+    # (a header rule or a box around a paragraph cannot)
+    drawings = page.get_cdrawings() if hasattr(page, "get_cdrawings") else page.get_drawings()
+    horizontal, vertical = _count_rules(drawings)
+    if horizontal < MIN_TABLE_HORIZONTAL_RULES or vertical < MIN_TABLE_VERTICAL_RULES:
+        return []
+    
+    tables = []
+    try:
+        for table in page.find_tables().tables:
+            rows = _clean_table_rows(table.extract())
+            if len(rows) >= 2 and len(rows[0]) >= 2:
+                tables.append((tuple(table.bbox), rows))
+    except Exception as e:
+        print(f"  ⚠️ Table detection failed on page {page.number + 1}: {e}")
+    return tables
+
+
+def serialize_table(rows: List[List[str]], page_num: int, table_num: int) -> str:
+    """
+    Serialize table rows compactly for LLM prompts
+    
+    Args:
+        rows: Cleaned rows, header first
+        page_num: Zero-based page number
+        table_num: One-based table number on the page
+    
+    Returns:
+        A tagged header line followed by one pipe-separated line per row
+    """
+    lines = [f"[Table {page_num + 1}.{table_num}: {len(rows) - 1} rows]"]
+    lines.extend(" | ".join(row) for row in rows)
+    return "\n".join(lines)
+
+
+def analyze_page_layout(page, detect_tables: bool = True) -> dict:
+    """
+    Collect a page's native text blocks, tables and the image regions that need OCR
+    
+    Text inside detected tables is replaced by the serialized table, so
+    table content appears once, as structured rows.
+    
+    Args:
+        page: PyMuPDF page
+        detect_tables: Run PyMuPDF table detection
+    
+    Returns:
+        Dict with text_blocks [(bbox, text)], image_regions [bbox], tables
+        [(bbox, rows)], text_chars (native characters on the page) and page_area
+    """
+    page_rect = page.rect
+    page_area = _area(tuple(page_rect))
+    
+    text_blocks = []
+    for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks"):
+        if block_type == 0 and text.strip():
+            text_blocks.append(((x0, y0, x1, y1), text.strip()))
+    
+    tables = extract_tables(page) if detect_tables and text_blocks else []
+    for table_num, (table_bbox, rows) in enumerate(tables, start=1):
+        text_blocks = [
+            (bbox, text) for bbox, text in text_blocks
+            if not _center_inside(bbox, table_bbox)
+        ]
+        text_blocks.append((table_bbox, serialize_table(rows, page.number, table_num)))
+    
+    image_regions = []
+    for info in page.get_image_info():
+        bbox = _intersection(tuple(info["bbox"]), tuple(page_rect))
+        if _area(bbox) < page_area * MIN_IMAGE_AREA_FRACTION:
+            continue
+        
+        # Skip regions whose content is already present in the text layer
+        covered_chars = sum(len(text) for block_bbox, text in text_blocks if _center_inside(block_bbox, bbox))
+        if covered_chars >= COVERED_REGION_MIN_CHARS:
+            continue
+        
+        # Overlapping placements of the same picture only need one crop
+        if any(_area(_intersection(bbox, existing)) > 0.9 * _area(bbox) for existing in image_regions):
+            continue
+        image_regions.append(bbox)
+    
+    return {
+        "text_blocks": text_blocks,
+        "image_regions": image_regions,
+        "tables": tables,
+        "text_chars": sum(len(text) for _, text in text_blocks),
+        "page_area": page_area,
+    }
+
+
+def merge_in_reading_order(items: List[Tuple[BBox, str]], line_tolerance: float = 5.0) -> str:
+    """
+    Join positioned text fragments top-to-bottom, then left-to-right
+    
+    Args:
+        items: (bbox, text) pairs in PDF points
+        line_tolerance: Vertical distance (points) treated as the same line
+    
+    Returns:
+        Merged text
+    """
+    ordered = sorted(items, key=lambda item: (round(item[0][1] / line_tolerance), item[0][0]))
+    return "\n\n".join(text for _, text in ordered if text.strip())
+
+
+def open_pdf(source):
+    """
+    Open a PDF with PyMuPDF from a path, or from memory for an uploaded
+    document (anything with .data bytes, see upload_ingest.UploadedDocument)
+    """
+    if hasattr(source, "data"):
+        return fitz.open(stream=source.data, filetype="pdf")
+    return fitz.open(source)
+
+
+def _scan_page_range(pdf_path: str, start: int, stop: int) -> List[Tuple[str, bool, int, int]]:
+    """
+    Extract text and layout for pages [start, stop) (runs in a worker process for large PDFs)
+    
+    Args:
+        pdf_path: Path to the PDF, or an in-memory uploaded document (in-process only)
+    
+    Returns:
+        Per page: (text, has image regions, table count, table row count).
+        Pages with tables get reading-order text with the tables serialized as
+        rows; other pages get PyMuPDF's plain text.
+    """
+    results = []
+    with open_pdf(pdf_path) as pdf_document:
+        for page_num in range(start, stop):
+            page = pdf_document[page_num]
+            layout = analyze_page_layout(page)
+            tables = layout["tables"]
+            if tables:
+                text = merge_in_reading_order(layout["text_blocks"])
+            else:
+                text = page.get_text()
+            results.append((
+                text,
+                bool(layout["image_regions"]),
+                len(tables),
+                sum(len(rows) - 1 for _, rows in tables),
+            ))
+    return results
+
+
+def _page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """Split pages into contiguous ranges, about four per worker so slow pages even out"""
+    shard_size = max(Config.PDF_TEXT_MIN_SHARD_PAGES, math.ceil(page_count / (workers * 4)))
+    return [(start, min(start + shard_size, page_count)) for start in range(0, page_count, shard_size)]
+
+
+def scan_pdf_layout(pdf_path: str, max_workers: int = None) -> dict:
+    """
+    Extract a text-layer PDF's page text and find pages that need more than plain text
+    
+    Documents with at least PDF_TEXT_PARALLEL_MIN_PAGES pages are split into
+    page ranges and processed across worker processes.
+    
+    Args:
+        pdf_path: Path to PDF file, or an in-memory uploaded document; it is
+            read from memory unless the pages are split across processes,
+            which open it by path (spooling an upload to disk)
+        max_workers: Worker processes for large documents (default:
+            PDF_TEXT_WORKERS, or one per CPU)
+    
+    Returns:
+        Dict with page_texts (text of every page, in order), image_region_pages
+        (zero-based pages whose embedded images carry content missing from the
+        text layer) and table_pages (page number -> reading-order text with
+        tables serialized as rows). All are empty if PyMuPDF is unavailable
+        or the PDF cannot be read.
+    """
+    result = {"page_texts": [], "image_region_pages": [], "table_pages": {}}
+    if not PDF_SUPPORT:
+        return result
+    
+    try:
+        with open_pdf(pdf_path) as pdf_document:
+            page_count = len(pdf_document)
+        
+        workers = min(max_workers or Config.PDF_TEXT_WORKERS or os.cpu_count() or 1, page_count)
+        if workers > 1 and page_count >= Config.PDF_TEXT_PARALLEL_MIN_PAGES:
+            ranges = _page_ranges(page_count, workers)
+            print(f"⚡ Extracting {page_count} pages in {len(ranges)} ranges across {workers} processes")
+            # Spawned workers each open the PDF themselves; nothing is inherited from Streamlit
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context("spawn")) as executor:
+                shards = executor.map(_scan_page_range, [os.fspath(pdf_path)] * len(ranges),
+                                      [start for start, _ in ranges], [stop for _, stop in ranges])
+                pages = [page for shard in shards for page in shard]
+        else:
+            pages = _scan_page_range(pdf_path, 0, page_count)
+        
+        table_count = row_count = 0
+        for page_num, (text, has_image_regions, tables, rows) in enumerate(pages):
+            result["page_texts"].append(text)
+            if has_image_regions:
+                result["image_region_pages"].append(page_num)
+            if tables:
+                result["table_pages"][page_num] = text
+                table_count += tables
+                row_count += rows
+        if table_count:
+            print(f"📋 Extracted {table_count} tables ({row_count} rows) from the text layer")
+    except Exception as e:
+        print(f"⚠️ Layout analysis failed: {e}")
+    
+    return result
@@ -2,7 +2,14 @@
 Task 2: Requirement Extraction Module
 Extracts and categorizes requirements from parsed BRD
 """
+from typing import Optional
+from config import Config
 from modules.llm_service import LLMService
+from modules.requirement_prefilter import build_candidate_excerpt
+from modules.requirement_table import read_requirement_table
+
+# Spreadsheet rows sent per gap-filling call
+GAP_FILL_BATCH_ROWS = 80
 
 class RequirementExtractor:
     """Extract and categorize requirements from BRD"""
@@ -14,6 +21,11 @@ class RequirementExtractor:
         """
         Extract requirements from BRD with full traceability
         
+        For long documents (REQUIREMENT_PREFILTER), only candidate requirement
+        statements found by the rule-based pre-filter are sent, with their
+        page/section anchors and surrounding context; the model classifies
+        and enriches them.
+        
         Args:
             brd_text: Raw BRD text content
             parsing_result: Result from Task 1 (BRD parsing)
@@ -24,6 +36,16 @@ class RequirementExtractor:
         # Load prompt template
         system_prompt = self.llm_service.load_prompt_template('task2_extraction')
         
+        # Long BRDs: send candidate statements with their anchors instead of the full text
+        excerpt = build_candidate_excerpt(brd_text) if Config.REQUIREMENT_PREFILTER else None
+        if excerpt:
+            content_label = ("BRD EXCERPTS (candidate requirement statements with their page markers, headings, "
+                             "table headers and surrounding context; [...] marks omitted text)")
+            brd_content = excerpt[0]
+        else:
+            content_label = "BRD CONTENT"
+            brd_content = brd_text
+        
         # Prepare user prompt with BRD content and parsing context
         user_prompt = f"""Extract requirements from the following BRD.
 
@@ -31,8 +53,8 @@ BRD ANALYSIS CONTEXT:
 Completeness Score: {parsing_result.get('completeness_score', 'N/A')}
 Detected Sections: {', '.join([s['section_name'] for s in parsing_result.get('detected_sections', [])])}
 
-BRD CONTENT:
-{brd_text}
+{content_label}:
+{brd_content}
 
 Extract all requirements with precision, traceability, and confidence levels. Return the JSON structure as specified."""
         
@@ -44,3 +66,101 @@ Extract all requirements with precision, traceability, and confidence levels. Re
         )
         
         return result
+    
+    def extract_table_requirements(self, file_path) -> Optional[dict]:
+        """
+        Take requirements straight from a spreadsheet or CSV requirement tracker
+        
+        Rows are mapped to the Task 2 schema without an extraction call; only
+        rows missing a category or priority are sent to the model, in small
+        batches, to fill those fields.
+        
+        Args:
+            file_path: Path to a .xlsx or .csv file, or an in-memory uploaded document
+        
+        Returns:
+            Requirements dict in the Task 2 schema, or None if the file has no
+            recognizable requirement columns (use extract_requirements instead)
+        """
+        requirements = read_requirement_table(file_path)
+        if requirements is None:
+            return None
+        
+        metadata = requirements["_metadata"]
+        metadata["gaps_filled"] = 0
+        if metadata["gap_rows"]:
+            try:
+                metadata["gaps_filled"] = self._fill_gaps(requirements)
+            except Exception as e:
+                print(f"⚠️ Gap filling failed, keeping the rows as read: {e}")
+        
+        # Whatever is still missing gets neutral defaults so later stages always have values
+        for key in ("functional_requirements", "non_functional_requirements"):
+            for item in requirements[key]:
+                item["category"] = item["category"] or "General"
+                if key == "functional_requirements":
+                    item["priority"] = item["priority"] or "Medium"
+        return requirements
+    
+    def _fill_gaps(self, requirements: dict) -> int:
+        """
+        Ask the model for missing categories and priorities of spreadsheet rows
+        
+        Returns:
+            Number of fields filled
+        """
+        system_prompt = self.llm_service.load_prompt_template('task2_gap_filling')
+        gap_ids = set(requirements["_metadata"]["gap_rows"])
+        items = {
+            item["requirement_id"]: item
+            for key in ("functional_requirements", "non_functional_requirements")
+            for item in requirements[key] if item["requirement_id"] in gap_ids
+        }
+        known_categories = sorted({
+            item["category"]
+            for key in ("functional_requirements", "non_functional_requirements")
+            for item in requirements[key] if item["category"]
+        })
+        
+        filled = 0
+        item_ids = list(items)
+        for start in range(0, len(item_ids), GAP_FILL_BATCH_ROWS):
+            lines = []
+            for requirement_id in item_ids[start:start + GAP_FILL_BATCH_ROWS]:
+                item = items[requirement_id]
+                priority = item.get("priority", "n/a") or "?"
+                lines.append(f"{requirement_id} | {item['description'][:400]} | "
+                             f"category: {item['category'] or '?'} | priority: {priority}")
+            
+            user_prompt = f"""Fill in the missing values for these spreadsheet requirements.
+
+CATEGORIES ALREADY USED IN THE SHEET:
+{', '.join(known_categories[:50]) or 'None'}
+
+REQUIREMENTS:
+{chr(10).join(lines)}
+
+Return the JSON structure as specified."""
+            
+            result = self.llm_service.execute_prompt(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                temperature=0.2
+            )
+            
+            for answer in result.get("requirements") or []:
+                if not isinstance(answer, dict):
+                    continue
+                item = items.get(str(answer.get("requirement_id", "")).strip())
+                if item is None:
+                    continue
+                if not item["category"] and answer.get("category"):
+                    item["category"] = str(answer["category"]).strip()
+                    filled += 1
+                if "priority" in item and not item["priority"] and \
+                        answer.get("priority") in ("Critical", "High", "Medium", "Low"):
+                    item["priority"] = answer["priority"]
+                    filled += 1
+        
+        print(f"🧩 Filled {filled} missing field(s) on {len(items)} spreadsheet row(s)")
+        return filled
@@ -0,0 +1,274 @@
+"""
+Requirement Pre-filter Module
+Finds candidate requirement statements in BRD text with regular expressions
+(modal "shall/must" statements, requirement IDs, everything under requirement,
+feature and user story headings, and sections such as objectives, risks and
+assumptions) and builds a compact excerpt of them, with their page and section
+anchors and surrounding context, for Task 2 extraction
+"""
+import re
+from typing import List, Optional, Tuple
+from config import Config
+from modules.text_normalizer import count_tokens
+
+# Requirement statements: "The system shall...", "Users must...", "is required to..."
+MODAL_PATTERN = re.compile(
+    r"\b(shall|must|is required to|are required to|is mandatory|are mandatory|required to be)\b",
+    re.IGNORECASE
+)
+# Weaker modals count only with a system-like subject: "The portal should/will..."
+SUBJECT_MODAL_PATTERN = re.compile(
+    r"\b(system|application|solution|platform|portal|tool|service|interface|module|report|user)s?\b"
+    r"[^.;:]{0,60}\b(should|will|needs to|has to|is expected to)\b",
+    re.IGNORECASE
+)
+# Document requirement IDs: REQ-12, FR-3.1, NFR_07, BR 4, US-101
+REQUIREMENT_ID_PATTERN = re.compile(r"\b(REQ|FR|NFR|BR|BRQ|UR|SR|SYS|US|UC|RQ)[-_ ]?\d+(\.\d+)*\b")
+# Sections whose every unit is a candidate, modal verb or not: "Functional Requirements",
+# "Features", "User Stories", "Use Cases" and their subsections
+REQUIREMENT_SECTION_PATTERN = re.compile(
+    r"requirement|functional|feature|user[- ]?stor|use[- ]?case|capabilit",
+    re.IGNORECASE
+)
+# Document titles ("Business Requirements Document", "BRD v1.2") are not requirement sections
+DOCUMENT_TITLE_PATTERN = re.compile(r"\b(document|specification|brd|srs)\b", re.IGNORECASE)
+# Non-requirement Task 2 categories, recognized by section heading or by cue words in a sentence
+CONTEXT_SECTION_PATTERN = re.compile(
+    r"objective|goal|purpose|stakeholder|scope|assumption|constraint|risk|dependenc|success|metric|kpi",
+    re.IGNORECASE
+)
+CUE_PATTERN = re.compile(
+    r"\b(assum\w*|risks?|depend\w*|constrain\w*|objectives?|goals?|stakeholders?|out of scope|in scope)\b",
+    re.IGNORECASE
+)
+
+PAGE_MARKER_PATTERN = re.compile(r"^--- Page (\d+)( \(OCR NEEDED\))? ---$")
+TABLE_MARKER_PATTERN = re.compile(r"^\[Table (\d+\.\d+): \d+ rows\]$")
+# "## 2.1 Billing" (extracted headings) or "2.1 Billing" (numbered heading lines in PDF text)
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.+)$")
+NUMBERED_HEADING_PATTERN = re.compile(r"^(\d+(\.\d+){0,4})\.?\s+([A-Z][^.:;]{1,80})$")
+LIST_ITEM_PATTERN = re.compile(r"^([-*•▪◦]|\d{1,3}[.)]|[a-z][.)])\s+")
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?])\s+(?=[A-Z(\"'“])")
+
+# Units of surrounding context kept on each side of a candidate (within its section)
+CONTEXT_UNITS = 1
+
+# Units kept from each objectives/stakeholders/scope/assumptions/risks/... section
+CONTEXT_SECTION_MAX_UNITS = 40
+
+
+def split_units(brd_text: str) -> List[dict]:
+    """
+    Split BRD text into units with their page and section anchors
+    
+    Page markers, headings, table markers, table rows and list items are one
+    unit each; other lines are joined into paragraphs and split into
+    sentences.
+    
+    Returns:
+        Dicts with kind ("page", "heading", "table", "table_row", "list",
+        "sentence"), text, page (one-based, or None), section (nearest
+        heading, or ""), requirement_section (whether any enclosing heading
+        is a requirement, feature or user story heading) and table (label
+        such as "3.1" for table rows)
+    """
+    units = []
+    page = None
+    section = ""
+    headings = []  # (level, title) of the enclosing headings, outermost first
+    marked_headings = False  # Once "#" headings appear, "1. Item" lines are list items, not headings
+    table = None
+    prose = []
+    
+    def add(kind: str, text: str):
+        units.append({"kind": kind, "text": text, "page": page, "section": section,
+                      "requirement_section": any(_is_requirement_heading(title) for _, title in headings),
+                      "table": table if kind == "table_row" else None})
+    
+    def flush_prose():
+        if prose:
+            for sentence in SENTENCE_SPLIT_PATTERN.split(" ".join(prose)):
+                if sentence.strip():
+                    add("sentence", sentence.strip())
+            prose.clear()
+    
+    for line in brd_text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            flush_prose()
+            table = None
+            continue
+        
+        match = PAGE_MARKER_PATTERN.match(stripped)
+        if match:
+            flush_prose()
+            page, table = int(match.group(1)), None
+            add("page", stripped)
+            continue
+        
+        match = TABLE_MARKER_PATTERN.match(stripped)
+        if match:
+            flush_prose()
+            table = match.group(1)
+            add("table", stripped)
+            continue
+        
+        if table is not None:
+            add("table_row", stripped)
+            continue
+        
+        match = HEADING_PATTERN.match(stripped)
+        marked_headings = marked_headings or bool(match)
+        numbered = None if marked_headings else NUMBERED_HEADING_PATTERN.match(stripped)
+        if match or numbered:
+            flush_prose()
+            section = match.group(2).strip() if match else stripped
+            level = len(match.group(1)) if match else numbered.group(1).count(".") + 1
+            while headings and headings[-1][0] >= level:
+                headings.pop()
+            headings.append((level, section))
+            add("heading", stripped)
+            continue
+        
+        if LIST_ITEM_PATTERN.match(stripped):
+            flush_prose()
+            add("list", stripped)
+            continue
+        
+        prose.append(stripped)
+    
+    flush_prose()
+    return units
+
+
+def _is_requirement_heading(title: str) -> bool:
+    """Whether a heading opens a requirement, feature or user story section"""
+    return bool(REQUIREMENT_SECTION_PATTERN.search(title)) and not DOCUMENT_TITLE_PATTERN.search(title)
+
+
+def _is_candidate(unit: dict) -> bool:
+    """
+    Whether a unit reads as a requirement statement, carries a requirement ID,
+    or sits under a requirement, feature or user story heading
+    """
+    text = unit["text"]
+    return bool(unit["requirement_section"] or MODAL_PATTERN.search(text)
+                or REQUIREMENT_ID_PATTERN.search(text) or SUBJECT_MODAL_PATTERN.search(text))
+
+
+def find_candidates(brd_text: str) -> List[dict]:
+    """
+    Find candidate requirement statements in BRD text
+    
+    Returns:
+        Units from split_units that are requirement statements, carry a
+        requirement ID or sit under a requirement section, each with its page
+        and section anchor, plus "ids" (requirement IDs found in the text)
+    """
+    candidates = []
+    for unit in split_units(brd_text):
+        if unit["kind"] in ("sentence", "list", "table_row") and _is_candidate(unit):
+            ids = [match.group(0) for match in REQUIREMENT_ID_PATTERN.finditer(unit["text"])]
+            candidates.append({**unit, "ids": ids})
+    return candidates
+
+
+def build_candidate_excerpt(brd_text: str, min_chars: Optional[int] = None) -> Optional[Tuple[str, dict]]:
+    """
+    Reduce BRD text to requirement candidates with their anchors and context
+    
+    Keeps candidate statements and CONTEXT_UNITS units around each one
+    (requirement, feature and user story sections are kept in full, list
+    items included, modal verb or not), sections about objectives,
+    stakeholders, scope, assumptions, constraints, risks, dependencies and
+    success metrics (up to CONTEXT_SECTION_MAX_UNITS units each), and
+    sentences with those cue words. The page markers,
+    headings, table markers and table header rows they belong to are kept as
+    anchors, and "[...]" marks omitted text.
+    
+    Args:
+        brd_text: Extracted BRD text (page markers, "#" headings and serialized tables as produced by BRDParser)
+        min_chars: Shorter documents are not reduced (default: REQUIREMENT_PREFILTER_MIN_CHARS)
+    
+    Returns:
+        Tuple of (excerpt, stats dict with candidates, units_kept, units,
+        chars/tokens before and after), or None if the document is short, has
+        no candidates, or the excerpt would not be meaningfully smaller
+    """
+    min_chars = Config.REQUIREMENT_PREFILTER_MIN_CHARS if min_chars is None else min_chars
+    if len(brd_text) < min_chars:
+        return None
+    
+    units = split_units(brd_text)
+    keep = [False] * len(units)
+    candidates = 0
+    section_units = {}
+    for index, unit in enumerate(units):
+        if unit["kind"] not in ("sentence", "list", "table_row"):
+            continue
+        if _is_candidate(unit):
+            candidates += 1
+            low = index
+            while low > 0 and index - low < CONTEXT_UNITS and units[low - 1]["section"] == unit["section"]:
+                low -= 1
+            high = index
+            while high < len(units) - 1 and high - index < CONTEXT_UNITS and units[high + 1]["section"] == unit["section"]:
+                high += 1
+            for context in range(low, high + 1):
+                keep[context] = True
+        elif CONTEXT_SECTION_PATTERN.search(unit["section"]):
+            count = section_units.get(unit["section"], 0)
+            if count < CONTEXT_SECTION_MAX_UNITS:
+                keep[index] = True
+                section_units[unit["section"]] = count + 1
+        elif CUE_PATTERN.search(unit["text"]):
+            keep[index] = True
+    
+    if not candidates:
+        return None
+    
+    # Anchors for everything kept: its page marker, section heading, table marker and table header row
+    anchors = set()
+    last_page = last_heading = last_table = last_header = None
+    for index, unit in enumerate(units):
+        kind = unit["kind"]
+        if kind == "page":
+            last_page = index
+        elif kind == "heading":
+            last_heading = index
+        elif kind == "table":
+            last_table, last_header = index, None
+        elif kind == "table_row" and last_header is None:
+            last_header = index
+        if keep[index] and kind in ("sentence", "list", "table_row"):
+            anchors.update(anchor for anchor in (last_page, last_heading) if anchor is not None)
+            if kind == "table_row":
+                anchors.update((last_table, last_header))
+    
+    lines = []
+    skipped = False
+    for index, unit in enumerate(units):
+        if keep[index] or index in anchors:
+            if skipped and unit["kind"] not in ("page", "heading", "table"):
+                lines.append("[...]")
+            lines.append(unit["text"])
+            skipped = False
+        else:
+            skipped = True
+    excerpt = "\n".join(lines)
+    
+    if len(excerpt) > len(brd_text) * 0.8:
+        return None
+    
+    stats = {
+        "candidates": candidates,
+        "units": len(units),
+        "units_kept": sum(1 for index in range(len(units)) if keep[index] or index in anchors),
+        "chars_before": len(brd_text),
+        "chars_after": len(excerpt),
+        "tokens_before": count_tokens(brd_text),
+        "tokens_after": count_tokens(excerpt),
+    }
+    print(f"🎯 Requirement pre-filter: {candidates} candidate statements, "
+          f"{stats['tokens_after']} of {stats['tokens_before']} tokens kept")
+    return excerpt, stats
@@ -0,0 +1,45 @@
+"""
+Requirement Schema Module
+Task 2 requirement categories and requirement ID assignment, shared by every
+path that builds Task 2 requirements without the LLM merge step
+"""
+
+# Task 2 categories, each with the field used to spot the same item twice (e.g. on several pages)
+CATEGORY_KEYS = {
+    "business_objectives": "objective",
+    "stakeholders": "role",
+    "functional_requirements": "description",
+    "non_functional_requirements": "description",
+    "constraints": "constraint",
+    "assumptions": "assumption",
+    "risks": "risk",
+    "dependencies": "dependency",
+}
+
+# ID prefixes for requirements that have no document ID of their own
+ID_PREFIXES = {"functional_requirements": "FR", "non_functional_requirements": "NFR"}
+
+
+def assign_requirement_ids(requirements: dict) -> dict:
+    """
+    Give every functional and non-functional requirement a unique ID
+    
+    Document IDs are kept (first use wins); requirements without one, and
+    repeats of an ID already used, are numbered FR-001/NFR-001 in order,
+    skipping numbers the document already uses.
+    """
+    for key, prefix in ID_PREFIXES.items():
+        items = requirements.get(key) or []
+        document_ids = {str(item.get("requirement_id") or "").strip() for item in items}
+        used_ids = set()
+        next_number = 1
+        for item in items:
+            requirement_id = str(item.get("requirement_id") or "").strip()
+            if requirement_id and requirement_id not in used_ids:
+                used_ids.add(requirement_id)
+                continue
+            while f"{prefix}-{next_number:03d}" in used_ids | document_ids:
+                next_number += 1
+            item["requirement_id"] = f"{prefix}-{next_number:03d}"
+            used_ids.add(item["requirement_id"])
+    return requirements
@@ -0,0 +1,266 @@
+"""
+Requirement Table Module
+Streams rows from spreadsheet and CSV requirement trackers and maps their
+columns onto the Task 2 requirement schema, so rows that are already
+structured do not go through LLM extraction
+"""
+import codecs
+import csv
+import io
+import re
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from modules.requirement_schema import CATEGORY_KEYS, assign_requirement_ids
+
+# Excel support check (read-only mode streams rows instead of loading the workbook)
+try:
+    import openpyxl
+    XLSX_SUPPORT = True
+except ImportError:
+    XLSX_SUPPORT = False
+
+TABLE_EXTENSIONS = {'.xlsx', '.csv'}
+
+# Header names for each mapped column, most specific first
+COLUMN_ALIASES = {
+    "requirement_id": ("requirement id", "req id", "requirement no", "requirement number", "req no", "req #",
+                       "requirement #", "id", "ref", "ref id", "reference id", "key", "issue key", "#"),
+    "description": ("requirement description", "description", "requirement text", "requirement statement",
+                    "requirement", "statement", "details", "summary", "title", "user story", "story"),
+    "priority": ("priority", "moscow", "moscow priority", "importance", "severity", "rank"),
+    "category": ("category", "functional area", "module", "area", "feature", "component", "epic",
+                 "group", "theme", "capability"),
+    "type": ("requirement type", "req type", "type", "classification", "kind"),
+    "section": ("brd section", "brd reference", "section", "source reference", "source", "chapter"),
+}
+
+# Rows searched for the header (trackers often have a title block above it)
+HEADER_SCAN_ROWS = 20
+
+PRIORITY_VALUES = {
+    "Critical": ("critical", "urgent", "blocker", "showstopper", "p0", "0"),
+    "High": ("high", "must", "must have", "p1", "1", "h"),
+    "Medium": ("medium", "med", "should", "should have", "normal", "p2", "2", "m"),
+    "Low": ("low", "could", "could have", "won't", "wont", "won't have", "nice to have", "p3", "p4", "3", "4", "l"),
+}
+
+# Categories and type values that mark a row as non-functional
+NON_FUNCTIONAL_PATTERN = re.compile(
+    r"\bnfr\b|non[\s-]?functional|performance|security|usability|availability|reliability|"
+    r"scalability|compliance|accessibility|maintainability|capacity|privacy|audit",
+    re.IGNORECASE
+)
+
+
+def _normalize_header(value: str) -> str:
+    """Lowercase a header and drop punctuation other than '#'"""
+    return " ".join(re.sub(r"[^\w#']+", " ", value.lower()).split())
+
+
+def _cell_text(value) -> str:
+    """Cell value as text: whole floats without '.0', dates without a midnight time"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    return " ".join(str(value).split())
+
+
+def map_columns(header: List[str]) -> Dict[str, int]:
+    """
+    Map schema fields to column indexes from a header row
+    
+    Exact alias matches win over headers that merely contain an alias
+    ("Detailed Requirement Description"); earlier aliases win over later ones.
+    
+    Returns:
+        Field name -> column index for every field found
+    """
+    candidates = []  # (score, field, column)
+    for column, value in enumerate(header):
+        name = _normalize_header(value)
+        if not name:
+            continue
+        for field, aliases in COLUMN_ALIASES.items():
+            for rank, alias in enumerate(aliases):
+                if name == alias:
+                    candidates.append((rank, field, column))
+                    break
+                if len(alias) > 2 and re.search(rf"(^|\s){re.escape(alias)}($|\s)", name):
+                    candidates.append((len(aliases) + rank, field, column))
+                    break
+    
+    # Best matches first; each field and each column is used once
+    mapping = {}
+    for _, field, column in sorted(candidates):
+        if field not in mapping and column not in mapping.values():
+            mapping[field] = column
+    return mapping
+
+
+def is_header_row(cells: List[str]) -> bool:
+    """Whether a row looks like a requirement table header (at least two mapped columns)"""
+    return len(map_columns(cells)) >= 2
+
+
+def _open_binary(source):
+    """Binary stream for a path or an in-memory uploaded document"""
+    return source.open() if hasattr(source, "data") else open(source, 'rb')
+
+
+def _iter_csv_rows(source) -> Iterator[Tuple[str, int, List[str]]]:
+    """Stream CSV rows, detecting the encoding (UTF-8 or Windows-1252) and delimiter from the first 64 KB"""
+    with _open_binary(source) as binary:
+        sample = binary.read(64 * 1024)
+        try:
+            codecs.getincrementaldecoder("utf-8-sig")().decode(sample, final=False)
+            encoding = "utf-8-sig"
+        except UnicodeDecodeError:
+            encoding = "cp1252"
+        
+        binary.seek(0)
+        with io.TextIOWrapper(binary, encoding=encoding, errors="replace", newline="") as text:
+            try:
+                dialect = csv.Sniffer().sniff(sample.decode(encoding, errors="ignore"), delimiters=",;\t|")
+            except csv.Error:
+                dialect = csv.excel
+            for row_number, row in enumerate(csv.reader(text, dialect), start=1):
+                yield "", row_number, [_cell_text(value) for value in row]
+
+
+def _iter_xlsx_rows(source) -> Iterator[Tuple[str, int, List[str]]]:
+    """Stream the rows of every visible worksheet with openpyxl's read-only reader"""
+    if not XLSX_SUPPORT:
+        raise ImportError("Reading .xlsx files requires openpyxl (pip install openpyxl)")
+    
+    workbook = openpyxl.load_workbook(source.open() if hasattr(source, "data") else source,
+                                      read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            if worksheet.sheet_state != "visible":
+                continue
+            for row_number, row in enumerate(worksheet.iter_rows(values_only=True), start=1):
+                yield worksheet.title, row_number, [_cell_text(value) for value in row]
+    finally:
+        workbook.close()  # Read-only workbooks keep the archive open until closed
+
+
+def iter_table_rows(source) -> Iterator[Tuple[str, int, List[str]]]:
+    """
+    Stream the rows of a spreadsheet or CSV file
+    
+    Args:
+        source: Path to a .xlsx or .csv file, or an in-memory uploaded document
+    
+    Yields:
+        Tuple of (sheet name, "" for CSV; one-based row number; cell texts)
+    """
+    extension = source.extension if hasattr(source, "data") else Path(source).suffix.lower()
+    if extension == '.csv':
+        yield from _iter_csv_rows(source)
+    elif extension == '.xlsx':
+        yield from _iter_xlsx_rows(source)
+    else:
+        raise ValueError(f"Unsupported table format: {extension}")
+
+
+def _priority(value: str) -> str:
+    """Normalize a priority cell to Critical/High/Medium/Low ("" if unrecognized)"""
+    key = value.strip().lower()
+    for priority, values in PRIORITY_VALUES.items():
+        if key in values or key.startswith(priority.lower()):
+            return priority
+    return ""
+
+
+def read_requirement_table(source) -> Optional[dict]:
+    """
+    Map the rows of a requirement tracker to the Task 2 schema
+    
+    Each sheet's header row is found among its first HEADER_SCAN_ROWS rows
+    (it needs a description column and at least one other mapped column);
+    every following row with a description becomes one requirement. Rows
+    typed or categorized as non-functional (or with NFR IDs) go to
+    non_functional_requirements. Rows are read one at a time.
+    
+    Args:
+        source: Path to a .xlsx or .csv file, or an in-memory uploaded document
+    
+    Returns:
+        Requirements dict in the Task 2 schema with a _metadata entry (mode,
+        rows, column_mapping per sheet, gap_rows: requirement IDs missing a
+        category or priority), or None if no sheet looks like a requirement list
+    """
+    requirements = {key: [] for key in CATEGORY_KEYS}
+    mappings = {}
+    current_sheet = None
+    mapping = None
+    rows = 0
+    
+    for sheet, row_number, cells in iter_table_rows(source):
+        if sheet != current_sheet:
+            current_sheet, mapping = sheet, None
+        
+        if mapping is None:
+            if row_number > HEADER_SCAN_ROWS:
+                continue
+            candidate = map_columns(cells)
+            if "description" in candidate and len(candidate) > 1:
+                mapping = candidate
+                mappings[sheet or "csv"] = {field: cells[column] for field, column in candidate.items()}
+            continue
+        
+        values = {field: cells[column] if column < len(cells) else "" for field, column in mapping.items()}
+        if not values["description"]:
+            continue
+        rows += 1
+        
+        requirement_id = values.get("requirement_id", "")
+        category = values.get("category", "")
+        is_non_functional = (
+            bool(NON_FUNCTIONAL_PATTERN.search(values.get("type", "")))
+            or requirement_id.upper().startswith("NFR")
+            or (not values.get("type") and bool(NON_FUNCTIONAL_PATTERN.search(category)))
+        )
+        reference = ", ".join(part for part in (
+            values.get("section", ""), f"Sheet {sheet}" if sheet else "", f"Row {row_number}"
+        ) if part)
+        
+        item = {
+            "requirement_id": requirement_id,
+            "description": values["description"],
+            "category": category,
+            "brd_reference": reference,
+        }
+        if is_non_functional:
+            item["confidence"] = "High" if category else "Medium"
+            requirements["non_functional_requirements"].append(item)
+        else:
+            item["priority"] = _priority(values.get("priority", ""))
+            item["confidence"] = "High" if category and item["priority"] else "Medium"
+            requirements["functional_requirements"].append(item)
+    
+    if not mappings:
+        return None
+    
+    assign_requirement_ids(requirements)
+    gap_rows = [
+        item["requirement_id"]
+        for key in ("functional_requirements", "non_functional_requirements")
+        for item in requirements[key]
+        if not item["category"] or (key == "functional_requirements" and not item["priority"])
+    ]
+    requirements["_metadata"] = {
+        "mode": "structured_table",
+        "rows": rows,
+        "column_mapping": mappings,
+        "gap_rows": gap_rows,
+    }
+    print(f"📋 Mapped {rows} requirement rows from {len(mappings)} sheet(s) "
+          f"({len(gap_rows)} missing a category or priority)")
+    return requirements
@@ -0,0 +1,150 @@
+"""
+Searchable PDF Module
+Writes OCR results back into a copy of the PDF as an invisible text layer, so
+reprocessing a scanned document is a local text parse instead of an OCR job
+"""
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from modules.pdf_layout import analyze_page_layout
+from modules.extraction_cache import is_failed_page
+
+# PDF library check
+try:
+    import fitz  # PyMuPDF
+    PDF_SUPPORT = True
+except ImportError:
+    PDF_SUPPORT = False
+
+# Page sources whose text is not already in the PDF's own text layer
+OCR_SOURCES = {"ocr", "local", "cache", "duplicate", "mixed", "blank"}
+
+# Font sizes tried, largest first, until the page text fits its box
+FONT_SIZES = (10, 8, 6, 4, 3, 2, 1)
+
+
+def file_sha256(file_path: str) -> str:
+    """Hash a file's content in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def searchable_pdf_path(pdf_path: str, cache_dir: Path, sha256: Optional[str] = None) -> Path:
+    """Location of the searchable copy of a PDF, keyed by content so re-uploads match"""
+    return cache_dir / "searchable" / f"{sha256 or file_sha256(pdf_path)}.pdf"
+
+
+def find_searchable_pdf(pdf_path: str, cache_dir: Path, sha256: Optional[str] = None) -> Optional[Path]:
+    """
+    Look up a searchable copy written by an earlier OCR run
+    
+    Args:
+        pdf_path: Path to the original PDF
+        cache_dir: OCR cache directory
+        sha256: Content hash of the PDF, if already known (skips reading the file)
+    
+    Returns:
+        Path to the searchable PDF, or None if the document was never OCR'd
+    """
+    try:
+        path = searchable_pdf_path(pdf_path, cache_dir, sha256)
+    except OSError:
+        return None
+    return path if path.exists() else None
+
+
+def _insert_invisible_text(page, rect, text: str) -> bool:
+    """Insert text into a box as invisible (render mode 3) text, shrinking the font to fit"""
+    for font_size in FONT_SIZES:
+        # insert_textbox writes nothing and returns a negative value when text overflows
+        if page.insert_textbox(rect, text, fontsize=font_size, fontname="helv", render_mode=3) >= 0:
+            return True
+    return False
+
+
+def _region_text(page, page_text: str) -> Tuple[Optional[Tuple[float, float, float, float]], str]:
+    """
+    Recover the OCR'd part of a mixed page
+    
+    Mixed-page text is the native text blocks merged with the OCR text of the
+    image regions, so removing the native blocks leaves the region text.
+    
+    Returns:
+        (bounding box covering the image regions, or None if the page has
+        none, and region text)
+    """
+    layout = analyze_page_layout(page)
+    for _, block_text in layout["text_blocks"]:
+        page_text = page_text.replace(block_text, "", 1)
+    region_text = "\n".join(line for line in page_text.splitlines() if line.strip())
+    
+    regions = layout["image_regions"]
+    if not regions:
+        return None, region_text
+    bbox = (min(r[0] for r in regions), min(r[1] for r in regions),
+            max(r[2] for r in regions), max(r[3] for r in regions))
+    return bbox, region_text
+
+
+def write_searchable_pdf(pdf_path: str, page_texts: Dict[int, Tuple[str, str]], cache_dir: Path,
+                         sha256: Optional[str] = None) -> Optional[Path]:
+    """
+    Save a copy of a PDF with OCR text added as an invisible text layer
+    
+    Fully OCR'd and blank pages get their text over the whole page. Pages
+    with a text layer of their own (mixed pages, whatever their source) get
+    only the text their layer lacks, over their image regions. Pages that
+    already had a text layer are left untouched. Nothing is written when any
+    page failed OCR or its text does not fit the page, because a later run
+    reads the copy's text layer as final.
+    
+    Args:
+        pdf_path: Path to the original PDF
+        page_texts: Zero-based page number -> (page text, source) from AzureVisionOCR
+        cache_dir: OCR cache directory
+        sha256: Content hash of the PDF, if already known (skips reading the file)
+    
+    Returns:
+        Path of the searchable PDF, or None if nothing needed writing or a page failed
+    """
+    if not PDF_SUPPORT or not any(source in OCR_SOURCES for _, source in page_texts.values()):
+        return None
+    
+    failed_pages = [page_num + 1 for page_num, (page_text, _) in sorted(page_texts.items()) if is_failed_page(page_text)]
+    if failed_pages:
+        print(f"⚠️ Not saving a searchable PDF: OCR failed on page(s) {', '.join(map(str, failed_pages))}")
+        return None
+    
+    output_path = searchable_pdf_path(pdf_path, cache_dir, sha256)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    with fitz.open(pdf_path) as pdf_document:
+        for page_num, (page_text, source) in sorted(page_texts.items()):
+            if source not in OCR_SOURCES or not page_text.strip():
+                continue
+            
+            page = pdf_document[page_num]
+            rect = page.rect
+            if page.get_text().strip():
+                # A page with its own text layer (mixed, or a mixed page replayed from the
+                # cache): add only the OCR'd text, or the native text would appear twice
+                bbox, page_text = _region_text(page, page_text)
+                if not page_text:
+                    continue
+                if bbox is not None:
+                    rect = fitz.Rect(bbox)
+            
+            if not _insert_invisible_text(page, rect, page_text):
+                print(f"⚠️ Not saving a searchable PDF: OCR text of page {page_num + 1} does not fit the page")
+                return None
+        
+        # Write to a temporary name first so readers never see a partial file
+        temp_path = output_path.with_suffix(".tmp")
+        pdf_document.save(str(temp_path), garbage=3, deflate=True)
+    
+    temp_path.replace(output_path)
+    print(f"🔎 Saved searchable PDF: {output_path}")
+    return output_path
@@ -0,0 +1,208 @@
+"""
+Text Normalization Module
+Removes running headers and footers, page numbers, boilerplate, hyphenated
+line breaks and whitespace runs from extracted pages before they reach the
+LLM prompts, keeping the page structure (and so page anchors) intact
+"""
+import math
+import re
+from collections import Counter
+from typing import List, Tuple
+
+# Optional: exact token counts for GPT-4o
+try:
+    import tiktoken
+    TIKTOKEN_SUPPORT = True
+except ImportError:
+    TIKTOKEN_SUPPORT = False
+
+# Lines at the top and bottom of a page checked for running headers/footers
+EDGE_LINES = 3
+
+# A line repeated at a page edge on at least this many pages (and this share
+# of pages with text) is a running header or footer
+MIN_REPEAT_PAGES = 3
+REPEAT_PAGE_FRACTION = 0.5
+
+# Standalone page-number lines: "7", "- 7 -", "Page 7", "Page 7 of 40", "7/40"
+PAGE_NUMBER_PATTERN = re.compile(r"^[-–—\s]*(page\s*)?\d{1,4}(\s*(of|/)\s*\d{1,4})?[-–—\s]*$", re.IGNORECASE)
+# "Page 3 of 40" inside a running footer such as "Acme BRD v1.2 | Page 3 of 40"
+PAGE_LABEL_PATTERN = re.compile(r"\bpage\s*\d{1,4}\s*(of|/)\s*\d{1,4}\b", re.IGNORECASE)
+
+# Requirement statements are content even at a page edge: requirement IDs and modal verbs
+REQUIREMENT_LINE_PATTERN = re.compile(
+    r"\b((REQ|FR|NFR|BR|BRQ|UR|SR|SYS|US|UC|RQ)[-_ ]?\d+|shall|must|should)\b", re.IGNORECASE
+)
+
+# Standalone notice lines that carry no requirement content
+BOILERPLATE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r"^(strictly\s+|highly\s+)?(company\s+|proprietary\s+(and|&)\s+)?confidential\.?$",
+        r"^(for\s+)?internal\s+use\s+only\.?$",
+        r"^(©|\(c\)|copyright)\s*.{0,60}$",
+        r"^all\s+rights\s+reserved\.?$",
+        r"^(this\s+page\s+(is\s+)?intentionally\s+left\s+blank|intentionally\s+left\s+blank)\.?$",
+        r"^(printed|uncontrolled)\s+(copies\s+are\s+|copy\s+)?(uncontrolled|when\s+printed)\.?$",
+    )
+]
+
+# Words split across lines: "require-\nments" -> "requirements". Both fragments must be
+# lowercase words (a capital first letter is allowed), so IDs such as "FR-\n001" and
+# acronym compounds such as "API-\nbased" are left alone. Earlier hyphenated parts
+# are captured too ("end-to-\nend"), since they mark the break as a real hyphen
+HYPHENATION_PATTERN = re.compile(r"\b((?:[A-Za-z]+-)*[A-Za-z]?[a-z]+)-\n[ \t]*([a-z]{2,})")
+
+# Hyphenated compounds whose hyphen is kept when they break at it ("user-\nfriendly"
+# -> "user-friendly"): compounds starting with one of these words, or listed in full
+COMPOUND_PREFIXES = {"self", "non", "cross", "user", "third"}
+KNOWN_COMPOUNDS = {
+    "read-only", "write-only", "built-in", "add-on", "plug-in", "opt-in", "opt-out", "log-in",
+    "sign-in", "sign-off", "sign-up", "follow-up", "drop-down", "pop-up", "e-mail", "on-premise",
+    "on-premises", "front-end", "back-end", "end-user", "real-time", "role-based", "rule-based",
+    "time-based", "web-based", "cloud-based", "two-factor", "multi-factor", "multi-tenant",
+    "long-term", "short-term", "one-time", "first-time", "full-text", "high-level", "low-level",
+    "well-known", "year-end", "month-end", "case-sensitive",
+}
+
+WHITESPACE_RUN_PATTERN = re.compile(r"[ \t\u00a0\u2000-\u200a\u202f\u3000]+")
+LEADING_WHITESPACE_PATTERN = re.compile(r"^[ \t\u00a0\u2000-\u200a\u202f\u3000]*")
+BLANK_LINES_PATTERN = re.compile(r"\n{3,}")
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Count GPT-4o tokens with tiktoken, or estimate them (about 4 characters per token)"""
+    global _encoding
+    if TIKTOKEN_SUPPORT:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def _clean_line(line: str) -> str:
+    """Collapse whitespace runs inside a line and trim its end, keeping its indentation"""
+    indent = LEADING_WHITESPACE_PATTERN.match(line).group()
+    return (indent + WHITESPACE_RUN_PATTERN.sub(" ", line[len(indent):])).rstrip()
+
+
+def _join_hyphenation(match: re.Match) -> str:
+    """Rejoin a word split across lines, keeping the hyphen of known compounds"""
+    first, second = match.group(1), match.group(2)
+    compound = f"{first}-{second}"
+    if "-" in first or first.lower() in COMPOUND_PREFIXES or compound.lower() in KNOWN_COMPOUNDS:
+        return compound
+    return first + second
+
+
+def _line_key(line: str) -> str:
+    """
+    Comparison key for header/footer detection: case and spacing ignored
+    
+    Numbers are ignored only on page-number lines ("- 3 -", "Page 3") and in
+    "Page n of m" labels, so numbered headings and lines that merely mention
+    a page ("shown on the login page 3") stay distinct.
+    """
+    key = " ".join(line.lower().split())
+    if PAGE_NUMBER_PATTERN.match(key):
+        return re.sub(r"\d+", "#", key)
+    return PAGE_LABEL_PATTERN.sub("page # of #", key)
+
+
+def _edge_indexes(lines: List[str]) -> List[int]:
+    """Indexes of the first and last few non-empty lines of a page"""
+    filled = [index for index, line in enumerate(lines) if line.strip()]
+    return sorted(set(filled[:EDGE_LINES] + filled[-EDGE_LINES:]))
+
+
+def _is_structural(line: str) -> bool:
+    """
+    Table rows, headings and requirement statements are content even when they repeat on every page
+    
+    Lines with a "Page n of m" label are running footers, even when "|"-separated like a table row.
+    """
+    if PAGE_LABEL_PATTERN.search(line):
+        return False
+    return (" | " in line or line.lstrip().startswith(("[Table", "#"))
+            or bool(REQUIREMENT_LINE_PATTERN.search(line)))
+
+
+def normalize_pages(pages: List[Tuple[int, str, str]]) -> Tuple[List[Tuple[int, str, str]], dict]:
+    """
+    Normalize extracted pages for LLM input
+    
+    Removes running headers/footers (lines repeated at page edges across
+    pages, except requirement statements), standalone page numbers on a
+    page's first or last line, boilerplate notice lines
+    and whitespace runs inside lines (indentation is kept), and rejoins words
+    hyphenated across line breaks, keeping the hyphen of known compounds.
+    Every page keeps its page number and source, so page markers and
+    brd_reference page anchors are unchanged.
+    
+    Args:
+        pages: (zero-based page number, text, source) tuples from BRDParser.iter_pages
+    
+    Returns:
+        Tuple of (normalized pages, stats dict with chars/tokens before and
+        after, and counts of each kind of removal)
+    """
+    page_lines = []
+    for _, page_text, _ in pages:
+        lines = [_clean_line(line) for line in page_text.splitlines()]
+        page_lines.append(lines)
+    
+    # Running headers/footers: the same edge line on many pages
+    edge_counts = Counter()
+    for lines in page_lines:
+        edge_counts.update({
+            _line_key(lines[index]) for index in _edge_indexes(lines)
+            if not _is_structural(lines[index])
+        })
+    pages_with_text = sum(1 for lines in page_lines if any(lines))
+    min_repeats = max(MIN_REPEAT_PAGES, math.ceil(pages_with_text * REPEAT_PAGE_FRACTION))
+    repeated = {key for key, count in edge_counts.items() if count >= min_repeats}
+    
+    stats = {"repeated_lines": 0, "page_number_lines": 0, "boilerplate_lines": 0, "hyphenations": 0}
+    normalized = []
+    for (page_num, page_text, source), lines in zip(pages, page_lines):
+        filled = [index for index, line in enumerate(lines) if line]
+        for index in _edge_indexes(lines):
+            if _is_structural(lines[index]):
+                continue
+            if _line_key(lines[index]) in repeated:
+                lines[index] = ""
+                stats["repeated_lines"] += 1
+            elif index in (filled[0], filled[-1]) and PAGE_NUMBER_PATTERN.match(lines[index].strip()):
+                # Only the very first or last line: a lone number further in may be a quantity or a year
+                lines[index] = ""
+                stats["page_number_lines"] += 1
+        
+        for index, line in enumerate(lines):
+            line = line.strip()
+            if line and len(line) <= 80 and any(pattern.match(line) for pattern in BOILERPLATE_PATTERNS):
+                lines[index] = ""
+                stats["boilerplate_lines"] += 1
+        
+        text, hyphenations = HYPHENATION_PATTERN.subn(_join_hyphenation, "\n".join(lines))
+        stats["hyphenations"] += hyphenations
+        text = BLANK_LINES_PATTERN.sub("\n\n", text).strip("\n")
+        normalized.append((page_num, text, source))
+    
+    before = "\n".join(page_text for _, page_text, _ in pages)
+    after = "\n".join(page_text for _, page_text, _ in normalized)
+    stats["chars_before"] = len(before)
+    stats["chars_after"] = len(after)
+    stats["chars_removed"] = stats["chars_before"] - stats["chars_after"]
+    stats["tokens_before"] = count_tokens(before)
+    stats["tokens_after"] = count_tokens(after)
+    stats["tokens_removed"] = stats["tokens_before"] - stats["tokens_after"]
+    stats["tokens_exact"] = TIKTOKEN_SUPPORT
+    
+    if stats["chars_before"]:
+        print(f"🧹 Normalized text: removed {stats['chars_removed']} chars "
+              f"({stats['chars_removed'] / stats['chars_before']:.0%}), "
+              f"{'' if TIKTOKEN_SUPPORT else '~'}{stats['tokens_removed']} tokens; "
+              f"{stats['repeated_lines']} header/footer, {stats['page_number_lines']} page number and "
+              f"{stats['boilerplate_lines']} boilerplate lines, {stats['hyphenations']} hyphenations rejoined")
+    return normalized, stats
@@ -0,0 +1,184 @@
+"""
+Upload Ingestion Module
+Keeps uploaded documents in memory, hashed once, and writes them to a
+content-addressed spool only when a caller needs a real file path
+"""
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+from config import Config
+
+# Content-addressed copies of uploads for code that needs a path (OCR, fused vision, large-PDF workers)
+SPOOL_DIR = Path.home() / ".brd_ocr_cache" / "spool"
+
+# Last-use records for spooled entries, kept apart so the spooled files' own
+# timestamps never change (PDF caches and worker processes read those files)
+ACCESS_DIR = SPOOL_DIR / ".access"
+
+
+def _record_access(entry: Path):
+    """Mark a spooled file or folder as used now, for cleanup_spool"""
+    ACCESS_DIR.mkdir(parents=True, exist_ok=True)
+    (ACCESS_DIR / entry.name).touch()
+
+
+def _last_access(entry: Path) -> float:
+    """When a spooled entry was last used: its access record, else when it was written"""
+    try:
+        return (ACCESS_DIR / entry.name).stat().st_mtime
+    except OSError:
+        return entry.stat().st_mtime
+
+
+class UploadedDocument:
+    """
+    An uploaded document held in memory
+    
+    The bytes are hashed once on upload. Parsers read them through in-memory
+    streams (open()); the same object can also be passed where a path is
+    expected (os.fspath), which spools it to SPOOL_DIR/<sha256><ext> on first
+    use and reuses that file afterwards, across reruns and sessions.
+    """
+    
+    def __init__(self, name: str, data: bytes):
+        self.name = name
+        self.data = bytes(data)
+        self.extension = Path(name).suffix.lower()
+        self.size = len(self.data)
+        self.sha256 = hashlib.sha256(self.data).hexdigest()
+    
+    def __repr__(self) -> str:
+        return f"UploadedDocument({self.name!r}, {self.size} bytes, sha256={self.sha256[:12]})"
+    
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, UploadedDocument) and other.sha256 == self.sha256
+                and other.extension == self.extension)
+    
+    def __hash__(self) -> int:
+        return hash((self.sha256, self.extension))
+    
+    def open(self) -> io.BytesIO:
+        """Binary stream over the upload (shares the bytes, no copy)"""
+        return io.BytesIO(self.data)
+    
+    def text_stream(self, encoding: str = "utf-8") -> io.TextIOWrapper:
+        """Text stream over the upload, with universal newlines like open()"""
+        return io.TextIOWrapper(self.open(), encoding=encoding)
+    
+    @property
+    def spool_path(self) -> Path:
+        """Where the spooled copy of this document lives (it may not exist yet)"""
+        return SPOOL_DIR / f"{self.sha256}{self.extension}"
+    
+    def spool(self) -> str:
+        """
+        Write the document to the spool if it is not there yet
+        
+        Returns:
+            Path to the spooled file
+        """
+        path = self.spool_path
+        if path.exists():
+            _record_access(path)  # Recently used: keep it through cleanup_spool
+            return str(path)
+        
+        SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+        # Write under a temporary name and rename, so concurrent sessions never see a partial file
+        with tempfile.NamedTemporaryFile(dir=SPOOL_DIR, suffix=".part", delete=False) as tmp_file:
+            tmp_file.write(self.data)
+        os.replace(tmp_file.name, path)
+        _record_access(path)
+        print(f"💾 Spooled {self.name} for path-based processing ({self.size / (1024 * 1024):.1f} MB)")
+        return str(path)
+    
+    def __fspath__(self) -> str:
+        return self.spool()
+    
+    def discard(self):
+        """Remove the spooled copy, if any (the in-memory bytes are unaffected)"""
+        for path in (self.spool_path, ACCESS_DIR / self.spool_path.name):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def spool_files(files: List[Tuple[str, bytes]]) -> str:
+    """
+    Spool several page images into one folder, numbered in upload order
+    
+    The folder is named by the hash of the images and their order, so the
+    same selection maps to one folder instead of a new one on every rerun.
+    
+    Args:
+        files: (file name, bytes) tuples in page order
+    
+    Returns:
+        Path to the folder
+    """
+    digest = hashlib.sha256()
+    for name, data in files:
+        digest.update(Path(name).suffix.lower().encode("utf-8"))
+        digest.update(hashlib.sha256(data).digest())
+    folder = SPOOL_DIR / digest.hexdigest()
+    if folder.is_dir():
+        _record_access(folder)
+        return str(folder)
+    
+    SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=SPOOL_DIR, suffix=".part"))
+    for index, (name, data) in enumerate(files):
+        (staging / f"{index + 1:04d}_{Path(name).name}").write_bytes(data)
+    try:
+        os.replace(staging, folder)
+    except OSError:
+        # Another session spooled the same images first
+        shutil.rmtree(staging, ignore_errors=True)
+    _record_access(folder)
+    return str(folder)
+
+
+def cleanup_spool(max_age_hours: Optional[float] = None) -> int:
+    """
+    Delete spooled files and folders not used within max_age_hours
+    
+    Last use comes from the access records written by spool() and
+    spool_files(), not from the entries' own timestamps.
+    
+    Args:
+        max_age_hours: Age limit (default: UPLOAD_SPOOL_MAX_AGE_HOURS)
+    
+    Returns:
+        Number of entries removed
+    """
+    if not SPOOL_DIR.is_dir():
+        return 0
+    
+    max_age = (Config.UPLOAD_SPOOL_MAX_AGE_HOURS if max_age_hours is None else max_age_hours) * 3600
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in SPOOL_DIR.iterdir():
+        if entry == ACCESS_DIR:
+            continue
+        try:
+            if _last_access(entry) >= cutoff:
+                continue
+            if entry.is_dir():
+                shutil.rmtree(entry)
+            else:
+                entry.unlink()
+            removed += 1
+        except OSError:
+            continue  # In use or already removed by another session
+        try:
+            (ACCESS_DIR / entry.name).unlink()
+        except OSError:
+            pass
+    if removed:
+        print(f"🧹 Removed {removed} spooled upload(s) older than {max_age / 3600:g} hours")
+    return removed
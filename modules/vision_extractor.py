@@ -0,0 +1,290 @@
+"""
+Fused Vision Requirement Extraction Module
+Extracts Task 2 requirements straight from scanned page images, one Vision
+call per page in parallel, and merges the per-page fragments locally
+"""
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+from modules.llm_service import LLMService
+from modules.azure_vision_ocr import (
+    AzureVisionOCR, PdfPageSource, ImagePageSource, IMAGE_EXTENSIONS, ARCHIVE_EXTENSIONS
+)
+from modules.pdf_layout import merge_in_reading_order, open_pdf
+from modules.extraction_cache import is_failed_page
+from modules.requirement_schema import CATEGORY_KEYS, assign_requirement_ids
+
+# PDF library check
+try:
+    import fitz  # PyMuPDF
+    PDF_SUPPORT = True
+except ImportError:
+    PDF_SUPPORT = False
+
+
+def is_scanned_document(file_path: str, min_native_chars: int = 50) -> bool:
+    """
+    Check whether a document is mostly page images
+    
+    Args:
+        file_path: Path to a PDF, image, ZIP archive or folder of images, or
+            an in-memory uploaded document
+        min_native_chars: Pages with less native text than this count as scanned
+    
+    Returns:
+        True for images, archives and folders, and for PDFs where most pages
+        have no usable text layer
+    """
+    # Uploaded documents are checked in memory, without spooling them to disk
+    in_memory = hasattr(file_path, "data")
+    extension = file_path.extension if in_memory else Path(file_path).suffix.lower()
+    if (not in_memory and Path(file_path).is_dir()) or extension in IMAGE_EXTENSIONS | ARCHIVE_EXTENSIONS:
+        return True
+    if extension != '.pdf' or not PDF_SUPPORT:
+        return False
+    
+    with open_pdf(file_path) as pdf_document:
+        scanned = sum(1 for page in pdf_document if len(page.get_text().strip()) < min_native_chars)
+        return scanned * 2 > len(pdf_document)
+
+
+def _parse_fragment(content: str) -> dict:
+    """Parse a page's JSON fragment, tolerating stray text around the object"""
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        first_brace, last_brace = content.find('{'), content.rfind('}')
+        if first_brace >= 0 and last_brace > first_brace:
+            return json.loads(content[first_brace:last_brace + 1])
+        raise
+
+
+def merge_page_fragments(fragments: Dict[int, dict]) -> dict:
+    """
+    Merge per-page Task 2 fragments into one requirements result
+    
+    Items repeated on several pages are kept once and cite every page.
+    Requirement IDs are assigned by assign_requirement_ids, in page order.
+    
+    Args:
+        fragments: Zero-based page number -> Task 2 JSON fragment for that page
+    
+    Returns:
+        Requirements dict in the Task 2 schema
+    """
+    merged = {key: [] for key in CATEGORY_KEYS}
+    seen = {key: {} for key in CATEGORY_KEYS}
+    
+    for page_num in sorted(fragments):
+        page_label = f"Page {page_num + 1}"
+        for key, field in CATEGORY_KEYS.items():
+            for item in fragments[page_num].get(key) or []:
+                if not isinstance(item, dict):
+                    continue
+                normalized = " ".join(str(item.get(field, "")).lower().split())
+                if not normalized:
+                    continue
+                
+                reference = str(item.get("brd_reference", "")).strip()
+                if not reference.lower().startswith("page"):
+                    item["brd_reference"] = f"{page_label}, {reference}" if reference else page_label
+                
+                existing = seen[key].get(normalized)
+                if existing is not None:
+                    if page_label not in existing["brd_reference"]:
+                        existing["brd_reference"] += f"; {page_label}"
+                    continue
+                seen[key][normalized] = item
+                merged[key].append(item)
+    
+    return assign_requirement_ids(merged)
+
+
+def build_page_digest(fragments: Dict[int, dict]) -> str:
+    """
+    Build a compact per-page text digest (headings and requirement statements)
+    
+    Stands in for the full transcript where BRD text is still needed, such
+    as Task 1 structure analysis.
+    """
+    sections = []
+    for page_num in sorted(fragments):
+        fragment = fragments[page_num]
+        lines = [f"--- Page {page_num + 1} ---"]
+        lines.extend(str(heading) for heading in fragment.get("section_headings") or [])
+        for key, field in CATEGORY_KEYS.items():
+            for item in fragment.get(key) or []:
+                if isinstance(item, dict) and item.get(field):
+                    requirement_id = item.get("requirement_id")
+                    lines.append(f"- {requirement_id}: {item[field]}" if requirement_id else f"- {item[field]}")
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections)
+
+
+class VisionRequirementExtractor:
+    """Extract requirements directly from page images, skipping the intermediate transcript"""
+    
+    def __init__(self):
+        self.llm_service = LLMService()
+        self.ocr = AzureVisionOCR()  # Page rendering, encoding, cache and shared Vision limiter
+        self.system_prompt = self.llm_service.load_prompt_template('task2_vision_extraction')
+        # Cached fragments are only valid for the prompt that produced them
+        self._prompt_tag = hashlib.md5(self.system_prompt.encode()).hexdigest()[:8]
+    
+    def extract_requirements(self, file_path: str,
+                             progress_callback: Optional[Callable[[dict], None]] = None) -> Tuple[dict, str]:
+        """
+        Extract requirements from every page of a scanned document in parallel
+        
+        Pages whose fused call fails (an error, or JSON cut off at the output
+        limit on a dense page) are retried once from their OCR transcript.
+        Pages that still fail are listed in _metadata["failed_pages"].
+        
+        Args:
+            file_path: Path to a PDF, image, ZIP archive or folder of images
+            progress_callback: Optional callback receiving a per-page progress
+                event dict (same keys as AzureVisionOCR.iter_pdf_pages)
+        
+        Returns:
+            Tuple of (requirements in the Task 2 schema, per-page text digest)
+        """
+        if Path(file_path).suffix.lower() == '.pdf':
+            pages = PdfPageSource(file_path)
+        else:
+            pages = ImagePageSource([file_path])
+        
+        ocr = self.ocr
+        ocr.reset_stats()
+        start_time = time.time()
+        fragments = {}
+        failed_pages = []
+        try:
+            total_pages = len(pages)
+            ocr.last_run_stats["pages"] = total_pages
+            print(f"🧩 Fused vision extraction over {total_pages} pages...")
+            
+            with ThreadPoolExecutor(max_workers=ocr.max_workers) as executor:
+                futures = {
+                    executor.submit(self._extract_page, pages, page_num, total_pages): page_num
+                    for page_num in range(total_pages)
+                }
+                for completed, future in enumerate(as_completed(futures), start=1):
+                    page_num = futures[future]
+                    try:
+                        fragments[page_num], source = future.result()
+                    except Exception as e:
+                        print(f"  ❌ Page {page_num + 1} failed: {e}")
+                        fragments[page_num], source = {}, "error"
+                        failed_pages.append(page_num + 1)
+                    
+                    if progress_callback:
+                        elapsed = time.time() - start_time
+                        progress_callback({
+                            "page": page_num + 1,
+                            "total_pages": total_pages,
+                            "completed": completed,
+                            "source": source,
+                            "cache_hits": ocr.last_run_stats.get("cache_hits", 0),
+                            "elapsed_seconds": round(elapsed, 1),
+                            "eta_seconds": round(elapsed / completed * (total_pages - completed), 1),
+                            "text": "",
+                        })
+            
+            # Fall back to OCR + text extraction for pages the fused call could not handle
+            recovered_pages = []
+            for page_number in sorted(failed_pages):
+                print(f"  🔁 Page {page_number}: retrying from its OCR transcript...")
+                try:
+                    fragments[page_number - 1] = self._extract_page_from_transcript(pages, page_number - 1, total_pages)
+                    recovered_pages.append(page_number)
+                except Exception as e:
+                    print(f"  ❌ Page {page_number} failed again: {e}")
+            failed_pages = [page_number for page_number in failed_pages if page_number not in recovered_pages]
+        finally:
+            pages.close()
+            ocr.finish_stats(start_time)
+        
+        requirements = merge_page_fragments(fragments)
+        requirements["_metadata"] = {
+            "mode": "fused_vision",
+            "pages": len(fragments),
+            "failed_pages": sorted(failed_pages),
+            "recovered_pages": recovered_pages,
+        }
+        if failed_pages:
+            print(f"⚠️ No requirements extracted from page(s) {', '.join(map(str, sorted(failed_pages)))}")
+        print(f"✅ Fused extraction: {len(requirements['functional_requirements'])} functional and "
+              f"{len(requirements['non_functional_requirements'])} non-functional requirements")
+        return requirements, build_page_digest(fragments)
+    
+    def _extract_page(self, pages, page_num: int, total_pages: int) -> Tuple[dict, str]:
+        """
+        Extract one page's Task 2 fragment
+        
+        Blank pages are skipped, pages with a usable text layer are sent as
+        text, and everything else goes to Vision as an image.
+        
+        Returns:
+            Tuple of (fragment, source) where source is "cache", "blank", "text" or "vision"
+        """
+        ocr = self.ocr
+        cache_key = self._cache_key(pages, page_num)
+        cached_result = ocr.get_cached_result(cache_key)
+        if cached_result:
+            ocr.record_stat("cache_hits")
+            return json.loads(cached_result), "cache"
+        
+        if ocr.skip_blank_pages and ocr.is_blank_page(pages, page_num):
+            ocr.record_stat("blank_pages_skipped")
+            return {}, "blank"
+        
+        content = [{"type": "text", "text": f"Page {page_num + 1} of {total_pages}:"}]
+        layout = ocr.page_layout(pages, page_num)
+        if layout and layout["text_chars"] >= ocr.min_native_chars and not layout["image_regions"]:
+            content.append({"type": "text", "text": merge_in_reading_order(layout["text_blocks"])})
+            source = "text"
+            ocr.record_stat("native_text_pages")
+        else:
+            content.append(ocr.encode_page(pages, page_num))
+            source = "vision"
+        
+        fragment = self._request_fragment(content)
+        ocr.save_to_cache(cache_key, json.dumps(fragment))
+        print(f"  ✅ Page {page_num + 1}: {len(fragment.get('functional_requirements') or [])} functional requirement(s)")
+        return fragment, source
+    
+    def _extract_page_from_transcript(self, pages, page_num: int, total_pages: int) -> dict:
+        """Extract one page's Task 2 fragment from its plain OCR transcript"""
+        page_text = self.ocr.extract_page_text(pages, page_num, total_pages)
+        if not page_text.strip() or is_failed_page(page_text):
+            raise ValueError("no usable OCR transcript")
+        
+        fragment = self._request_fragment([
+            {"type": "text", "text": f"Page {page_num + 1} of {total_pages}:"},
+            {"type": "text", "text": page_text},
+        ])
+        self.ocr.save_to_cache(self._cache_key(pages, page_num), json.dumps(fragment))
+        print(f"  ✅ Page {page_num + 1}: {len(fragment.get('functional_requirements') or [])} functional requirement(s) from transcript")
+        return fragment
+    
+    def _cache_key(self, pages, page_num: int) -> str:
+        """Cache key of a page's fragment (fragments are only valid for the prompt that produced them)"""
+        return hashlib.md5(f"fused_{self._prompt_tag}_{pages.cache_key(page_num)}".encode()).hexdigest()
+    
+    def _request_fragment(self, content: list) -> dict:
+        """Send one page to the fused extraction prompt and parse its JSON fragment"""
+        response = self.ocr.create_completion(
+            messages=[
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": content}
+            ],
+            temperature=0.2,
+            max_tokens=self.ocr.page_max_tokens,
+            response_format={"type": "json_object"}
+        )
+        if response.choices[0].finish_reason == "length":
+            raise ValueError(f"response cut off at {self.ocr.page_max_tokens} tokens")
+        return _parse_fragment(response.choices[0].message.content.strip())